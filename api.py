@@ -1,118 +1,495 @@
 import json
 import threading
+import time
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from pathlib import Path
-from hashlib import pbkdf2_hmac
-from datetime import time as dtime, datetime
+from urllib.parse import parse_qs
+from datetime import time as dtime
 
-from config import load_config, verify_password as _verify_password
+import events
+import metrics
+import tracing
+from config import get_config
+from kdf_pool import Busy, KdfPool
+from sse import SseHub, parse_last_id
+from tokens import TOKEN_PREFIX, issuer as _tokens, watch_password_changes
 
+ENGINES = ('threading', 'asyncio')
+MAX_BODY = 64 * 1024  # bytes; larger requests are refused before the body is read
+MAX_WAIT = 60.0  # seconds a long-poll (?wait=) may block
+MAX_BATCH = 20  # operations per POST /api/batch
+ROUTES = frozenset({'/api/status', '/api/schedule', '/api/events', '/api/kdf', '/api/metrics', '/api/traces',
+                    '/api/session', '/api/lock', '/api/unlock', '/api/batch'})
 
-def _load_config():
-    try:
-        return load_config()
-    except Exception:
-        return {}
+REQUEST_SECONDS = metrics.histogram('pclock_api_request_seconds', 'API handler time by route (excludes long-poll waits)',
+                                    ('route', 'method'))
+REQUESTS = metrics.counter('pclock_api_requests_total', 'API responses by route and status', ('route', 'method', 'status'))
 
 
-class _Handler(BaseHTTPRequestHandler):
-    locker = None  # injected
+class Request:
+    """Transport-independent view of an HTTP request."""
+    __slots__ = ('method', 'path', 'query', 'headers', 'body', 'client', '_json')
+
+    def __init__(self, method: str, target: str, headers, body: bytes = b'', client: str | None = None):
+        path, _, qs = target.partition('?')
+        self.method = method.upper()
+        self.path = path
+        self.query = {k: v[-1] for k, v in parse_qs(qs).items()}
+        items = headers.items() if hasattr(headers, 'items') else headers
+        self.headers = {k.lower(): v for k, v in items}
+        self.body = body
+        self.client = client
+        self._json = None
+
+    def header(self, name: str, default=None):
+        return self.headers.get(name.lower(), default)
+
+    def json(self):
+        if self._json is None:
+            try:
+                self._json = json.loads(self.body.decode('utf-8')) if self.body else {}
+            except Exception:
+                self._json = {}
+        return self._json
+
+
+class Response:
+    __slots__ = ('status', 'headers', 'body', 'payload')
+
+    def __init__(self, status: int, payload: dict | None = None, headers: dict | None = None):
+        self.status = status
+        self.headers = dict(headers or {})
+        self.payload = payload
+        if payload is None:
+            self.body = b''
+        else:
+            self.body = json.dumps(payload).encode('utf-8')
+            self.headers['Content-Type'] = 'application/json'
+
+
+class EventStream(Response):
+    """Turns the connection into a text/event-stream of bus events after `last_id`."""
+    __slots__ = ('last_id',)
+
+    def __init__(self, last_id: int | None):
+        super().__init__(200, headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*',
+        })
+        self.last_id = last_id
+
+
+class LongPoll(Response):
+    """Deferred response: the engine waits (up to `timeout`) for `changed()`, then sends `resolve()`."""
+    __slots__ = ('changed', 'resolve', 'timeout')
+
+    def __init__(self, changed, resolve, timeout: float):
+        super().__init__(200)
+        self.changed = changed
+        self.resolve = resolve
+        self.timeout = timeout
+
+
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _cors() -> Response:
+    # CORS for convenience (localhost use)
+    return Response(204, headers={
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+    })
+
+
+class ApiApp:
+    """Routes requests to handlers; shared by both server engines."""
 
-    def _read_json(self):
-        length = int(self.headers.get('Content-Length') or 0)
-        if length == 0:
-            return {}
+    def __init__(self, locker, kdf: KdfPool):
+        self.locker = locker
+        self.kdf = kdf
+
+    def blocking(self, req: Request) -> bool:
+        """True if handling `req` may block (KDF, lock/unlock, disk reads and writes)."""
+        # GET /api/schedule checks credentials and may decrypt schedule.dat (cache miss)
+        return req.method in ('POST', 'DELETE') or req.path == '/api/schedule'
+
+    def handle(self, req: Request) -> Response:
+        # Unknown paths share one label so scanners cannot blow up the metric
+        route = req.path if req.path in ROUTES else 'other'
+        t0 = time.perf_counter()
+        handler = getattr(self, f'_do_{req.method}', None)
         try:
-            data = self.rfile.read(length)
-            return json.loads(data.decode('utf-8'))
-        except Exception:
-            return {}
+            resp = Response(405, {"error": "method_not_allowed"}) if handler is None else handler(req)
+        finally:
+            REQUEST_SECONDS.labels(route, req.method).observe(time.perf_counter() - t0)
+        REQUESTS.labels(route, req.method, resp.status).inc()
+        return resp
+
+    # --- auth ---
 
-    def _auth_ok(self) -> bool:
-        # Allow Authorization: Bearer <password> OR JSON {"password":"..."}
-        auth = self.headers.get('Authorization')
+    @staticmethod
+    def _bearer(req: Request) -> str | None:
+        auth = req.header('Authorization')
         if auth and auth.lower().startswith('bearer '):
-            pw = auth.split(' ', 1)[1].strip()
-            return _verify_password(pw)
-        body = getattr(self, '_json', {})
+            return auth.split(' ', 1)[1].strip()
+        return None
+
+    def _verify_password(self, req: Request, password: str) -> bool:
+        # Runs on the bounded KDF pool; raises Busy when not admitted
+        return self.kdf.verify(password, req.client)
+
+    def _auth_ok(self, req: Request, allow_token: bool = True) -> bool:
+        # Allow Authorization: Bearer <session token or password> OR JSON {"password":"..."}
+        bearer = self._bearer(req)
+        if bearer:
+            if bearer.startswith(TOKEN_PREFIX):
+                return allow_token and _tokens.verify(bearer)
+            return self._verify_password(req, bearer)
+        body = req.json()
         if isinstance(body, dict) and 'password' in body:
-            return _verify_password(str(body.get('password', '')))
+            return self._verify_password(req, str(body.get('password', '')))
         return False
 
-    def _json_response(self, code: int, payload: dict):
-        b = json.dumps(payload).encode('utf-8')
-        self.send_response(code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', str(len(b)))
-        self.end_headers()
-        self.wfile.write(b)
-
-    def do_OPTIONS(self):
-        # CORS for convenience (localhost use)
-        self.send_response(204)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-        self.end_headers()
+    def _deny(self, req: Request, allow_token: bool = True) -> Response | None:
+        """None if the request is authenticated, else the 401/429 response to send."""
+        try:
+            if self._auth_ok(req, allow_token):
+                return None
+        except Busy as e:
+            return Response(429, {"error": "too_many_requests", "reason": e.reason, "retry_after": e.retry_after},
+                            headers={'Retry-After': str(e.retry_after)})
+        return Response(401, {"error": "unauthorized"})
 
-    def do_GET(self):
-        if self.path == '/api/status':
-            locked = bool(self.locker and self.locker.state.active)
-            return self._json_response(200, {"locked": locked})
-        return self._json_response(404, {"error": "not_found"})
-
-    def do_POST(self):
-        self._json = self._read_json()
-        if self.path == '/api/lock':
-            if not self._auth_ok():
-                return self._json_response(401, {"error": "unauthorized"})
-            try:
-                if self.locker and not self.locker.state.active:
-                    self.locker.lock_now(reason='manual')
-                return self._json_response(200, {"status": "locked"})
-            except Exception as e:
-                return self._json_response(500, {"error": str(e)})
-        if self.path == '/api/unlock':
-            if not self._auth_ok():
-                return self._json_response(401, {"error": "unauthorized"})
+    # --- versioned reads ---
+
+    def _status_version(self) -> int:
+        version = getattr(self.locker, 'version', None)
+        return version.value if version is not None else 0
+
+    def _status(self) -> Response:
+        version = self._status_version()
+        locked = bool(self.locker and self.locker.state.active)
+        return Response(200, {"locked": locked, "version": version}, headers={'ETag': _etag(version)})
+
+    @staticmethod
+    def _schedule_version() -> int:
+        import schedule_store
+        return schedule_store.version()
+
+    @staticmethod
+    def _schedule() -> Response:
+        import schedule_store
+        # Read the version first: a change racing with the read then shows up as a newer version next time
+        version = schedule_store.version()
+        return Response(200, {"schedule": schedule_store.read_schedule(), "version": version},
+                        headers={'ETag': _etag(version)})
+
+    @staticmethod
+    def _conditional(req: Request, current, build) -> Response:
+        """304 if the client's ETag is current, a long-poll for ?wait=&since=, else `build()`."""
+        version = current()
+        if req.header('If-None-Match') == _etag(version):
+            not_modified = Response(304, headers={'ETag': _etag(version)})
+        else:
+            not_modified = None
+        try:
+            since = int(req.query['since']) if 'since' in req.query else None
+            wait = min(MAX_WAIT, max(0.0, float(req.query.get('wait') or 0)))
+        except ValueError:
+            return Response(400, {"error": "invalid_wait_or_since"})
+        if since is not None:
+            if wait > 0 and since == version:
+                def resolve():
+                    v = current()
+                    return build() if v != since else Response(304, headers={'ETag': _etag(v)})
+                return LongPoll(lambda: current() != since, resolve, wait)
+            if since == version:
+                return Response(304, headers={'ETag': _etag(version)})
+        return not_modified or build()
+
+    # --- routes ---
+
+    def _do_OPTIONS(self, req: Request) -> Response:
+        return _cors()
+
+    def _do_GET(self, req: Request) -> Response:
+        if req.path == '/api/status':
+            return self._conditional(req, self._status_version, self._status)
+        if req.path == '/api/schedule':
+            # Schedule contents are as private as setting them: token or password, like POST
+            denied = self._deny(req)
+            if denied:
+                return denied
             try:
-                if self.locker and self.locker.state.active:
-                    self.locker.unlock_now()
-                return self._json_response(200, {"status": "unlocked"})
+                return self._conditional(req, self._schedule_version, self._schedule)
             except Exception as e:
-                return self._json_response(500, {"error": str(e)})
-        if self.path == '/api/schedule':
-            if not self._auth_ok():
-                return self._json_response(401, {"error": "unauthorized"})
-            body = self._json if isinstance(self._json, dict) else {}
+                return Response(503, {"error": f"schedule_unavailable: {e}"})
+        if req.path == '/api/events':
+            # EventSource sends Last-Event-ID on reconnect; the query form is for other clients
+            return EventStream(parse_last_id(req.header('Last-Event-ID') or req.query.get('last_event_id')))
+        if req.path == '/api/metrics':
+            resp = Response(200, headers={'Content-Type': metrics.CONTENT_TYPE})
+            resp.body = metrics.render().encode('utf-8')
+            return resp
+        if req.path == '/api/kdf':
+            # Pool sizing data; contains no secrets
+            return Response(200, {"kdf": self.kdf.stats()})
+        if req.path == '/api/traces':
+            # Phase timings of recent lock/unlock transitions; no secrets either
             try:
-                enabled = bool(body.get('enabled', False))
-                start = str(body.get('start', '22:00'))
-                end = str(body.get('end', '07:00'))
-                # validate times
-                dtime.fromisoformat(start)
-                dtime.fromisoformat(end)
-                from schedule_store import write_schedule, read_schedule
-                write_schedule(enabled, start, end)
-                return self._json_response(200, {"schedule": read_schedule()})
-            except Exception as e:
-                return self._json_response(400, {"error": f"invalid_schedule: {e}"})
-        return self._json_response(404, {"error": "not_found"})
+                limit = int(req.query.get('limit') or tracing.BUFFER_SIZE)
+            except ValueError:
+                return Response(400, {"error": "bad_limit"})
+            return Response(200, {"traces": tracing.tracer.recent(limit)})
+        return Response(404, {"error": "not_found"})
+
+    def _do_POST(self, req: Request) -> Response:
+        if req.path == '/api/session':
+            # Exchange the password for a bearer token; tokens cannot mint new tokens
+            denied = self._deny(req, allow_token=False)
+            if denied:
+                return denied
+            token, expires = _tokens.issue()
+            return Response(200, {"token": token, "expires_in": _tokens.ttl, "expires_at": expires})
+        op = self._POST_OPS.get(req.path)
+        if op is not None:
+            denied = self._deny(req)
+            if denied:
+                return denied
+            body = req.json() if isinstance(req.json(), dict) else {}
+            return op(self, body)
+        if req.path == '/api/batch':
+            denied = self._deny(req)
+            if denied:
+                return denied
+            return self._batch(req.json())
+        return Response(404, {"error": "not_found"})
+
+    # --- operations (shared by the single endpoints and /api/batch) ---
+
+    def _exclusive(self, fn):
+        # One Locker command: no lock/unlock from the scheduler or other requests in between
+        run = getattr(self.locker, 'exclusive', None)
+        return run(fn) if run is not None else fn()
+
+    @staticmethod
+    def _transition(state, wanted: bool) -> Response:
+        # Report the state the Locker ended in, not the one that was asked for
+        status = "locked" if state.active else "unlocked"
+        if state.active != wanted:
+            return Response(409, {"error": f"conflict: desktop is {status}", "status": status})
+        return Response(200, {"status": status})
+
+    def _op_lock(self, body: dict) -> Response:
+        if not self.locker:
+            return Response(200, {"status": "locked"})
+        try:
+            state = self.locker.state
+            if not state.active:
+                state = self.locker.lock_now(reason='manual')
+            return self._transition(state, True)
+        except Exception as e:
+            return Response(500, {"error": str(e)})
+
+    def _op_unlock(self, body: dict) -> Response:
+        if not self.locker:
+            return Response(200, {"status": "unlocked"})
+        try:
+            state = self.locker.state
+            if state.active:
+                state = self.locker.unlock_now()
+            return self._transition(state, False)
+        except Exception as e:
+            return Response(500, {"error": str(e)})
+
+    def _op_status(self, body: dict) -> Response:
+        return self._status()
+
+    def _op_get_schedule(self, body: dict) -> Response:
+        try:
+            return self._schedule()
+        except Exception as e:
+            return Response(503, {"error": f"schedule_unavailable: {e}"})
+
+    def _op_set_schedule(self, body: dict) -> Response:
+        try:
+            from schedule_store import write_schedule, read_schedule
+            from schedule_index import normalize_windows
+            current = read_schedule()
+            enabled = bool(body.get('enabled', False))
+            start = str(body.get('start', current.get('start', '22:00')))
+            end = str(body.get('end', current.get('end', '07:00')))
+            # validate times
+            dtime.fromisoformat(start)
+            dtime.fromisoformat(end)
+            # Weekly rules; a request without them sets a plain daily window
+            windows = normalize_windows(body.get('windows'))
+            write_schedule(enabled, start, end, current.get('notify_minutes'), windows)
+            return Response(200, {"schedule": read_schedule()})
+        except Exception as e:
+            return Response(400, {"error": f"invalid_schedule: {e}"})
+
+    _POST_OPS = {
+        '/api/lock': _op_lock,
+        '/api/unlock': _op_unlock,
+        '/api/schedule': _op_set_schedule,
+    }
+    _BATCH_OPS = {
+        'lock': _op_lock,
+        'unlock': _op_unlock,
+        'status': _op_status,
+        'schedule': _op_set_schedule,
+        'get_schedule': _op_get_schedule,
+    }
+
+    def _batch(self, body) -> Response:
+        """Run several operations after a single auth check, in order, as one Locker command."""
+        ops = body.get('ops') if isinstance(body, dict) else None
+        if not isinstance(ops, list) or not ops:
+            return Response(400, {"error": "invalid_batch: 'ops' must be a non-empty list"})
+        if len(ops) > MAX_BATCH:
+            return Response(400, {"error": f"invalid_batch: at most {MAX_BATCH} ops"})
+        stop_on_error = bool(body.get('stop_on_error', False))
+        results = []
+
+        def run():
+            for spec in ops:
+                name = spec.get('op') if isinstance(spec, dict) else None
+                op = self._BATCH_OPS.get(name)
+                if op is None:
+                    resp = Response(400, {"error": f"unknown_op: {name}"})
+                else:
+                    resp = op(self, spec)
+                results.append({"op": name, "status": resp.status, "result": resp.payload})
+                if stop_on_error and resp.status >= 400:
+                    break
+
+        self._exclusive(run)
+        ok = all(r["status"] < 400 for r in results)
+        return Response(200, {"ok": ok, "completed": len(results), "results": results})
+
+    def _do_DELETE(self, req: Request) -> Response:
+        if req.path == '/api/session':
+            token = self._bearer(req)
+            if not token or not _tokens.verify(token):
+                return Response(401, {"error": "unauthorized"})
+            _tokens.revoke(token)
+            return Response(200, {"status": "revoked"})
+        return Response(404, {"error": "not_found"})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    app: ApiApp = None  # injected
+
+    def _dispatch(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            # The body's end is unknown, so the connection cannot be reused
+            self.close_connection = True
+            return self._send(Response(400, {"error": "bad_content_length"}))
+        if length > MAX_BODY:
+            self.close_connection = True
+            return self._send(Response(413, {"error": "body_too_large"}))
+        body = self.rfile.read(length) if length > 0 else b''
+        req = Request(self.command, self.path, self.headers.items(), body, self.client_address[0])
+        try:
+            resp = self.app.handle(req)
+            if isinstance(resp, LongPoll):
+                events.bus.wait_for(resp.changed, resp.timeout)
+                resp = resp.resolve()
+        except Exception as e:
+            resp = Response(500, {"error": str(e)})
+        self._send(resp)
+
+    def _send(self, resp: Response):
+        if isinstance(resp, EventStream):
+            return self._stream(resp)
+
+        self.send_response(resp.status)
+        for k, v in resp.headers.items():
+            self.send_header(k, v)
+        if resp.status not in (204, 304):
+            self.send_header('Content-Length', str(len(resp.body)))
+        self.end_headers()
+        if resp.body:
+            self.wfile.write(resp.body)
+
+    def _stream(self, resp: EventStream):
+        hub = self.server.hub
+        if hub.full():
+            return self._send(Response(503, {"error": "too_many_streams"}, headers={'Retry-After': '5'}))
+        self.send_response(200)
+        for k, v in resp.headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.close_connection = True
+        # The hub thread owns the socket from here on; this thread returns to the pool
+        if hub.attach(self.connection, resp.last_id):
+            self.server.detach(self.connection)
+
+    do_GET = do_POST = do_DELETE = do_OPTIONS = _dispatch
 
     def log_message(self, fmt, *args):
         # Quieter server
         return
 
 
+class _ThreadingServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer whose event-stream sockets are handed to an SseHub."""
+
+    def __init__(self, address, handler):
+        super().__init__(address, handler)
+        self.hub = SseHub(events.bus)
+        self._detached: set = set()
+
+    def detach(self, sock):
+        self._detached.add(sock)
+
+    def shutdown_request(self, request):
+        # Called when the handler returns; leave sockets owned by the hub open
+        if request in self._detached:
+            self._detached.discard(request)
+            return
+        super().shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.hub.close()
+
+
 class ApiServer:
-    def __init__(self, locker, host: str = '127.0.0.1', port: int = 8765):
+    """REST API on a thread-per-connection server ('threading') or an asyncio loop ('asyncio')."""
+
+    def __init__(self, locker, host: str = '127.0.0.1', port: int = 8765, kdf_workers: int = 2, kdf_queue: int = 8,
+                 engine: str = 'threading'):
+        if engine not in ENGINES:
+            raise ValueError(f'unknown API engine: {engine}')
         self.locker = locker
         self.host = host
         self.port = int(port)
-        handler = type('InjectedHandler', (_Handler,), {})
-        handler.locker = locker
-        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
-        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.engine = engine
+        self.kdf = KdfPool(kdf_workers, kdf_queue)
+        self.app = ApiApp(locker, self.kdf)
+        if engine == 'asyncio':
+            from api_async import AsyncHttpServer
+            self.httpd = AsyncHttpServer(self.app, self.host, self.port)
+            self.thread = self.httpd.thread
+        else:
+            handler = type('InjectedHandler', (_Handler,), {})
+            handler.app = self.app
+            self.httpd = _ThreadingServer((self.host, self.port), handler)
+            self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        # Password changes revoke outstanding session tokens
+        watch_password_changes()
+        events.watch_schedule()
+
+    @property
+    def address(self) -> tuple:
+        """(host, port) actually bound; useful with port 0."""
+        return self.httpd.server_address[:2]
 
     def start(self):
         self.thread.start()
@@ -121,18 +498,19 @@ class ApiServer:
     def stop(self):
         try:
             self.httpd.shutdown()
+            self.httpd.server_close()
         except Exception:
             pass
+        self.kdf.shutdown()
 
 
 def maybe_start_api(locker):
-    cfg = _load_config()
-    api_cfg = cfg.get('api', {}) if isinstance(cfg, dict) else {}
-    enabled = bool(api_cfg.get('enabled', False))
-    if not enabled:
+    try:
+        api_cfg = get_config().api
+    except Exception:
+        return None
+    if not api_cfg.enabled:
         return None
-    host = api_cfg.get('host', '127.0.0.1')
-    port = int(api_cfg.get('port', 8765))
-    server = ApiServer(locker, host, port)
+    server = ApiServer(locker, api_cfg.host, api_cfg.port, api_cfg.kdf_workers, api_cfg.kdf_queue, api_cfg.engine)
     server.start()
     return server
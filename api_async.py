@@ -0,0 +1,289 @@
+"""
+asyncio engine for the REST API (`api.engine: "asyncio"` in config.json).
+
+One event-loop thread serves every connection, so slow clients and idle
+keep-alive connections cost a socket and a small coroutine instead of an OS
+thread each. Handlers that may block (KDF checks, lock/unlock, disk reads
+and writes, see ApiApp.blocking) run on a small thread pool; cheap reads run
+on the loop.
+
+Limits:
+- `idle_timeout`: a keep-alive connection waiting for its next request is closed
+- `read_timeout`: the request head and body must arrive within this time
+- `max_concurrent`: requests being handled at once; others wait up to
+  `read_timeout` for a slot and then get 503
+- `max_body`: checked against Content-Length before any of the body is read
+"""
+import asyncio
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import events
+import sse
+from api import MAX_BODY, EventStream, LongPoll, Request, Response
+
+IDLE_TIMEOUT = 15.0
+READ_TIMEOUT = 10.0
+MAX_CONCURRENT = 16
+BLOCKING_WORKERS = 4
+MAX_HEAD = 16 * 1024
+
+
+class _HttpError(Exception):
+    def __init__(self, status: int, error: str):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+
+
+class AsyncHttpServer:
+    """HTTP/1.1 server for an api.ApiApp on a dedicated event-loop thread.
+
+    Mirrors the parts of ThreadingHTTPServer that ApiServer uses:
+    `server_address` and `shutdown()`.
+    """
+
+    def __init__(self, app, host: str, port: int, idle_timeout: float = IDLE_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, max_concurrent: int = MAX_CONCURRENT,
+                 max_body: int = MAX_BODY, workers: int = BLOCKING_WORKERS):
+        self.app = app
+        self.idle_timeout = idle_timeout
+        self.read_timeout = read_timeout
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_body = int(max_body)
+        # Bind now so that errors surface in the constructor, as with ThreadingHTTPServer
+        self._sock = socket.create_server((host, port))
+        self.server_address = self._sock.getsockname()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self._loop = asyncio.new_event_loop()
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._stopped = threading.Event()
+        self._tick: asyncio.Event | None = None  # set and replaced on every bus event
+        self.active = 0  # requests being handled
+        self.streams = 0  # open /api/events streams
+        self.thread = threading.Thread(target=self._run, daemon=True, name='api-async')
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+            self._stopped.set()
+
+    async def _serve(self):
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._tick = asyncio.Event()
+        events.bus.subscribe(self._on_event)
+        self._server = await asyncio.start_server(self._connection, sock=self._sock, limit=MAX_HEAD)
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            events.bus.unsubscribe(self._on_event)
+            self._server.close()
+            for task in list(self._connections):
+                task.cancel()
+            if self._connections:
+                await asyncio.gather(*self._connections, return_exceptions=True)
+
+    def shutdown(self):
+        """Stop accepting, drop open connections and wait for the loop to exit."""
+        if self.thread.is_alive():
+            def _stop():
+                if self._server is not None:
+                    self._server.close()
+                for task in asyncio.all_tasks(self._loop):
+                    task.cancel()
+            self._loop.call_soon_threadsafe(_stop)
+            self._stopped.wait(5.0)
+        self._executor.shutdown(wait=False)
+
+    def server_close(self):
+        self._sock.close()
+
+    # --- connection handling ---
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        peer = writer.get_extra_info('peername')
+        client = peer[0] if peer else None
+        try:
+            while True:
+                try:
+                    req, keep_alive = await self._read_request(reader, client)
+                except _HttpError as e:
+                    await self._write(writer, Response(e.status, {"error": e.error}), False)
+                    break
+                if req is None:
+                    break
+                resp = await self._handle(req)
+                if isinstance(resp, LongPoll):
+                    resp = await self._long_poll(resp)
+                if isinstance(resp, EventStream):
+                    await self._stream(reader, writer, resp)
+                    break
+                await self._write(writer, resp, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # CancelledError: server shutdown; end the connection quietly
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader, client):
+        """Return (Request, keep_alive), or (None, False) when the client is done."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            return None, False
+        except ValueError:
+            raise _HttpError(431, 'header_too_large')
+        if not line.strip():
+            return None, False
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise _HttpError(400, 'bad_request_line')
+        try:
+            headers = await asyncio.wait_for(self._read_headers(reader), self.read_timeout)
+        except ValueError:
+            raise _HttpError(431, 'header_too_large')
+        lower = {k.lower(): v for k, v in headers}
+        if 'transfer-encoding' in lower:
+            raise _HttpError(411, 'length_required')
+        try:
+            length = int(lower.get('content-length') or 0)
+        except ValueError:
+            raise _HttpError(400, 'bad_content_length')
+        if length > self.max_body:
+            raise _HttpError(413, 'body_too_large')
+        body = await asyncio.wait_for(reader.readexactly(length), self.read_timeout) if length > 0 else b''
+        conn = lower.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = conn != 'close'
+        else:
+            keep_alive = conn == 'keep-alive'
+        return Request(method, target, headers, body, client), keep_alive
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> list:
+        headers = []
+        size = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise asyncio.IncompleteReadError(b'', None)
+            if line in (b'\r\n', b'\n'):
+                return headers
+            size += len(line)
+            if size > MAX_HEAD:
+                raise ValueError('headers too large')
+            name, sep, value = line.decode('latin-1').partition(':')
+            if sep:
+                headers.append((name.strip(), value.strip()))
+
+    async def _handle(self, req: Request) -> Response:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.read_timeout)
+        except asyncio.TimeoutError:
+            return Response(503, {"error": "busy"}, headers={'Retry-After': '1'})
+        self.active += 1
+        try:
+            if self.app.blocking(req):
+                return await self._loop.run_in_executor(self._executor, self.app.handle, req)
+            return self.app.handle(req)
+        except Exception as e:
+            return Response(500, {"error": str(e)})
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    # --- server-sent events ---
+
+    def _on_event(self, _event):
+        # Publisher thread -> loop
+        try:
+            self._loop.call_soon_threadsafe(self._wake_streams)
+        except RuntimeError:
+            pass  # loop closed
+
+    def _wake_streams(self):
+        tick, self._tick = self._tick, asyncio.Event()
+        tick.set()
+
+    async def _long_poll(self, poll: LongPoll) -> Response:
+        # Waits on the loop, outside the concurrency cap; re-checks after every bus event
+        deadline = self._loop.time() + poll.timeout
+        try:
+            while not poll.changed():
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    # A change made after the check above still wakes this tick:
+                    # its bus callback is queued on the loop behind us
+                    await asyncio.wait_for(self._tick.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            # Building the answer may read the schedule from disk
+            return await self._loop.run_in_executor(self._executor, poll.resolve)
+        except Exception as e:
+            return Response(500, {"error": str(e)})
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, resp: EventStream):
+        if self.streams >= sse.MAX_STREAMS:
+            await self._write(writer, Response(503, {"error": "too_many_streams"}, headers={'Retry-After': '5'}), False)
+            return
+        self.streams += 1
+        # Completes when the client disconnects (clients send nothing after the request)
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            head, last_id = sse.open_stream(events.bus, resp.last_id)
+            lines = ['HTTP/1.1 200 OK'] + [f'{k}: {v}' for k, v in resp.headers.items()] + ['Connection: close']
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + head)
+            await writer.drain()
+            while not closed.done():
+                tick = self._tick
+                batch, complete = events.bus.since(last_id)
+                if not complete:
+                    last_id = events.bus.last_id
+                    writer.write(sse.resync_frame(last_id))
+                elif batch:
+                    last_id = batch[-1].id
+                    writer.write(b''.join(e.frame for e in batch))
+                else:
+                    waiter = asyncio.ensure_future(tick.wait())
+                    done, _ = await asyncio.wait({closed, waiter}, timeout=sse.HEARTBEAT,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    waiter.cancel()
+                    if not done:
+                        writer.write(sse.PING)
+                    else:
+                        continue
+                await asyncio.wait_for(writer.drain(), self.read_timeout)
+        finally:
+            closed.cancel()
+            self.streams -= 1
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, resp: Response, keep_alive: bool):
+        try:
+            reason = HTTPStatus(resp.status).phrase
+        except ValueError:
+            reason = ''
+        lines = [f'HTTP/1.1 {resp.status} {reason}']
+        lines += [f'{k}: {v}' for k, v in resp.headers.items()]
+        if resp.status not in (204, 304):
+            lines.append(f'Content-Length: {len(resp.body)}')
+        lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + resp.body)
+        await writer.drain()
@@ -0,0 +1,280 @@
+"""
+Muting system audio while the desktop is locked.
+
+The old code imported pycaw, created a device enumerator and activated the
+default speaker's IAudioEndpointVolume on every lock and unlock, and only
+that one device was muted (a USB headset kept playing). AudioController
+instead:
+
+- runs all Core Audio calls on a small pool whose threads join the COM
+  multithreaded apartment once, when they start;
+- caches the list of active render endpoints and their volume interfaces by
+  device ID, dropping them when Windows reports a device change (or when a
+  call on a cached interface fails);
+- mutes and restores every active render endpoint in parallel, remembering
+  per device whether it was already muted.
+
+Backends: PycawBackend (Windows) and StubBackend (in-memory, for benchmarks).
+
+    audio = AudioController()
+    audio.mute_all()
+    ...
+    audio.restore_all()
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = 4
+
+
+class PycawBackend:
+    """Core Audio through pycaw/comtypes (imported on first use)."""
+
+    def __init__(self):
+        self._enumerator = None
+        self._client = None
+
+    def init_thread(self) -> None:
+        # Endpoint interfaces created in the MTA can be used from any other MTA thread.
+        # comtypes initializes the thread importing it with sys.coinit_flags (STA by default)
+        if 'comtypes' not in sys.modules:
+            sys.coinit_flags = 0  # COINIT_MULTITHREADED
+        import comtypes
+        try:
+            comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+        except Exception:
+            pass  # already initialized (comtypes did it on import)
+
+    def _devices(self):
+        if self._enumerator is None:
+            from pycaw.pycaw import AudioUtilities
+            self._enumerator = AudioUtilities.GetDeviceEnumerator()
+        return self._enumerator
+
+    def watch(self, on_change) -> None:
+        """Call `on_change(device_id)` when an endpoint is added, removed or changes state."""
+        from pycaw.callbacks import MMNotificationClient
+
+        class _Client(MMNotificationClient):
+            def on_device_added(self, device_id):
+                on_change(device_id)
+
+            def on_device_removed(self, device_id):
+                on_change(device_id)
+
+            def on_device_state_changed(self, device_id, new_state, new_state_id):
+                on_change(device_id)
+
+            def on_default_device_changed(self, flow, flow_id, role, role_id, default_device_id):
+                on_change(None)
+
+        client = _Client()
+        self._devices().RegisterEndpointNotificationCallback(client)
+        self._client = client
+
+    def unwatch(self) -> None:
+        if self._client is not None:
+            self._devices().UnregisterEndpointNotificationCallback(self._client)
+            self._client = None
+
+    def render_devices(self) -> list:
+        from pycaw.constants import DEVICE_STATE, EDataFlow
+        collection = self._devices().EnumAudioEndpoints(EDataFlow.eRender.value, DEVICE_STATE.ACTIVE.value)
+        return [collection.Item(i).GetId() for i in range(collection.GetCount())]
+
+    def open(self, device_id: str):
+        from ctypes import POINTER, cast
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import IAudioEndpointVolume
+        device = self._devices().GetDevice(device_id)
+        interface = device.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+        return cast(interface, POINTER(IAudioEndpointVolume))
+
+    def get_mute(self, endpoint) -> bool:
+        return bool(endpoint.GetMute())
+
+    def set_mute(self, endpoint, muted: bool) -> None:
+        endpoint.SetMute(int(muted), None)
+
+
+class StubBackend:
+    """In-memory endpoints: {device_id: muted}. `delay` is added to every call,
+    `open_delay` to opening an endpoint (Activate is the expensive part)."""
+
+    def __init__(self, devices: dict | None = None, delay: float = 0.0, open_delay: float = 0.0):
+        self.devices = dict(devices if devices is not None else {'speakers': False})
+        self.delay = delay
+        self.open_delay = open_delay
+        self.opens = 0
+        self.calls = 0
+        self._on_change = None
+        self._lock = threading.Lock()
+
+    def _call(self, extra: float = 0.0):
+        with self._lock:
+            self.calls += 1
+        if self.delay or extra:
+            time.sleep(self.delay + extra)
+
+    def init_thread(self) -> None:
+        pass
+
+    def watch(self, on_change) -> None:
+        self._on_change = on_change
+
+    def unwatch(self) -> None:
+        self._on_change = None
+
+    def render_devices(self) -> list:
+        self._call()
+        return list(self.devices)
+
+    def open(self, device_id: str):
+        self._call(self.open_delay)
+        if device_id not in self.devices:
+            raise OSError(f'no such device: {device_id}')
+        with self._lock:
+            self.opens += 1
+        return device_id
+
+    def get_mute(self, endpoint) -> bool:
+        self._call()
+        return self.devices[endpoint]
+
+    def set_mute(self, endpoint, muted: bool) -> None:
+        self._call()
+        self.devices[endpoint] = muted
+
+    def plug(self, device_id: str, muted: bool = False) -> None:
+        """Simulate a device being added (and the notification Windows sends)."""
+        self.devices[device_id] = muted
+        if self._on_change is not None:
+            self._on_change(device_id)
+
+    def unplug(self, device_id: str) -> None:
+        self.devices.pop(device_id, None)
+        if self._on_change is not None:
+            self._on_change(device_id)
+
+
+class AudioController:
+    """Mutes every active render endpoint and restores each to its own previous state."""
+
+    def __init__(self, backend=None, workers: int = WORKERS):
+        self.backend = backend
+        self.workers = workers
+        self.opened = 0
+        self.invalidations = 0
+        self._pool: ThreadPoolExecutor | None = None
+        self._watching = False
+        self._devices: list | None = None  # active render device ids, while notifications arrive
+        self._endpoints: dict = {}  # device id -> volume interface
+        self._saved: dict = {}  # device id -> muted before the first mute_all() since the last restore
+        self._lock = threading.Lock()
+
+    def _start(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is not None:
+                return self._pool
+            if self.backend is None:
+                self.backend = PycawBackend()
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='audio',
+                                            initializer=self.backend.init_thread)
+            pool = self._pool
+        try:
+            pool.submit(self.backend.watch, self.invalidate).result()
+            self._watching = True
+        except Exception:
+            pass  # no notifications: the device list is re-read every time
+        return pool
+
+    def invalidate(self, device_id: str | None = None) -> None:
+        """Forget the device list and the endpoint of `device_id` (device change notification)."""
+        with self._lock:
+            self.invalidations += 1
+            self._devices = None
+            if device_id is not None:
+                self._endpoints.pop(device_id, None)
+
+    def _render_devices(self, pool) -> list:
+        with self._lock:
+            if self._devices is not None:
+                return self._devices
+        devices = pool.submit(self.backend.render_devices).result()
+        if self._watching:
+            with self._lock:
+                self._devices = devices
+        return devices
+
+    def _with_endpoint(self, device_id: str, fn):
+        with self._lock:
+            endpoint = self._endpoints.get(device_id)
+        if endpoint is not None:
+            try:
+                return fn(endpoint)
+            except Exception:
+                pass  # stale interface (device gone and back): open it again
+        endpoint = self.backend.open(device_id)
+        with self._lock:
+            self._endpoints[device_id] = endpoint
+            self.opened += 1
+        return fn(endpoint)
+
+    def _mute_one(self, device_id: str) -> bool:
+        def mute(endpoint):
+            was_muted = self.backend.get_mute(endpoint)
+            with self._lock:
+                self._saved.setdefault(device_id, was_muted)
+            if was_muted:
+                return False
+            self.backend.set_mute(endpoint, True)
+            return True
+        try:
+            return self._with_endpoint(device_id, mute)
+        except Exception:
+            return False
+
+    def _unmute_one(self, device_id: str) -> bool:
+        try:
+            self._with_endpoint(device_id, lambda endpoint: self.backend.set_mute(endpoint, False))
+            return True
+        except Exception:
+            return False  # unplugged while locked
+
+    def mute_all(self) -> int:
+        """Mute every active render endpoint; returns how many this call muted."""
+        pool = self._start()
+        return sum(pool.map(self._mute_one, self._render_devices(pool)))
+
+    def restore_all(self) -> int:
+        """Unmute the endpoints mute_all() muted; returns how many were unmuted."""
+        with self._lock:
+            saved, self._saved = self._saved, {}
+        to_unmute = [device_id for device_id, was_muted in saved.items() if not was_muted]
+        if not to_unmute:
+            return 0
+        return sum(self._start().map(self._unmute_one, to_unmute))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"devices": None if self._devices is None else len(self._devices),
+                    "endpoints": len(self._endpoints), "opened": self.opened,
+                    "invalidations": self.invalidations, "watching": self._watching,
+                    "saved": len(self._saved)}
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._endpoints.clear()
+            self._devices = None
+        if pool is None:
+            return
+        if self._watching:
+            try:
+                pool.submit(self.backend.unwatch).result(1.0)
+            except Exception:
+                pass
+            self._watching = False
+        pool.shutdown(wait=False)
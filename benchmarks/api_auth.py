@@ -0,0 +1,125 @@
+"""
+Benchmark: authenticated API throughput with password vs. session token auth.
+
+Starts the REST API on an ephemeral port with a stub Locker and a password
+using the default KDF settings, then hammers POST /api/unlock (a no-op while
+unlocked) from several client threads. Also times a three-step workflow as
+separate password-authenticated calls vs. one POST /api/batch.
+
+    python benchmarks/api_auth.py [--seconds 5] [--clients 4]
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PASSWORD = 'benchmark-password'
+
+
+class StubState:
+    def __init__(self, active=False):
+        self.active = active
+
+
+class StubLocker:
+    state = StubState()
+
+    def lock_now(self, reason='manual', start=None, end=None):
+        self.state = StubState(True)
+        return self.state
+
+    def unlock_now(self):
+        self.state = StubState(False)
+        return self.state
+
+
+def _request(port: int, method: str, path: str, headers: dict | None = None, body: dict | None = None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    hdrs = dict(headers or {})
+    if data is not None:
+        hdrs['Content-Type'] = 'application/json'
+    conn.request(method, path, body=data, headers=hdrs)
+    resp = conn.getresponse()
+    payload = resp.read()
+    conn.close()
+    return resp.status, payload
+
+
+def run(port: int, headers: dict, seconds: float, clients: int) -> float:
+    count = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        nonlocal count
+        n = 0
+        while time.perf_counter() < deadline:
+            status, _ = _request(port, 'POST', '/api/unlock', headers)
+            assert status == 200, status
+            n += 1
+        with lock:
+            count += n
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return count / (time.perf_counter() - start)
+
+
+def workflow(port: int, rounds: int = 5) -> tuple[float, float]:
+    """Seconds per 3-step workflow: three authenticated calls vs. one batch."""
+    auth = {'Authorization': f'Bearer {PASSWORD}'}
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for _ in range(3):
+            status, _ = _request(port, 'POST', '/api/unlock', auth)
+            assert status == 200, status
+    separate = (time.perf_counter() - t0) / rounds
+    ops = {"ops": [{"op": "unlock"}, {"op": "unlock"}, {"op": "status"}]}
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        status, _ = _request(port, 'POST', '/api/batch', auth, ops)
+        assert status == 200, status
+    return separate, (time.perf_counter() - t0) / rounds
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=float, default=5.0)
+    ap.add_argument('--clients', type=int, default=4)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LOCALAPPDATA'] = tmp
+        import config
+        from api import ApiServer
+        config.set_password(PASSWORD)
+        server = ApiServer(StubLocker(), '127.0.0.1', 0).start()
+        port = server.address[1]
+        try:
+            status, body = _request(port, 'POST', '/api/session', body={"password": PASSWORD})
+            token = json.loads(body)['token']
+            pw_rps = run(port, {'Authorization': f'Bearer {PASSWORD}'}, args.seconds, args.clients)
+            tok_rps = run(port, {'Authorization': f'Bearer {token}'}, args.seconds, args.clients)
+            separate, batched = workflow(port)
+        finally:
+            server.stop()
+    print(f'password auth : {pw_rps:9.1f} req/s')
+    print(f'session token : {tok_rps:9.1f} req/s   (x{tok_rps / pw_rps:.1f})')
+    print(f'3-step workflow: {separate * 1000:7.1f} ms as separate calls, {batched * 1000:7.1f} ms as one batch '
+          f'(x{separate / batched:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Load test: GET /api/status on the threading vs. the asyncio API engine.
+
+For each engine, opens `--idle` connections that never send a request (slow
+clients / idle dashboards), then runs `--clients` threads that poll
+/api/status over reused connections. Reports throughput, latency
+percentiles and how many threads the server process grew.
+
+    python benchmarks/api_load.py [--seconds 5] [--clients 16] [--idle 100]
+"""
+import argparse
+import http.client
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_auth import StubLocker  # noqa: E402
+
+
+def _poll(port: int, deadline: float, latencies: list, errors: list):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    local = []
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                conn.request('GET', '/api/status')
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    errors.append(resp.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(type(e).__name__)
+                conn.close()
+                continue
+            local.append(time.perf_counter() - t0)
+    finally:
+        conn.close()
+    latencies.extend(local)
+
+
+def run(engine: str, seconds: float, clients: int, idle: int) -> dict:
+    from api import ApiServer
+    base_threads = threading.active_count()
+    server = ApiServer(StubLocker(), '127.0.0.1', 0, engine=engine).start()
+    port = server.address[1]
+    idle_socks = []
+    try:
+        for _ in range(idle):
+            idle_socks.append(socket.create_connection(('127.0.0.1', port)))
+        time.sleep(0.2)
+        idle_threads = threading.active_count() - base_threads
+        latencies: list = []
+        errors: list = []
+        deadline = time.perf_counter() + seconds
+        workers = [threading.Thread(target=_poll, args=(port, deadline, latencies, errors)) for _ in range(clients)]
+        peak = 0
+        start = time.perf_counter()
+        for t in workers:
+            t.start()
+        while any(t.is_alive() for t in workers):
+            peak = max(peak, threading.active_count() - base_threads - clients)
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+    finally:
+        for s in idle_socks:
+            s.close()
+        server.stop()
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": pct(0.50),
+        "p99": pct(0.99),
+        "errors": len(errors),
+        "idle_threads": idle_threads,
+        "peak_threads": peak,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=float, default=5.0)
+    ap.add_argument('--clients', type=int, default=16)
+    ap.add_argument('--idle', type=int, default=100)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LOCALAPPDATA'] = tmp
+        print(f'{args.clients} polling clients, {args.idle} idle connections, {args.seconds:g} s per engine')
+        print(f'{"engine":<10} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7} {"threads idle":>13} {"peak":>6}')
+        for engine in ('threading', 'asyncio'):
+            r = run(engine, args.seconds, args.clients, args.idle)
+            print(f'{engine:<10} {r["rps"]:9.1f} {r["p50"]:8.2f} {r["p99"]:8.2f} {r["errors"]:7d} '
+                  f'{r["idle_threads"]:13d} {r["peak_threads"]:6d}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: time the lock path spends muting and restoring audio.
+
+Compares the old approach (new enumerator and default-speaker endpoint on
+every call, one device) with audio.AudioController (cached endpoints, all
+render devices in parallel) on audio.StubBackend with simulated Core Audio
+latencies. Also plugs a headset in between locks to check that the device
+change notification gets it muted on the next lock. Works on Linux.
+
+    python benchmarks/audio_mute.py [-n 50] [--devices 1 3 5] [--call-ms 1] [--open-ms 8]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio import AudioController, StubBackend  # noqa: E402
+
+
+def legacy(backend: StubBackend, prev: list):
+    # Old Locker._mute_system/_restore_audio: enumerator + Activate per call, default speaker only
+    def mute():
+        endpoint = backend.open(backend.render_devices()[0])
+        current = backend.get_mute(endpoint)
+        if prev[0] is None:
+            prev[0] = current
+        if not current:
+            backend.set_mute(endpoint, True)
+
+    def restore():
+        if prev[0] is None:
+            return
+        endpoint = backend.open(backend.render_devices()[0])
+        backend.set_mute(endpoint, prev[0])
+        prev[0] = None
+
+    return mute, restore
+
+
+def measure(mute, restore, n: int):
+    mutes, restores = [], []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        mute()
+        t1 = time.perf_counter()
+        restore()
+        mutes.append((t1 - t0) * 1000)
+        restores.append((time.perf_counter() - t1) * 1000)
+    return mutes, restores
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=50, help='lock/unlock cycles')
+    ap.add_argument('--devices', type=int, nargs='+', default=[1, 3, 5])
+    ap.add_argument('--call-ms', type=float, default=1.0, help='simulated GetMute/SetMute/enumerate time')
+    ap.add_argument('--open-ms', type=float, default=8.0, help='simulated enumerator + Activate time')
+    args = ap.parse_args()
+
+    print(f'{"devices":>7} {"approach":<11} {"muted":>5} {"mute ms":>9} {"first":>8} {"restore ms":>11} {"opens":>6}')
+    for count in args.devices:
+        devices = {f'device{i}': False for i in range(count)}
+        for name in ('legacy', 'controller'):
+            backend = StubBackend(devices, delay=args.call_ms / 1000, open_delay=args.open_ms / 1000)
+            if name == 'legacy':
+                mute, restore = legacy(backend, [None])
+                controller = None
+            else:
+                controller = AudioController(backend)
+                mute, restore = controller.mute_all, controller.restore_all
+            t0 = time.perf_counter()
+            mute()
+            first = (time.perf_counter() - t0) * 1000
+            muted = sum(backend.devices.values())
+            restore()
+            mutes, restores = measure(mute, restore, args.n)
+            print(f'{count:>7} {name:<11} {muted:>5} {statistics.median(mutes):>9.2f} '
+                  f'{first:>8.2f} {statistics.median(restores):>11.2f} {backend.opens:>6}')
+            if controller is not None:
+                controller.close()
+
+    # Headset plugged in while unlocked: the notification drops the cached device list
+    backend = StubBackend({'speakers': False}, delay=args.call_ms / 1000, open_delay=args.open_ms / 1000)
+    controller = AudioController(backend)
+    controller.mute_all()
+    controller.restore_all()
+    backend.plug('usb-headset')
+    controller.mute_all()
+    muted = sorted(d for d, m in backend.devices.items() if m)
+    controller.restore_all()
+    unmuted = not any(backend.devices.values())
+    print(f'hot-plug: muted {muted}, all restored: {unmuted}, {controller.stats()}')
+    controller.close()
+
+
+if __name__ == '__main__':
+    main()
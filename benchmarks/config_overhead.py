@@ -0,0 +1,77 @@
+"""
+Microbenchmark: per-call overhead of load_config() and verify_password().
+
+Compares the previous implementation (parse config.json and mkdir the app dir
+on every call) with the cached Config snapshot. The password record uses a
+single PBKDF2 iteration so the numbers show call overhead, not KDF cost.
+
+    python benchmarks/config_overhead.py [-n 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+from hashlib import pbkdf2_hmac
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _legacy_app_dir() -> Path:
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('APPDATA') or os.path.expanduser('~')
+    p = Path(base) / 'PC-Lock'
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+
+def legacy_load_config() -> dict:
+    from config import _default_config
+    cfg_path = _legacy_app_dir() / 'config.json'
+    with open(cfg_path, 'r', encoding='utf-8') as f:
+        cfg = json.load(f)
+    d = _default_config()
+    d.update(cfg)
+    d["password"].update(cfg.get("password", {}))
+    d["api"].update(cfg.get("api", {}))
+    return d
+
+
+def legacy_verify_password(password: str) -> bool:
+    pwcfg = legacy_load_config().get('password', {})
+    salt = bytes.fromhex(pwcfg['salt'])
+    calc = pbkdf2_hmac('sha256', password.encode('utf-8'), salt, int(pwcfg.get('iterations', 200_000)))
+    return calc.hex() == pwcfg['hash']
+
+
+def _report(name: str, old: float, new: float, n: int):
+    print(f'{name:<18} old {old / n * 1e6:9.2f} us/call   new {new / n * 1e6:9.2f} us/call   x{old / new:6.1f}')
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=20_000, help='calls per measurement')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LOCALAPPDATA'] = tmp
+        import config
+        salt = os.urandom(16)
+        pw = config.PasswordConfig(salt=salt.hex(), hash=pbkdf2_hmac('sha256', b'secret', salt, 1).hex(), iterations=1)
+        # Match the KDF target to the record so verify_password does not rehash it
+        kdf = config.KdfConfig(iterations=1)
+        config.save_config(config.get_config().replace(password=pw, kdf=kdf))
+        config._config_file().flush()  # the legacy reader goes straight to the file
+
+        assert legacy_load_config() == config.load_config()
+        n = args.n
+        _report('load_config', timeit.timeit(legacy_load_config, number=n), timeit.timeit(config.load_config, number=n), n)
+        _report('get_config', timeit.timeit(legacy_load_config, number=n), timeit.timeit(config.get_config, number=n), n)
+        _report('verify_password',
+                timeit.timeit(lambda: legacy_verify_password('secret'), number=n),
+                timeit.timeit(lambda: config.verify_password('secret'), number=n), n)
+
+
+if __name__ == '__main__':
+    main()
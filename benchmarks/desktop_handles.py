@@ -0,0 +1,92 @@
+"""
+Benchmark: desktop handles held after many lock/unlock cycles.
+
+Compares the old per-transition pattern (open/create the lock desktop on
+every lock and leak it; open, switch and close Default on every unlock) with
+desktop.DesktopManager, both against desktop.FakeU32, and reports open
+handles and user32 calls per cycle. Then runs the real Locker for a few
+cycles with the fake lockscreen child from tests/fakes.py and checks that it
+never holds more than the two cached handles. Works on Linux.
+
+    python benchmarks/desktop_handles.py [-n 1000] [--call-us 20] [--locker-cycles 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import desktop  # noqa: E402
+from tests.fakes import FAKE_CHILD, stub_desktop  # noqa: E402
+
+
+def legacy(fake, n: int) -> float:
+    desktop.U32 = desktop.K32 = fake
+    t0 = time.perf_counter()
+    for _ in range(n):
+        desktop.create_or_open_desktop(desktop.LOCK_DESKTOP)  # leaked, as Locker.lock_now did
+        desktop.switch_desktop(desktop.open_desktop(desktop.LOCK_DESKTOP))  # child attaches (own process)
+        hdef = desktop.open_desktop(desktop.DEFAULT_DESKTOP)
+        desktop.switch_desktop(hdef)
+        desktop.close_desktop(hdef)
+    return time.perf_counter() - t0
+
+
+def managed(fake, n: int) -> float:
+    manager = desktop.DesktopManager(fake)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        manager.lock_desktop()
+        manager.switch_to(desktop.LOCK_DESKTOP)
+        manager.switch_to(desktop.DEFAULT_DESKTOP)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=1000, help='lock/unlock cycles for the comparison')
+    ap.add_argument('--call-us', type=float, default=20.0, help='simulated cost of a user32 call')
+    ap.add_argument('--locker-cycles', type=int, default=5)
+    args = ap.parse_args()
+
+    print(f'{"pattern":<10} {"open handles":>12} {"calls/cycle":>12} {"us/cycle":>10}')
+    for name, run in (('legacy', legacy), ('manager', managed)):
+        fake = desktop.FakeU32(args.call_us / 1e6)
+        elapsed = run(fake, args.n)
+        calls = sum(fake.calls.values())
+        print(f'{name:<10} {len(fake.live):>12} {calls / args.n:>12.2f} {elapsed / args.n * 1e6:>10.1f}')
+
+    os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='pclock-bench-')
+    fake = stub_desktop(args.call_us / 1e6)
+    from main import Locker
+    child = FAKE_CHILD.format(root=str(ROOT), import_s=0.0, switch_s=0.0, map_s=0.0)
+
+    class StubLocker(Locker):
+        def _mute_system(self):
+            pass
+
+        def _restore_audio(self):
+            pass
+
+        def _child_command(self, reason, start, end, standby=False):
+            return [sys.executable, '-c', child] + (['--standby'] if standby else [])
+
+    locker = StubLocker()
+    most = 0
+    for _ in range(args.locker_cycles):
+        locker.lock_now()
+        most = max(most, len(fake.live))
+        locker.unlock_now()
+        most = max(most, len(fake.live))
+    stats = desktop.manager.stats()
+    locker.close()
+    print(f'Locker x{args.locker_cycles}: at most {most} handles open, {stats}, '
+          f'{len(fake.live)} left after close()')
+
+
+if __name__ == '__main__':
+    main()
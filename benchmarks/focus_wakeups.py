@@ -0,0 +1,59 @@
+"""
+Benchmark: wakeups and focus-steal correction time of the locked screen.
+
+Simulates a night on the lock screen with a virtual clock standing in for
+Tk's after(), and compares the old loop (lift() + focus_force() on every
+window every 800 ms) with focus.FocusGuard. Focus steals arrive at random
+times; most come with the <FocusOut> Tk sends, some (--silent) are only
+found by the fallback timer. Exits non-zero if FocusGuard wakes up more than
+--max-wakeups-per-hour, makes more window calls than the old loop, or
+corrects any steal (reported or not) slower than the old loop's 800 ms.
+Works without a display.
+
+    python benchmarks/focus_wakeups.py [--hours 8] [--steals 40] [--silent 0.1] [--windows 2]
+"""
+import argparse
+import random
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tests.fakes import OLD_INTERVAL_MS, simulate  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--hours', type=float, default=8.0)
+    ap.add_argument('--steals', type=int, default=40)
+    ap.add_argument('--silent', type=float, default=0.1, help='share of steals without a Tk event')
+    ap.add_argument('--windows', type=int, default=2, help='monitors')
+    ap.add_argument('--max-wakeups-per-hour', type=float, default=5000.0)
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    span_ms = int(args.hours * 3600 * 1000)
+    steals = sorted((rng.randrange(span_ms), rng.random() < args.silent) for _ in range(args.steals))
+
+    print(f'{"loop":<6} {"wakeups/h":>10} {"window calls/h":>15} {"steal->fixed median":>20} {"max (event)":>12} {"max (silent)":>13}')
+    results = {}
+    for mode in ('old', 'guard'):
+        wakeups, calls, latencies = simulate(mode, steals, args.windows, args.hours)
+        evented = [ms for ms, silent in latencies if not silent] or [0]
+        silent = [ms for ms, s in latencies if s] or [0]
+        results[mode] = (wakeups / args.hours, calls / args.hours, max(evented), max(silent))
+        print(f'{mode:<6} {wakeups / args.hours:>10.0f} {calls / args.hours:>15.0f} '
+              f'{statistics.median(ms for ms, _ in latencies):>17.0f} ms {max(evented):>9} ms {max(silent):>10} ms')
+
+    per_hour, calls, worst, worst_silent = results['guard']
+    ok = (per_hour <= args.max_wakeups_per_hour and calls < results['old'][1]
+          and worst < OLD_INTERVAL_MS and worst_silent <= OLD_INTERVAL_MS)
+    print(f'wakeup check: {per_hour:.0f}/h (limit {args.max_wakeups_per_hour:.0f}), {calls:.0f} window calls/h, '
+          f'steals fixed within {worst} ms (reported) / {worst_silent} ms (silent): ' + ('OK' if ok else 'FAILED'))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: hundreds of concurrent lock_now/unlock_now calls against one Locker.
+
+Runs the real Locker with the stubbed desktop/audio backend and the fake
+lockscreen child from tests/fakes.py. Every thread fires a random mix of lock
+and unlock requests at the same time. Checks that exactly one child was
+spawned per lock transition, that no child was ever spawned while another
+lock was active, and that every call returned the state it asked for. Also
+reports how many requests were coalesced into an identical one.
+
+    python benchmarks/lock_stress.py [--threads 200] [--calls 5] [--child-import-ms 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tests.fakes import FAKE_CHILD, stub_desktop  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--threads', type=int, default=200)
+    ap.add_argument('--calls', type=int, default=5, help='requests per thread')
+    ap.add_argument('--child-import-ms', type=float, default=50.0)
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+
+    os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='pclock-bench-')
+    stub_desktop(0.002)
+    import events
+    import main as app
+
+    child = FAKE_CHILD.format(root=str(ROOT), import_s=args.child_import_ms / 1000,
+                              switch_s=0.005, map_s=0.01)
+    spawns = []
+    overlaps = []
+    transitions = {"locked": 0, "unlocked": 0}
+
+    class StubLocker(app.Locker):
+        def _mute_system(self):
+            pass
+
+        def _restore_audio(self):
+            pass
+
+        def _child_command(self, reason, start, end, standby=False):
+            if self.state.active:
+                overlaps.append(self.state.process.pid)
+            spawns.append(time.perf_counter())
+            return [sys.executable, '-c', child]
+
+    def count(event):
+        if event.kind in transitions:
+            transitions[event.kind] += 1
+
+    events.bus.subscribe(count)
+    locker = StubLocker()
+    rng = random.Random(args.seed)
+    plans = [[rng.choice(('lock', 'unlock')) for _ in range(args.calls)] for _ in range(args.threads)]
+    results, errors = [], []
+    start = threading.Barrier(args.threads + 1)
+
+    def worker(plan):
+        start.wait()
+        for kind in plan:
+            try:
+                state = locker.lock_now() if kind == 'lock' else locker.unlock_now()
+                results.append((kind, state.active))
+            except Exception as e:
+                errors.append(repr(e))
+
+    threads = [threading.Thread(target=worker, args=(p,)) for p in plans]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    if locker.state.active:
+        locker.unlock_now()
+    time.sleep(0.2)  # let the bus deliver the last events
+
+    requests = args.threads * args.calls
+    wrong = sum(1 for kind, active in results if active != (kind == 'lock'))
+    print(f'requests: {requests} from {args.threads} threads in {elapsed:.2f} s')
+    print(f'lock transitions: {transitions["locked"]}, children spawned: {len(spawns)}, '
+          f'spawned while locked: {len(overlaps)}')
+    print(f'coalesced: {app.COALESCED.value()}, errors: {len(errors)}, '
+          f'results not matching their request: {wrong}')
+    ok = (len(spawns) == transitions['locked'] and not overlaps and not errors
+          and len(results) == requests and not wrong)
+    print('exactly-once spawning, every caller gets its own outcome: ' + ('OK' if ok else 'FAILED'))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: where lock_now/unlock_now spend their time, per phase.
+
+Runs the real Locker with a stubbed desktop and audio backend (fixed delays
+instead of Win32/Core Audio calls) and a fake lockscreen child that reports its
+milestones like lockscreen.py does, then prints the median of every traced
+phase. With --standby the child is pre-started (as the scheduler does before
+a window) and lock_now only has to show it. Works on Linux.
+
+    python benchmarks/lock_trace.py [-n 20] [--child-import-ms 300] [--standby] [--dump traces.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tests.fakes import FAKE_CHILD, stub_desktop  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=20, help='lock/unlock cycles')
+    ap.add_argument('--child-import-ms', type=float, default=300.0)
+    ap.add_argument('--audio-ms', type=float, default=2.0, help='stub time per Core Audio call')
+    ap.add_argument('--audio-devices', type=int, default=2, help='stub output devices')
+    ap.add_argument('--desktop-ms', type=float, default=2.0, help='stub desktop call time')
+    ap.add_argument('--standby', action='store_true', help='pre-start the child before each lock')
+    ap.add_argument('--dump', metavar='FILE', help='also write the raw traces as JSON')
+    args = ap.parse_args()
+
+    os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='pclock-bench-')
+    stub_desktop(args.desktop_ms / 1000)
+    import tracing
+    from audio import AudioController, StubBackend
+    from main import Locker
+
+    child = FAKE_CHILD.format(root=str(ROOT), import_s=args.child_import_ms / 1000,
+                              switch_s=0.005, map_s=0.05)
+
+    class StubLocker(Locker):
+        def _child_command(self, reason, start, end, standby=False):
+            return [sys.executable, '-c', child] + (['--standby'] if standby else [])
+
+    locker = StubLocker()
+    locker.audio = AudioController(StubBackend({f'device{i}': False for i in range(args.audio_devices)},
+                                               delay=args.audio_ms / 1000, open_delay=5 * args.audio_ms / 1000))
+    tracing.tracer = tracing.Tracer(size=2 * args.n)
+    for _ in range(args.n):
+        if args.standby:
+            locker.prepare_standby()
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and not locker.standby.stats()['ready']:
+                time.sleep(0.01)
+        locker.lock_now()
+        trace = locker.trace
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and not any(s[0] == 'mapped' for s in trace.spans):
+            time.sleep(0.005)
+        locker.unlock_now()
+
+    phases = defaultdict(list)
+    for t in tracing.tracer.recent():
+        phases[(t['name'], '(total)')].append(t['duration_ms'])
+        for s in t['spans']:
+            phases[(t['name'], s['name'])].append(s.get('duration_ms', s.get('at_ms')))
+    print(f'{"trace":<8} {"phase":<16} {"median ms":>10} {"max ms":>10}')
+    for (name, phase), values in phases.items():
+        print(f'{name:<8} {phase:<16} {statistics.median(values):10.2f} {max(values):10.2f}')
+    print('(marks reported by the child show ms since lock_now started)')
+    if locker.standby is not None:
+        print(f'standby: {locker.standby.stats()}')
+        locker.standby.close()
+    if args.dump:
+        Path(args.dump).write_text(json.dumps(tracing.tracer.recent(), indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: lock screen event loop responsiveness while passwords are checked.
+
+Runs a real Tcl event loop (tkinter.Tcl(), no display needed) with a 10 ms
+ticker standing in for redraws and heartbeats, and enters a few wrong
+passwords and then the right one against a real config (PBKDF2, 200k
+iterations by default):
+
+- inline: config.verify_password on the loop thread, as the lock screen did;
+- worker: the LockScreen path: KdfPool.submit, the result posted back with
+  after(), the next attempt allowed once the backoff has passed. One attempt
+  is also made too early to check it is refused without running the KDF.
+
+Reports the longest gap between ticks. Exits non-zero if the worker path
+ever stalls the loop for more than --max-gap-ms.
+
+    python benchmarks/lockscreen_verify.py [--wrong 3] [--max-gap-ms 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tests.fakes import run_loop  # noqa: E402
+
+PASSWORD = 'benchmark-password'
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--wrong', type=int, default=3, help='wrong passwords before the right one')
+    ap.add_argument('--max-gap-ms', type=float, default=100.0)
+    args = ap.parse_args()
+
+    os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='pclock-bench-')
+    from config import set_password, verify_password
+    from kdf_pool import Busy, KdfPool
+    set_password(PASSWORD)
+    attempts = ['wrong'] * args.wrong + [PASSWORD]
+
+    def inline(loop, done):
+        for pwd in attempts:
+            verify_password(pwd)
+        done()
+
+    pool = KdfPool(workers=1, max_queue=0, verify=verify_password)
+    log = []
+
+    def worker(loop, done):
+        pending = list(attempts)
+
+        def attempt():
+            pwd = pending[0]
+            try:
+                future = pool.submit(pwd, client='lockscreen')
+            except Busy as e:
+                log.append(f'refused ({e.reason}, retry in {e.retry_after} s)')
+                loop.after(int(pool.retry_after('lockscreen') * 1000) + 1, attempt)
+                return
+            pending.pop(0)
+            future.add_done_callback(lambda f: loop.after(0, verified, f))
+
+        def verified(future):
+            if future.result():
+                log.append('unlocked')
+                done()
+                return
+            wait = pool.retry_after('lockscreen')
+            log.append(f'wrong, next try in {wait:.1f} s')
+            if len(log) == 1:
+                loop.after(0, attempt)  # too early: must be refused at once
+            else:
+                loop.after(int(wait * 1000) + 1, attempt)
+
+        attempt()
+
+    print(f'{"mode":<7} {"max tick gap":>13} {"ticks":>6} {"seconds":>8}')
+    results = {}
+    for name, start in (('inline', inline), ('worker', worker)):
+        gap, ticks, seconds = run_loop(start)
+        results[name] = gap
+        print(f'{name:<7} {gap:>10.1f} ms {ticks:>6} {seconds:>8.2f}')
+    print('worker attempts: ' + '; '.join(log))
+    ok = results['worker'] <= args.max_gap_ms and log[-1] == 'unlocked' and any(e.startswith('refused') for e in log)
+    print(f'responsiveness check (max gap <= {args.max_gap_ms:.0f} ms, early attempt refused): '
+          + ('OK' if ok else 'FAILED'))
+    pool.shutdown()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Microbenchmark: cost of metrics updates on the hot path.
+
+Compares the per-thread sharded Counter/Histogram in metrics.py with a plain
+lock-protected counter, single-threaded and from several threads at once.
+
+    python benchmarks/metrics_overhead.py [-n 200000] [--threads 8]
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import metrics  # noqa: E402
+
+
+class LockedCounter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+def _per_call(fn, n: int, threads: int) -> float:
+    def work():
+        for _ in range(n):
+            fn()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return (time.perf_counter() - t0) / (n * threads) * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=200_000, help='updates per thread')
+    ap.add_argument('--threads', type=int, default=8)
+    args = ap.parse_args()
+
+    counter = metrics.counter('bench_total', 'benchmark counter', ('route',)).labels('/api/status')
+    hist = metrics.histogram('bench_seconds', 'benchmark histogram')
+    locked = LockedCounter()
+    for threads in (1, args.threads):
+        print(f'{threads} thread(s):')
+        print(f'  locked counter    {_per_call(locked.inc, args.n, threads):7.1f} ns/update')
+        print(f'  sharded counter   {_per_call(counter.inc, args.n, threads):7.1f} ns/update')
+        print(f'  histogram.observe {_per_call(lambda: hist.observe(0.004), args.n, threads):7.1f} ns/update')
+    assert counter.value() == args.n * (1 + args.threads)
+    t0 = time.perf_counter()
+    metrics.render()
+    print(f'render(): {(time.perf_counter() - t0) * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
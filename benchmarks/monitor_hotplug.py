@@ -0,0 +1,140 @@
+"""
+Benchmark: lock window work when displays change while locked, and at startup.
+
+Drives monitors.MonitorWatcher with monitors.FakeProvider through a series of
+display changes (plug a monitor in, change a resolution, swap the primary,
+unplug) and counts the window operations each strategy needs:
+
+- rebuild: destroy every lock window and build one per display again;
+- diff: monitors.diff() + monitors.apply(), as LockScreen does.
+
+After every step the windows are checked against the fake displays. Also
+times building the first topology from a slow display enumeration
+(--enum-ms, standing in for importing screeninfo and asking Windows) against
+reading the cached one. Exits non-zero if the diff ever leaves the wrong
+windows or does more window work than the rebuild. Works without a display.
+
+    python benchmarks/monitor_hotplug.py [--enum-ms 40] [--build-ms 15]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='pclock-bench-')
+
+import monitors  # noqa: E402
+from monitors import FakeMonitor, FakeProvider, MonitorWatcher  # noqa: E402
+
+
+class Windows:
+    """Lock windows as {key: geometry}; counts operations, `build_ms` per window built."""
+
+    def __init__(self, build_ms: float):
+        self.build_ms = build_ms
+        self.windows = {}
+        self.ops = {"create": 0, "move": 0, "destroy": 0}
+
+    def create(self, m):
+        self.ops["create"] += 1
+        time.sleep(self.build_ms / 1000)
+        return m.geometry
+
+    def move(self, window, m):
+        self.ops["move"] += 1
+
+    def destroy(self, window):
+        self.ops["destroy"] += 1
+
+    def diff(self, topo, changes):
+        monitors.apply(self.windows, changes, self.create, self.move, self.destroy)
+        for m in changes.moved:
+            self.windows[m.key] = m.geometry
+
+    def rebuild(self, topo, changes):
+        for window in self.windows.values():
+            self.destroy(window)
+        self.windows = {m.key: self.create(m) for m in topo}
+
+    def matches(self, topo) -> bool:
+        return self.windows == {m.key: m.geometry for m in topo}
+
+
+STEPS = (
+    ('plug in a third display', lambda p: p.plug(FakeMonitor('DISPLAY3', 3840, 0, 1920, 1080))),
+    ('resolution change', lambda p: p.resize('DISPLAY2', 2560, 1440)),
+    ('swap primary', lambda p: p.set_primary('DISPLAY2')),
+    ('unplug a display', lambda p: p.unplug('DISPLAY3')),
+    ('nothing changed', lambda p: None),
+)
+
+
+def run(strategy: str, build_ms: float):
+    provider = FakeProvider(FakeMonitor('DISPLAY1', 0, 0, 1920, 1080, True),
+                            FakeMonitor('DISPLAY2', 1920, 0, 1920, 1080))
+    windows = Windows(build_ms)
+    watcher = MonitorWatcher(lambda ms, fn: None, lambda after_id: None,
+                             getattr(windows, strategy), provider=provider)
+    topo = monitors.current(provider)
+    windows.rebuild(topo, None)
+    watcher.start(topo)
+    rows = []
+    for name, change in STEPS:
+        change(provider)
+        before = dict(windows.ops)
+        t0 = time.perf_counter()
+        watcher.check()
+        ms = (time.perf_counter() - t0) * 1000
+        ops = {k: windows.ops[k] - before[k] for k in before}
+        rows.append((name, ops, ms, windows.matches(watcher.topology)))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--enum-ms', type=float, default=40.0, help='simulated display enumeration time')
+    ap.add_argument('--build-ms', type=float, default=15.0, help='simulated cost of building one window')
+    args = ap.parse_args()
+
+    print(f'{"step":<24} {"strategy":<8} {"create":>6} {"move":>5} {"destroy":>7} {"ms":>7}  windows')
+    ok = True
+    totals = {}
+    for strategy in ('rebuild', 'diff'):
+        totals[strategy] = 0
+        for name, ops, ms, right in run(strategy, args.build_ms):
+            totals[strategy] += sum(ops.values())
+            ok = ok and right
+            print(f'{name:<24} {strategy:<8} {ops["create"]:>6} {ops["move"]:>5} {ops["destroy"]:>7} '
+                  f'{ms:>7.1f}  {"OK" if right else "WRONG"}')
+    print(f'window operations: rebuild {totals["rebuild"]}, diff {totals["diff"]}')
+    ok = ok and totals['diff'] < totals['rebuild']
+
+    provider = FakeProvider(FakeMonitor('DISPLAY1', 0, 0, 1920, 1080, True),
+                            FakeMonitor('DISPLAY2', 1920, 0, 1920, 1080))
+
+    def slow_provider():
+        time.sleep(args.enum_ms / 1000)
+        return provider()
+
+    t0 = time.perf_counter()
+    topo = monitors.current(slow_provider)
+    enumerate_ms = (time.perf_counter() - t0) * 1000
+    monitors.save_cached(topo)
+    t0 = time.perf_counter()
+    cached = monitors.load_cached()
+    cached_ms = (time.perf_counter() - t0) * 1000
+    print(f'first topology: enumerate {enumerate_ms:.1f} ms, cached {cached_ms:.2f} ms')
+    ok = ok and cached == topo
+
+    print('hot-plug check (right windows after every change, less work than a rebuild, cache round trip): '
+          + ('OK' if ok else 'FAILED'))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
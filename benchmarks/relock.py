@@ -0,0 +1,85 @@
+"""
+Benchmark: time to relock after the lockscreen child crashes or hangs.
+
+Runs the real Locker with the stubbed desktop/audio backend and a fake
+child from tests/fakes.py. The first children crash (exit 3) or hang
+(stop heartbeating) shortly after they are shown; the watchdog has to put a
+new one up. Reports the time from the crash being noticed to the new child's
+first window, and from the crash itself (or the last heartbeat) to that
+window.
+
+    python benchmarks/relock.py [--crashes 5] [--mode crash|hang] [--child-import-ms 300]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tests.fakes import FAILING_CHILD, stub_desktop  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--crashes', type=int, default=5, help='children that fail before one stays up')
+    ap.add_argument('--mode', choices=['crash', 'hang'], default='crash')
+    ap.add_argument('--child-import-ms', type=float, default=300.0)
+    args = ap.parse_args()
+
+    os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='pclock-bench-')
+    stub_desktop(0.002)
+    import main as app
+    import tracing
+    # Keep the run short: no backoff between attempts, 1 s heartbeat timeout
+    app.RESPAWN_BACKOFF_BASE = 0.0
+    import ipc
+    ipc.HEARTBEAT_TIMEOUT = 1.0
+    ipc.HEARTBEAT_INTERVAL = 0.1
+
+    child = FAILING_CHILD.format(root=str(ROOT), import_s=args.child_import_ms / 1000)
+    spawned = []
+
+    class StubLocker(app.Locker):
+        def _mute_system(self):
+            pass
+
+        def _restore_audio(self):
+            pass
+
+        def _child_command(self, reason, start, end, standby=False):
+            spawned.append(time.perf_counter())
+            mode = args.mode if len(spawned) <= args.crashes else 'ok'
+            return [sys.executable, '-c', child, mode]
+
+    locker = StubLocker()
+    locker.lock_now()
+    deadline = time.monotonic() + 30 + args.crashes * 5
+    while len(spawned) <= args.crashes and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.5 + args.child_import_ms / 1000)
+    print(f'still locked: {locker.state.active}, children spawned: {len(spawned)}')
+
+    noticed, failed = [], []
+    previous = None
+    for trace in tracing.tracer.recent():
+        marks = {s['name']: trace['started_at'] + s['at_ms'] / 1000 for s in trace['spans'] if 'at_ms' in s}
+        if trace['name'] == 'relock' and 'mapped' in marks and previous is not None:
+            noticed.append((marks['mapped'] - trace['started_at']) * 1000)
+            if 'failing' in previous:
+                failed.append((marks['mapped'] - previous['failing']) * 1000)
+        previous = marks
+    locker.unlock_now()
+    if noticed:
+        print(f'relocks: {len(noticed)}')
+        print(f'  noticed -> mapped   median {statistics.median(noticed):8.1f} ms  max {max(noticed):8.1f} ms')
+        print(f'  {args.mode:<5} -> mapped     median {statistics.median(failed):8.1f} ms  max {max(failed):8.1f} ms')
+    print(f'counters: crashes={app.CRASHES.value()} restarts={app.RESTARTS.value()} hung={app.HUNG.value()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,180 @@
+import hashlib
+import hmac
+import math
 import os
-import json
+import threading
+import time
 from pathlib import Path
 from secrets import token_bytes
 from hashlib import pbkdf2_hmac
+from types import MappingProxyType
+
+from persist import AtomicFile, JsonCodec
+from watch import FileWatcher, Subscribers, freeze
 
 APP_NAME = 'PC-Lock'
 
+# Password KDF calibration bounds
+KDF_ALGOS = ('pbkdf2_sha256', 'scrypt')
+KDF_TARGET_MS = 250
+MIN_PBKDF2_ITERATIONS = 100_000
+MIN_SCRYPT_LOG2_N = 14
+# scrypt needs 128 * r * n bytes per check: 128 MiB at n = 2**17, r = 8. The API pool and the lock
+# screen can verify at the same time, so the cost is capped by memory, not just by time
+MAX_SCRYPT_LOG2_N = 17
+SCRYPT_MAXMEM = 128 * 8 * 2 ** MAX_SCRYPT_LOG2_N + (1 << 20)
+
+# Listeners receive the new Config snapshot after every save and after
+# external edits of config.json
+_subscribers = Subscribers()
+_watcher: FileWatcher | None = None
+_last_stamp: tuple | None = None  # stamp of the file as last written or published
+
+# Process-wide config snapshot, revalidated by file stamp and swapped on save
+_snapshot: tuple | None = None  # (stamp, Config)
+_snapshot_lock = threading.Lock()
+_app_dir: tuple | None = None  # (base, path) of the directory already created
+_files: dict = {}  # config path -> AtomicFile
+
+
+def _thaw(obj):
+    if isinstance(obj, (dict, MappingProxyType)):
+        return {k: _thaw(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_thaw(v) for v in obj]
+    return obj
+
+
+_TRUE = frozenset({'true', '1', 'yes', 'on'})
+_FALSE = frozenset({'false', '0', 'no', 'off'})
+
+def _to_bool(value) -> bool:
+    """Flag from config.json, which may be hand-edited: bool('false') would be True."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+    raise ValueError(f'not a boolean: {value!r}')
+
+
+class _Section:
+    """Frozen, slot-based settings record.
+
+    Subclasses list their fields in `__slots__` and `_defaults`. Keys we do not
+    know about are kept read-only in `extra` so that saving round-trips them.
+    """
+    __slots__ = ('extra',)
+    _defaults: dict = {}
+    _types: dict = {}
+
+    def __init__(self, **values):
+        extra = dict(values.pop('extra', None) or {})
+        for name, default in self._defaults.items():
+            value = values.pop(name, default)
+            conv = self._types.get(name)
+            if conv is not None and value is not None:
+                try:
+                    value = conv(value)
+                except Exception:
+                    value = default
+            object.__setattr__(self, name, value)
+        extra.update(values)
+        object.__setattr__(self, 'extra', freeze(extra))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        fields = ', '.join(f'{n}={getattr(self, n)!r}' for n in self._defaults)
+        return f'{type(self).__name__}({fields})'
+
+    @classmethod
+    def from_dict(cls, data) -> '_Section':
+        return cls(**(data if isinstance(data, dict) else {}))
+
+    def replace(self, **changes) -> '_Section':
+        values = {n: getattr(self, n) for n in self._defaults}
+        values['extra'] = self.extra
+        values.update(changes)
+        return type(self)(**values)
+
+    def to_dict(self) -> dict:
+        d = {}
+        for name in self._defaults:
+            value = getattr(self, name)
+            d[name] = value.to_dict() if isinstance(value, _Section) else value
+        for k, v in self.extra.items():
+            d.setdefault(k, _thaw(v))
+        return d
+
+
+class KdfConfig(_Section):
+    """Parameters used for new password hashes (see calibrate_kdf)."""
+    __slots__ = ('algo', 'iterations', 'n', 'r', 'p', 'target_ms')
+    _defaults = {"algo": "pbkdf2_sha256", "iterations": 200_000, "n": 2 ** 14, "r": 8, "p": 1,
+                 "target_ms": KDF_TARGET_MS}
+    _types = {"iterations": int, "n": int, "r": int, "p": int, "target_ms": int}
+
+
+class PasswordConfig(_Section):
+    # `generation` counts set_password() calls; a rehash keeps it, so listeners can tell the two apart
+    __slots__ = ('salt', 'hash', 'iterations', 'algo', 'n', 'r', 'p', 'generation')
+    _defaults = {"salt": None, "hash": None, "iterations": 200_000, "algo": "pbkdf2_sha256",
+                 "n": None, "r": None, "p": None, "generation": 0}
+    _types = {"iterations": int, "n": int, "r": int, "p": int, "generation": int}
+
+
+class ApiConfig(_Section):
+    __slots__ = ('enabled', 'host', 'port', 'kdf_workers', 'kdf_queue', 'engine')
+    _defaults = {"enabled": False, "host": "127.0.0.1", "port": 8765, "kdf_workers": 2, "kdf_queue": 8,
+                 "engine": "threading"}
+    _types = {"enabled": _to_bool, "host": str, "port": int, "kdf_workers": int, "kdf_queue": int, "engine": str}
+
+
+class StandbyConfig(_Section):
+    """Pre-started lockscreen child (see standby.py)."""
+    __slots__ = ('enabled', 'lead_minutes', 'idle_minutes')
+    _defaults = {"enabled": True, "lead_minutes": 3, "idle_minutes": 15}
+    _types = {"enabled": _to_bool, "lead_minutes": float, "idle_minutes": float}
+
+
+class Config(_Section):
+    __slots__ = ('hotkey', 'password', 'api', 'kdf', 'standby')
+    _defaults = {"hotkey": "ctrl+alt+u", "password": PasswordConfig(), "api": ApiConfig(), "kdf": KdfConfig(),
+                 "standby": StandbyConfig()}
+    _types = {"hotkey": str}
+
+    @classmethod
+    def from_dict(cls, data) -> 'Config':
+        data = dict(data) if isinstance(data, dict) else {}
+        data['password'] = PasswordConfig.from_dict(data.get('password'))
+        data['api'] = ApiConfig.from_dict(data.get('api'))
+        data['kdf'] = KdfConfig.from_dict(data.get('kdf'))
+        data['standby'] = StandbyConfig.from_dict(data.get('standby'))
+        return cls(**data)
+
+
 def get_app_dir() -> Path:
+    global _app_dir
     base = os.environ.get('LOCALAPPDATA') or os.environ.get('APPDATA') or os.path.expanduser('~')
+    cached = _app_dir
+    if cached is not None and cached[0] == base:
+        return cached[1]
     p = Path(base) / APP_NAME
     p.mkdir(parents=True, exist_ok=True)
+    _app_dir = (base, p)
     return p
 
 
@@ -18,83 +183,221 @@ def get_config_path() -> Path:
 
 
 def _default_config() -> dict:
-    return {
-        "hotkey": "ctrl+alt+u",
-        "password": {
-            "salt": None,
-            "hash": None,
-            "iterations": 200_000,
-            "algo": "pbkdf2_sha256",
-        },
-        "api": {
-            "enabled": False,
-            "host": "127.0.0.1",
-            "port": 8765,
-        }
-    }
+    return Config().to_dict()
 
 
-def load_config() -> dict:
-    cfg_path = get_config_path()
-    if not cfg_path.exists():
-        cfg = _default_config()
+def _config_file() -> AtomicFile:
+    path = get_config_path()
+    f = _files.get(path)
+    if f is None:
+        import settings_db
+        db = settings_db.get_db()
+        if db is not None:
+            f = db.document('config', JsonCodec(), settings_db.CONFIG_SECTIONS, on_commit=_committed)
+        else:
+            f = AtomicFile(path, JsonCodec(indent=2), on_commit=_committed)
+        f = _files.setdefault(path, f)
+    return f
+
+
+def _committed(obj, stamp) -> None:
+    # A coalesced save reached the disk: key the snapshot by the new stamp
+    global _snapshot, _last_stamp
+    with _snapshot_lock:
+        if _snapshot is not None and _snapshot[0] is None:
+            _snapshot = (stamp, _snapshot[1])
+        _last_stamp = stamp
+
+
+def get_config() -> Config:
+    """Return the process-wide config snapshot, re-reading config.json only when its stamp changed."""
+    global _snapshot
+    store = _config_file()
+    stamp = store.stamp()
+    cached = _snapshot
+    if cached is not None and (store.pending or (stamp is not None and cached[0] == stamp)):
+        return cached[1]
+    try:
+        cfg = Config.from_dict(store.read())
+    except FileNotFoundError:
+        cfg = Config()
         save_config(cfg)
         return cfg
-    try:
-        with open(cfg_path, 'r', encoding='utf-8') as f:
-            cfg = json.load(f)
     except Exception:
-        cfg = _default_config()
-    # ensure required keys
-    d = _default_config()
-    d.update(cfg)
-    # merge nested
-    pw = d["password"]
-    pw.update(cfg.get("password", {}))
-    api = d["api"]
-    api.update(cfg.get("api", {}))
-    return d
+        cfg = Config()
+    if stamp is None:
+        # Main file lost (e.g. crash between writes); restore it from the backup
+        save_config(cfg)
+        return cfg
+    with _snapshot_lock:
+        _snapshot = (stamp, cfg)
+    return cfg
+
+
+def load_config() -> dict:
+    """Legacy dict view of get_config(); the caller owns the returned dict."""
+    return get_config().to_dict()
+
+
+def save_config(cfg: 'dict | Config') -> None:
+    global _last_stamp, _snapshot
+    conf = cfg if isinstance(cfg, Config) else Config.from_dict(cfg)
+    store = _config_file()
+    store.path.parent.mkdir(parents=True, exist_ok=True)
+    with store.lock:
+        committed = store.write(conf.to_dict())
+        with _snapshot_lock:
+            # Until a coalesced write lands the snapshot is not keyed by a stamp
+            stamp = store.stamp() if committed else None
+            _snapshot = (stamp, conf)
+            if committed:
+                _last_stamp = stamp
+    _subscribers.publish(conf)
+
+
+def subscribe(callback) -> None:
+    """Call `callback(config)` with the new Config snapshot whenever it changes."""
+    global _watcher, _last_stamp
+    if _subscribers.add(callback) and _watcher is None:
+        store = _config_file()
+        _last_stamp = store.stamp()
+        _watcher = FileWatcher(store.watch_path, _check_external)
+        _watcher.start()
+
+
+def unsubscribe(callback) -> None:
+    _subscribers.remove(callback)
 
 
-def save_config(cfg: dict) -> None:
-    cfg_path = get_config_path()
-    cfg_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(cfg_path, 'w', encoding='utf-8') as f:
-        json.dump(cfg, f, indent=2)
+def _check_external() -> None:
+    global _last_stamp
+    stamp = _config_file().stamp()
+    if stamp == _last_stamp:
+        return
+    _last_stamp = stamp
+    _subscribers.publish(get_config())
+
+
+def _kdf_params(rec) -> tuple:
+    """The parameters that determine a hash for `rec` (PasswordConfig or KdfConfig)."""
+    if rec.algo == 'scrypt':
+        return ('scrypt', rec.n, rec.r, rec.p)
+    return ('pbkdf2_sha256', rec.iterations)
+
+
+def _derive(password: str, salt: bytes, params: tuple) -> bytes:
+    if params[0] == 'scrypt':
+        _, n, r, p = params
+        # Parameters over the budget (a hand-edited config) fail here instead of allocating
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=SCRYPT_MAXMEM, dklen=32)
+    return pbkdf2_hmac('sha256', password.encode('utf-8'), salt, params[1])
+
+
+def _password_record(password: str, params: tuple, base: PasswordConfig) -> PasswordConfig:
+    salt = token_bytes(16)
+    h = _derive(password, salt, params).hex()
+    if params[0] == 'scrypt':
+        return base.replace(salt=salt.hex(), hash=h, algo='scrypt', n=params[1], r=params[2], p=params[3])
+    return base.replace(salt=salt.hex(), hash=h, algo='pbkdf2_sha256', iterations=params[1], n=None, r=None, p=None)
 
 
 def verify_password(password: str) -> bool:
-    cfg = load_config()
-    pwcfg = cfg.get('password', {})
-    salt_hex = pwcfg.get('salt')
-    hash_hex = pwcfg.get('hash')
-    iterations = int(pwcfg.get('iterations', 200_000))
-    if not salt_hex or not hash_hex:
+    cfg = get_config()
+    pwcfg = cfg.password
+    if not pwcfg.salt or not pwcfg.hash:
         return False
     try:
-        salt = bytes.fromhex(salt_hex)
+        salt = bytes.fromhex(pwcfg.salt)
+        calc = _derive(password, salt, _kdf_params(pwcfg))
     except Exception:
         return False
-    calc = pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
-    return calc.hex() == hash_hex
+    if not hmac.compare_digest(calc.hex(), pwcfg.hash):
+        return False
+    current = _kdf_params(cfg.kdf)
+    if _kdf_params(pwcfg) != current:
+        # Upgrade the stored record to the current parameters while we know the password
+        try:
+            _rehash(password, pwcfg, current)
+        except Exception:
+            pass
+    return True
+
+
+def _rehash(password: str, old: PasswordConfig, params: tuple) -> None:
+    store = _config_file()
+    with store.lock:
+        cfg = get_config()
+        if cfg.password.hash != old.hash:
+            return  # changed meanwhile
+        save_config(cfg.replace(password=_password_record(password, params, cfg.password)))
 
 
 def set_password(new_password: str) -> None:
-    cfg = load_config()
+    cfg = get_config()
+    base = cfg.password.replace(generation=cfg.password.generation + 1)
+    save_config(cfg.replace(password=_password_record(new_password, _kdf_params(cfg.kdf), base)))
+
+
+def _time_kdf(params: tuple, min_time: float = 0.05) -> float:
+    """Seconds per derivation with `params` (repeats until `min_time` has passed)."""
     salt = token_bytes(16)
-    iters = int(cfg.get('password', {}).get('iterations', 200_000))
-    h = pbkdf2_hmac('sha256', new_password.encode('utf-8'), salt, iters).hex()
-    cfg.setdefault('password', {})['salt'] = salt.hex()
-    cfg['password']['hash'] = h
-    cfg['password']['iterations'] = iters
-    cfg['password']['algo'] = 'pbkdf2_sha256'
-    save_config(cfg)
+    runs = 0
+    t0 = time.perf_counter()
+    while True:
+        _derive('calibration', salt, params)
+        runs += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def calibrate_kdf(algo: str = 'pbkdf2_sha256', target_ms: int = KDF_TARGET_MS, save: bool = True) -> dict:
+    """Pick KDF parameters that take about `target_ms` to verify on this machine.
+
+    The chosen parameters are stored in the `kdf` section (when `save`) and are
+    used for new passwords; existing hashes are upgraded on the next successful
+    verify_password. Returns a report with the measured timings.
+    """
+    if algo not in KDF_ALGOS:
+        raise ValueError(f'unknown KDF algorithm: {algo}')
+    if algo == 'scrypt' and not hasattr(hashlib, 'scrypt'):
+        raise ValueError('scrypt is not available in this Python build')
+    target = max(1, int(target_ms)) / 1000.0
+    if algo == 'scrypt':
+        probe = ('scrypt', 2 ** MIN_SCRYPT_LOG2_N, 8, 1)
+        per_run = _time_kdf(probe)
+        # Cost is linear in n; n must be a power of two
+        log2_n = MIN_SCRYPT_LOG2_N + round(math.log2(max(target / per_run, 1.0)))
+        capped = log2_n > MAX_SCRYPT_LOG2_N
+        params = ('scrypt', 2 ** min(MAX_SCRYPT_LOG2_N, log2_n), 8, 1)
+    else:
+        probe = ('pbkdf2_sha256', 10_000)
+        per_run = _time_kdf(probe)
+        iterations = int(probe[1] * target / per_run) // 1000 * 1000
+        params = ('pbkdf2_sha256', max(MIN_PBKDF2_ITERATIONS, iterations))
+        capped = False
+    measured = _time_kdf(params, min_time=target)
+    if save:
+        cfg = get_config()
+        kdf = cfg.kdf.replace(algo=params[0], target_ms=int(target_ms))
+        if algo == 'scrypt':
+            kdf = kdf.replace(n=params[1], r=params[2], p=params[3])
+        else:
+            kdf = kdf.replace(iterations=params[1])
+        save_config(cfg.replace(kdf=kdf))
+    return {
+        "algo": params[0],
+        "params": dict(zip(('n', 'r', 'p') if algo == 'scrypt' else ('iterations',), params[1:])),
+        "target_ms": int(target_ms),
+        "probe_ms": round(per_run * 1000, 2),
+        "measured_ms": round(measured * 1000, 2),
+        "capped": capped,  # scrypt hit the memory cap before the target time
+        "saved": bool(save),
+    }
 
 
 def update_api(enabled: bool, host: str, port: int) -> None:
-    cfg = load_config()
-    api = cfg.setdefault('api', {})
-    api['enabled'] = bool(enabled)
-    api['host'] = str(host)
-    api['port'] = int(port)
-    save_config(cfg)
+    cfg = get_config()
+    api = cfg.api.replace(enabled=bool(enabled), host=str(host), port=int(port))
+    save_config(cfg.replace(api=api))
@@ -1,10 +1,9 @@
 import ctypes
+import sys
+import threading
+import time
 from ctypes import wintypes
 
-# Win32 constants
-U32 = ctypes.WinDLL('user32', use_last_error=True)
-K32 = ctypes.WinDLL('kernel32', use_last_error=True)
-
 # Desktop access rights
 DESKTOP_READOBJECTS      = 0x0001
 DESKTOP_CREATEWINDOW     = 0x0002
@@ -13,45 +12,65 @@ DESKTOP_WRITEOBJECTS     = 0x0080
 DESKTOP_SWITCHDESKTOP    = 0x0100
 GENERIC_ALL              = 0x10000000
 
-# Structures
-LPSECURITY_ATTRIBUTES = wintypes.LPVOID  # None for default
+ERROR_CALL_NOT_IMPLEMENTED = 120
+
+
+class _Unsupported:
+    """Stands in for user32/kernel32 off Windows: every call fails, so the
+    functions below raise OSError instead of failing at import time."""
+
+    def __getattr__(self, name):
+        if name == 'GetLastError':
+            return lambda: ERROR_CALL_NOT_IMPLEMENTED
+        return lambda *args: 0
+
 
-# Function prototypes
-U32.CreateDesktopW.argtypes = [
-    wintypes.LPCWSTR,  # lpszDesktop
-    wintypes.LPCWSTR,  # lpszDevice (must be None)
-    wintypes.LPVOID,   # pDevmode (must be None)
-    wintypes.DWORD,    # dwFlags (0)
-    wintypes.DWORD,    # dwDesiredAccess
-    LPSECURITY_ATTRIBUTES  # lpsa
-]
-U32.CreateDesktopW.restype = wintypes.HANDLE
+if sys.platform == 'win32':
+    # Win32 constants
+    U32 = ctypes.WinDLL('user32', use_last_error=True)
+    K32 = ctypes.WinDLL('kernel32', use_last_error=True)
 
-U32.OpenDesktopW.argtypes = [
-    wintypes.LPCWSTR,  # lpszDesktop
-    wintypes.DWORD,    # dwFlags
-    wintypes.BOOL,     # fInherit
-    wintypes.DWORD     # dwDesiredAccess
-]
-U32.OpenDesktopW.restype = wintypes.HANDLE
+    # Structures
+    LPSECURITY_ATTRIBUTES = wintypes.LPVOID  # None for default
 
-U32.SwitchDesktop.argtypes = [wintypes.HANDLE]
-U32.SwitchDesktop.restype = wintypes.BOOL
+    # Function prototypes
+    U32.CreateDesktopW.argtypes = [
+        wintypes.LPCWSTR,  # lpszDesktop
+        wintypes.LPCWSTR,  # lpszDevice (must be None)
+        wintypes.LPVOID,   # pDevmode (must be None)
+        wintypes.DWORD,    # dwFlags (0)
+        wintypes.DWORD,    # dwDesiredAccess
+        LPSECURITY_ATTRIBUTES  # lpsa
+    ]
+    U32.CreateDesktopW.restype = wintypes.HANDLE
 
-U32.SetThreadDesktop.argtypes = [wintypes.HANDLE]
-U32.SetThreadDesktop.restype = wintypes.BOOL
+    U32.OpenDesktopW.argtypes = [
+        wintypes.LPCWSTR,  # lpszDesktop
+        wintypes.DWORD,    # dwFlags
+        wintypes.BOOL,     # fInherit
+        wintypes.DWORD     # dwDesiredAccess
+    ]
+    U32.OpenDesktopW.restype = wintypes.HANDLE
 
-U32.CloseDesktop.argtypes = [wintypes.HANDLE]
-U32.CloseDesktop.restype = wintypes.BOOL
+    U32.SwitchDesktop.argtypes = [wintypes.HANDLE]
+    U32.SwitchDesktop.restype = wintypes.BOOL
 
-U32.OpenInputDesktop.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
-U32.OpenInputDesktop.restype = wintypes.HANDLE
+    U32.SetThreadDesktop.argtypes = [wintypes.HANDLE]
+    U32.SetThreadDesktop.restype = wintypes.BOOL
 
-U32.GetThreadDesktop.argtypes = [wintypes.DWORD]
-U32.GetThreadDesktop.restype = wintypes.HANDLE
+    U32.CloseDesktop.argtypes = [wintypes.HANDLE]
+    U32.CloseDesktop.restype = wintypes.BOOL
 
-K32.GetLastError.argtypes = []
-K32.GetLastError.restype = wintypes.DWORD
+    U32.OpenInputDesktop.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    U32.OpenInputDesktop.restype = wintypes.HANDLE
+
+    U32.GetThreadDesktop.argtypes = [wintypes.DWORD]
+    U32.GetThreadDesktop.restype = wintypes.HANDLE
+
+    K32.GetLastError.argtypes = []
+    K32.GetLastError.restype = wintypes.DWORD
+else:
+    U32 = K32 = _Unsupported()
 
 DEFAULT_DESKTOP = 'Default'
 LOCK_DESKTOP = 'LockDesktop'
@@ -110,3 +129,145 @@ def set_thread_desktop(hdesk) -> None:
 def close_desktop(hdesk) -> None:
     if hdesk and not U32.CloseDesktop(hdesk):
         _raise_last_error('CloseDesktop')
+
+
+class DesktopManager:
+    """Opens each desktop once and keeps the handle for the life of the process.
+
+    Locking and unlocking many times a day then reuses two handles instead
+    of opening (and, for the lock desktop, leaking) new ones per transition.
+    A desktop lasts as long as some handle to it is open, so the cached lock
+    desktop handle also keeps LockDesktop alive between locks.
+
+    `u32`/`k32` are the user32/kernel32 bindings; pass a FakeU32 to run it
+    without Windows.
+    """
+
+    def __init__(self, u32=None, k32=None):
+        self.u32 = u32 if u32 is not None else U32
+        self.k32 = k32 if k32 is not None else (self.u32 if u32 is not None else K32)
+        self.opened = 0
+        self.reused = 0
+        self.closed = 0
+        self._handles: dict = {}  # desktop name -> HDESK
+        self._lock = threading.Lock()
+
+    def get(self, name: str, create: bool = False):
+        """Cached handle of desktop `name`, opened (or created) on first use."""
+        with self._lock:
+            hdesk = self._handles.get(name)
+            if hdesk:
+                self.reused += 1
+                return hdesk
+            hdesk = self.u32.CreateDesktopW(name, None, None, 0, ACCESS, None) if create else None
+            if not hdesk:
+                hdesk = self.u32.OpenDesktopW(name, 0, False, ACCESS)
+                if not hdesk:
+                    raise OSError(f"{'Create/OpenDesktop' if create else 'OpenDesktop'} failed with error {self.k32.GetLastError()}")
+            self._handles[name] = hdesk
+            self.opened += 1
+            return hdesk
+
+    def lock_desktop(self, name: str = LOCK_DESKTOP):
+        return self.get(name, create=True)
+
+    def default_desktop(self):
+        return self.get(DEFAULT_DESKTOP)
+
+    def switch_to(self, name: str) -> None:
+        """Make desktop `name` the input desktop."""
+        if self.u32.SwitchDesktop(self.get(name)):
+            return
+        # The cached handle may have gone bad; reopen once before giving up
+        self.release(name)
+        if not self.u32.SwitchDesktop(self.get(name)):
+            raise OSError(f"SwitchDesktop failed with error {self.k32.GetLastError()}")
+
+    def release(self, name: str) -> None:
+        """Close the cached handle of `name` (best effort)."""
+        with self._lock:
+            hdesk = self._handles.pop(name, None)
+            if hdesk:
+                self.u32.CloseDesktop(hdesk)
+                self.closed += 1
+
+    def open_handles(self) -> int:
+        with self._lock:
+            return len(self._handles)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"open": len(self._handles), "opened": self.opened, "reused": self.reused,
+                    "closed": self.closed}
+
+    def close_all(self) -> None:
+        """Close every cached handle (on shutdown)."""
+        with self._lock:
+            names = list(self._handles)
+        for name in names:
+            self.release(name)
+
+
+class FakeU32:
+    """In-memory user32 (and kernel32.GetLastError) for benchmarks off Windows.
+
+    Hands out integer handles, tracks which are open and which desktop is
+    the input desktop, and counts calls. `delay` is added to every call.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.live: dict = {}  # handle -> desktop name
+        self.desktops = {DEFAULT_DESKTOP}
+        self.input_desktop = DEFAULT_DESKTOP
+        self.calls: dict = {}
+        self._next = 0x100
+        self._lock = threading.Lock()
+
+    def _call(self, name: str):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _handle(self, name: str) -> int:
+        with self._lock:
+            self._next += 1
+            self.live[self._next] = name
+            return self._next
+
+    def CreateDesktopW(self, name, device, devmode, flags, access, sa):
+        self._call('CreateDesktopW')
+        self.desktops.add(name)
+        return self._handle(name)
+
+    def OpenDesktopW(self, name, flags, inherit, access):
+        self._call('OpenDesktopW')
+        return self._handle(name) if name in self.desktops else 0
+
+    def OpenInputDesktop(self, flags, inherit, access):
+        self._call('OpenInputDesktop')
+        return self._handle(self.input_desktop)
+
+    def SwitchDesktop(self, hdesk):
+        self._call('SwitchDesktop')
+        name = self.live.get(hdesk)
+        if name is None:
+            return 0
+        self.input_desktop = name
+        return 1
+
+    def SetThreadDesktop(self, hdesk):
+        self._call('SetThreadDesktop')
+        return 1 if hdesk in self.live else 0
+
+    def CloseDesktop(self, hdesk):
+        self._call('CloseDesktop')
+        with self._lock:
+            return 1 if self.live.pop(hdesk, None) is not None else 0
+
+    def GetLastError(self):
+        return 6  # ERROR_INVALID_HANDLE
+
+
+manager = DesktopManager()
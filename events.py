@@ -0,0 +1,132 @@
+"""
+In-process event bus for PC-Lock state changes.
+
+The Locker, the schedule engine and the schedule store publish here; the API
+streams the events to clients at GET /api/events. Each event gets an
+increasing id and is kept in a ring buffer, so a client that reconnects with
+the last id it saw receives what it missed (as long as it is still buffered).
+"""
+import json
+import threading
+import time
+from collections import deque
+
+from watch import Subscribers
+
+BUFFER_SIZE = 256
+
+
+class StateVersion:
+    """Counter bumped on every change of some piece of state.
+
+    It starts at the current time in milliseconds, so a value handed out by
+    an earlier run of the app compares as older rather than colliding.
+    """
+
+    def __init__(self, clock=time.time_ns):
+        self._value = clock() // 1_000_000
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class Event:
+    __slots__ = ('id', 'kind', 'data', 'ts', 'frame')
+
+    def __init__(self, id: int, kind: str, data: dict, ts: float):
+        self.id = id
+        self.kind = kind
+        self.data = data
+        self.ts = ts
+        # Serialized once, shared by every subscriber
+        # (default=dict handles the read-only mappings of store snapshots)
+        payload = json.dumps(dict(data, ts=ts), separators=(',', ':'), default=dict)
+        self.frame = f'id: {id}\nevent: {kind}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class EventBus:
+    def __init__(self, size: int = BUFFER_SIZE, clock=time.time):
+        self.clock = clock
+        self._buffer: deque = deque(maxlen=size)
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(threading.Lock())
+        self._listeners = Subscribers()
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def publish(self, kind: str, data: dict | None = None) -> Event:
+        with self._lock:
+            event = Event(self._next_id, kind, dict(data or {}), self.clock())
+            self._next_id += 1
+            self._buffer.append(event)
+        with self._changed:
+            self._changed.notify_all()
+        self._listeners.publish(event)
+        return event
+
+    def wait_for(self, predicate, timeout: float) -> bool:
+        """Block until `predicate()` is true, re-checking after each event; False on timeout.
+
+        State must change before its event is published for the wakeup not to be missed.
+        """
+        with self._changed:
+            return self._changed.wait_for(predicate, timeout)
+
+    def since(self, last_id: int) -> tuple[list, bool]:
+        """Events newer than `last_id`, and False if some of them were already dropped."""
+        with self._lock:
+            if not self._buffer or last_id >= self._buffer[-1].id:
+                return [], True
+            first = self._buffer[0].id
+            complete = last_id >= first - 1
+            return [e for e in self._buffer if e.id > last_id], complete
+
+    def subscribe(self, callback) -> None:
+        """Call `callback(event)` for every published event (on the publisher's thread)."""
+        self._listeners.add(callback)
+
+    def unsubscribe(self, callback) -> None:
+        self._listeners.remove(callback)
+
+
+bus = EventBus()
+
+
+def publish(kind: str, data: dict | None = None) -> None:
+    """Publish on the process-wide bus (best effort)."""
+    try:
+        bus.publish(kind, data)
+    except Exception:
+        pass
+
+
+_watching_schedule = False
+
+
+def _on_schedule(sched) -> None:
+    # The stream needs no auth, so only the version goes out; clients fetch GET /api/schedule with credentials
+    import schedule_store
+    publish('schedule_changed', {"version": schedule_store.version()})
+
+
+def watch_schedule() -> None:
+    """Publish schedule_changed whenever the schedule store changes (idempotent)."""
+    global _watching_schedule
+    if _watching_schedule:
+        return
+    try:
+        import schedule_store
+    except Exception:
+        return  # DPAPI store unavailable (non-Windows benchmark runs)
+    _watching_schedule = True
+    schedule_store.subscribe(_on_schedule)
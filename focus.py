@@ -0,0 +1,101 @@
+"""
+When the lock screen checks that it still has focus.
+
+The lock screen used to lift() and focus_force() every window every 800 ms
+for as long as it was up, whether or not anything had changed. FocusGuard
+runs the check when Tk reports something: focus leaving a window, a window
+being unmapped or covered. A few events in a row (focus moving between our
+own windows, a dialog opening) are folded into one check after a short
+settle delay. A fallback timer still runs for anything Tk does not report;
+its interval grows from FALLBACK_MIN_MS while nothing is found wrong and
+drops back after an event or a correction. It never exceeds FALLBACK_MAX_MS,
+so an unreported steal is still fixed sooner than the old loop's 800 ms: a
+fallback check is one focus_get() unless something is actually wrong.
+
+It only needs `after(ms, fn)` / `after_cancel(id)`, so it runs on a Tk root
+or on a simulated clock (benchmarks/focus_wakeups.py).
+
+    guard = FocusGuard(root.after, root.after_cancel, check)
+    w.bind('<FocusOut>', lambda e: guard.poke('focus_out'), add='+')
+    guard.start()
+"""
+
+SETTLE_MS = 20  # delay after an event before checking, so a burst is checked once
+FALLBACK_MIN_MS = 500
+FALLBACK_MAX_MS = 750  # worst case for a steal Tk does not report; keep below the old 800 ms loop
+
+
+class FocusGuard:
+    """Calls `check(reasons) -> bool` (True if it had to fix something) on events and on a backing-off timer."""
+
+    def __init__(self, after, cancel, check, settle_ms: int = SETTLE_MS,
+                 min_ms: int = FALLBACK_MIN_MS, max_ms: int = FALLBACK_MAX_MS):
+        self.after = after
+        self.cancel = cancel
+        self.check = check
+        self.settle_ms = settle_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.interval = min_ms
+        self.wakeups = 0  # checks run (events + timer)
+        self.timer_wakeups = 0
+        self.corrections = 0
+        self.running = False
+        self._reasons: set = set()
+        self._pending = None  # after() id of the settle check
+        self._timer = None  # after() id of the fallback check
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.running = True
+        self._timer = self.after(self.interval, self._on_timer)
+
+    def stop(self) -> None:
+        self.running = False
+        for after_id in (self._pending, self._timer):
+            if after_id is not None:
+                try:
+                    self.cancel(after_id)
+                except Exception:
+                    pass
+        self._pending = self._timer = None
+
+    def poke(self, reason: str) -> None:
+        """Something happened that may have cost us focus or visibility."""
+        if not self.running:
+            return
+        self._reasons.add(reason)
+        if self._pending is None:
+            self._pending = self.after(self.settle_ms, self._on_settled)
+
+    def _on_settled(self):
+        self._pending = None
+        if self._timer is not None:
+            self.cancel(self._timer)
+            self._timer = None
+        self._run()
+
+    def _on_timer(self):
+        self._timer = None
+        if self._pending is not None:
+            return  # an event check is about to run and re-arm the timer
+        self.timer_wakeups += 1
+        self._run()
+
+    def _run(self):
+        if not self.running:
+            return
+        reasons, self._reasons = self._reasons, set()
+        self.wakeups += 1
+        try:
+            fixed = bool(self.check(reasons or {'timer'}))
+        except Exception:
+            fixed = False
+        if fixed:
+            self.corrections += 1
+        if fixed or reasons:
+            self.interval = self.min_ms
+        else:
+            self.interval = min(self.interval * 2, self.max_ms)
+        self._timer = self.after(self.interval, self._on_timer)
@@ -0,0 +1,192 @@
+"""
+Message channel between the Locker and its lockscreen child.
+
+Messages are JSON objects, one per line, with a "type" key. The parent
+writes to the child's stdin and reads its stdout; the child does the
+reverse. Trace reports (see tracing.report) share the child's stdout and
+are routed to the current trace.
+
+Parent -> child:
+- show              standby child: switch to the lock desktop and appear
+- unlock_requested  remote unlock: switch back, reply `unlocked`, exit
+- shutdown          standby child that is no longer wanted: exit
+
+Child -> parent:
+- ready             windows built, commands are being read
+- shown             the first lock window is on screen
+- unlocked          {"by": "password" | "remote"}, sent before exiting
+- heartbeat         every HEARTBEAT_INTERVAL from the Tk main loop, so a
+                    frozen UI thread shows up as missed heartbeats
+
+    parent: chan = ChildChannel(proc, on_message); chan.send('show', reason='manual')
+    child:  chan = ParentChannel(on_message).start(); chan.send('ready')
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import tracing
+
+HEARTBEAT_INTERVAL = 1.0  # seconds between child heartbeats
+HEARTBEAT_TIMEOUT = 5.0  # silence after which a running child counts as hung
+STARTUP_TIMEOUT = 30.0  # allowance for the first message (cold interpreter start)
+UNLOCK_ACK_TIMEOUT = 2.0  # how long unlock_now waits for `unlocked`
+
+
+def encode(msg_type: str, **fields) -> bytes:
+    return (json.dumps(dict(fields, type=msg_type), separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def decode(line) -> dict | None:
+    """The message on `line`, or None if it is not one."""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', 'replace')
+    line = line.strip()
+    if not line.startswith('{'):
+        return None
+    try:
+        msg = json.loads(line)
+    except ValueError:
+        return None
+    return msg if isinstance(msg, dict) and isinstance(msg.get('type'), str) else None
+
+
+class ChildChannel:
+    """Parent side: talks to a Popen started with stdin/stdout pipes.
+
+    `on_message(channel, msg)` runs on the reader thread. `trace` is the
+    Trace that child reports are added to (None drops them).
+    """
+
+    def __init__(self, proc, on_message=None, trace=None, clock=time.monotonic):
+        self.proc = proc
+        self.on_message = on_message
+        self.trace = trace
+        self.clock = clock
+        self.closed = False  # child's stdout reached EOF
+        self.started = clock()
+        self.last_heard: float | None = None  # time of the last line from the child
+        self._seen: dict = {}  # message type -> last message of that type
+        self._changed = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True, name='lockscreen-ipc')
+        self._reader.start()
+
+    def send(self, msg_type: str, **fields) -> bool:
+        """False if the child is gone or was started without a stdin pipe."""
+        if self.proc.stdin is None:
+            return False
+        try:
+            with self._write_lock:
+                self.proc.stdin.write(encode(msg_type, **fields))
+                self.proc.stdin.flush()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def seen(self, msg_type: str) -> dict | None:
+        with self._changed:
+            return self._seen.get(msg_type)
+
+    def wait_for(self, msg_type: str, timeout: float) -> dict | None:
+        """Block until the child has sent `msg_type` (or has exited)."""
+        with self._changed:
+            self._changed.wait_for(lambda: msg_type in self._seen or self.closed, timeout)
+            return self._seen.get(msg_type)
+
+    def join(self, timeout: float | None = None) -> None:
+        """Wait until the child's output has been read to the end."""
+        self._reader.join(timeout)
+
+    def hung(self) -> bool:
+        """True if the child has been silent for longer than it may be."""
+        if self.last_heard is None:
+            return self.clock() - self.started > STARTUP_TIMEOUT
+        return self.clock() - self.last_heard > HEARTBEAT_TIMEOUT
+
+    def close(self) -> None:
+        try:
+            if self.proc.stdin is not None:
+                self.proc.stdin.close()
+        except (OSError, ValueError):
+            pass
+
+    def _read(self):
+        stream = self.proc.stdout
+        try:
+            for line in iter(stream.readline, b''):
+                self.last_heard = self.clock()
+                report = tracing.parse_report(line)
+                if report is not None:
+                    trace = self.trace
+                    if trace is not None:
+                        trace.mark(*report)
+                    continue
+                msg = decode(line)
+                if msg is None:
+                    # Stray output (prints, warnings): keep it visible
+                    try:
+                        sys.stderr.write(line.decode('utf-8', 'replace'))
+                    except Exception:
+                        pass
+                    continue
+                if msg['type'] == 'heartbeat':
+                    continue
+                with self._changed:
+                    self._seen[msg['type']] = msg
+                    self._changed.notify_all()
+                if self.on_message is not None:
+                    try:
+                        self.on_message(self, msg)
+                    except Exception:
+                        pass
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._changed:
+                self.closed = True
+                self._changed.notify_all()
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+class ParentChannel:
+    """Child side: reads commands from stdin, writes messages to stdout.
+
+    `on_message(msg)` runs on the reader thread; `on_eof()` when the parent
+    closes the pipe or exits.
+    """
+
+    def __init__(self, on_message, on_eof=None):
+        self.on_message = on_message
+        self.on_eof = on_eof
+        self._write_lock = threading.Lock()
+
+    def start(self) -> 'ParentChannel':
+        threading.Thread(target=self._read, daemon=True, name='parent-ipc').start()
+        return self
+
+    def send(self, msg_type: str, **fields) -> None:
+        data = encode(msg_type, **fields)
+        try:
+            with self._write_lock:
+                # Windowed (frozen) builds have sys.stdout None; the inherited pipe is still fd 1
+                os.write(sys.stdout.fileno() if sys.stdout is not None else 1, data)
+        except Exception:
+            pass
+
+    def _read(self):
+        try:
+            stdin = sys.stdin.buffer if sys.stdin is not None else os.fdopen(0, 'rb')
+            for line in iter(stdin.readline, b''):
+                msg = decode(line)
+                if msg is not None:
+                    self.on_message(msg)
+        except Exception:
+            pass
+        if self.on_eof is not None:
+            self.on_eof()
@@ -0,0 +1,140 @@
+"""
+Bounded worker pool for password verification.
+
+Every password check runs a deliberately slow KDF. Routing API checks through
+a fixed number of workers keeps a burst of requests from occupying every core
+and starving the scheduler and the UI. When the pool and its queue are full,
+or a client keeps failing, callers get Busy with a suggested retry delay
+instead of another KDF run.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE = 8
+# Per-client delay after consecutive failures: BACKOFF_BASE * 2**(n-1), capped
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+_MAX_TRACKED_CLIENTS = 1024
+
+KDF_SECONDS = metrics.histogram('pclock_kdf_seconds', 'Password KDF verification time')
+KDF_WAIT_SECONDS = metrics.histogram('pclock_kdf_queue_wait_seconds', 'Time API password checks waited for a KDF worker')
+KDF_REJECTED = metrics.counter('pclock_kdf_rejected_total', 'Password checks refused by the KDF pool', ('reason',))
+
+
+class Busy(Exception):
+    """Verification refused; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.retry_after = max(1, int(retry_after + 0.999))
+        self.reason = reason
+
+
+class KdfPool:
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_QUEUE, verify=None,
+                 clock=time.monotonic):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.clock = clock
+        self._verify = verify
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='kdf')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._failures: dict = {}  # client -> (consecutive failures, blocked until)
+        self._count = 0
+        self._rejected = 0
+        self._total_s = 0.0
+        self._last_s = 0.0
+        self._max_s = 0.0
+
+    def _run(self, password: str, queued: float) -> bool:
+        KDF_WAIT_SECONDS.observe(time.perf_counter() - queued)
+        verify = self._verify
+        if verify is None:
+            from config import verify_password as verify
+        t0 = time.perf_counter()
+        try:
+            return verify(password)
+        finally:
+            dt = time.perf_counter() - t0
+            KDF_SECONDS.observe(dt)
+            with self._lock:
+                self._count += 1
+                self._total_s += dt
+                self._last_s = dt
+                self._max_s = max(self._max_s, dt)
+
+    def _avg(self) -> float:
+        return self._total_s / self._count if self._count else 0.0
+
+    def verify(self, password: str, client=None) -> bool:
+        """Verify `password` on a pool worker. Raises Busy when not admitted."""
+        return self.submit(password, client).result()
+
+    def submit(self, password: str, client=None) -> Future:
+        """Like verify() without waiting: the Future resolves to the result. Raises Busy when not admitted."""
+        now = self.clock()
+        with self._lock:
+            blocked = self._failures.get(client)
+            if blocked is not None and blocked[1] > now:
+                self._rejected += 1
+                KDF_REJECTED.labels('backoff').inc()
+                raise Busy(blocked[1] - now, 'backoff')
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                KDF_REJECTED.labels('queue_full').inc()
+                # Time for the current backlog to drain through the workers
+                raise Busy(self._avg() * self._in_flight / self.workers, 'queue_full')
+            self._in_flight += 1
+        return self._executor.submit(self._check, password, client, time.perf_counter())
+
+    def _check(self, password: str, client, queued: float) -> bool:
+        # Failures are recorded before the result is visible, so the next attempt sees the backoff
+        try:
+            ok = self._run(password, queued)
+            if client is not None:
+                self._record(client, ok)
+            return ok
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def retry_after(self, client) -> float:
+        """Seconds until `client` may try again (0 if it may now)."""
+        with self._lock:
+            blocked = self._failures.get(client)
+        return max(0.0, blocked[1] - self.clock()) if blocked is not None else 0.0
+
+    def _record(self, client, ok: bool):
+        with self._lock:
+            if ok:
+                self._failures.pop(client, None)
+                return
+            now = self.clock()
+            if len(self._failures) >= _MAX_TRACKED_CLIENTS:
+                self._failures = {c: v for c, v in self._failures.items() if v[1] > now}
+            n = self._failures.get(client, (0, 0.0))[0] + 1
+            self._failures[client] = (n, now + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (n - 1)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "verifications": self._count,
+                "rejected": self._rejected,
+                "latency_ms": {
+                    "last": round(self._last_s * 1000, 2),
+                    "avg": round(self._avg() * 1000, 2),
+                    "max": round(self._max_s * 1000, 2),
+                },
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -7,23 +7,110 @@ import time
 from pathlib import Path
 
 import tkinter as tk
-from tkinter import simpledialog, messagebox
-
-from screeninfo import get_monitors
 
 import desktop
+import monitors
+import tracing
+from focus import FocusGuard
+from ipc import HEARTBEAT_INTERVAL, ParentChannel
+from kdf_pool import Busy, KdfPool
+from monitors import Monitor, MonitorWatcher
 from config import load_config as _load_config, verify_password as _verify
 
 
+def lock_message(reason: str | None, start: str | None = None, end: str | None = None) -> str:
+    if reason == 'schedule' and start and end:
+        return f'This desktop is locked by schedule ({start}\u2013{end}).'
+    if reason == 'manual':
+        return 'This desktop is manually locked.'
+    return 'This desktop is locked.'
+
+
+class PasswordPrompt(tk.Toplevel):
+    """Unlock dialog. `on_submit(password)` runs on Enter; the owner then calls
+    busy() while the password is checked and wait() after a wrong one."""
+
+    def __init__(self, parent, on_submit, on_close):
+        super().__init__(parent, bg='black')
+        self.on_submit = on_submit
+        self.on_close = on_close
+        self._countdown = None
+        self.title('Unlock')
+        self.transient(parent)
+        self.attributes('-topmost', True)
+        self.resizable(False, False)
+        tk.Label(self, text='Enter password:', fg='white', bg='black', font=('Segoe UI', 12)).pack(padx=24, pady=(18, 6))
+        self.entry = tk.Entry(self, show='*', width=28, font=('Segoe UI', 12))
+        self.entry.pack(padx=24)
+        self.status = tk.Label(self, text='', fg='#bbbbbb', bg='black', font=('Segoe UI', 10))
+        self.status.pack(padx=24, pady=(6, 18))
+        self.entry.bind('<Return>', self._submit)
+        self.bind('<Escape>', lambda e: self.close())
+        self.protocol('WM_DELETE_WINDOW', self.close)
+        self.update_idletasks()
+        self.geometry(f'+{parent.winfo_rootx() + (parent.winfo_width() - self.winfo_width()) // 2}'
+                      f'+{parent.winfo_rooty() + (parent.winfo_height() - self.winfo_height()) // 2}')
+        self.grab_set()
+        self.entry.focus_force()
+
+    def _submit(self, event=None):
+        if str(self.entry['state']) == 'disabled':
+            return
+        pwd = self.entry.get()
+        self.entry.delete(0, 'end')
+        self.on_submit(pwd)
+
+    def busy(self):
+        self.entry.configure(state='disabled')
+        self.status.configure(text='Checking password\u2026')
+        self.configure(cursor='watch')
+
+    def wait(self, seconds: float, message: str = 'Incorrect password.'):
+        """Refuse input for `seconds`, counting down, then accept it again."""
+        self.configure(cursor='')
+        self.entry.configure(state='disabled')
+        deadline = time.monotonic() + seconds
+
+        def tick():
+            left = deadline - time.monotonic()
+            if left <= 0:
+                self._countdown = None
+                self.status.configure(text=message)
+                self.entry.configure(state='normal')
+                self.entry.focus_force()
+                return
+            self.status.configure(text=f'{message} Try again in {int(left + 0.999)} s.')
+            self._countdown = self.after(min(1000, int(left * 1000) + 1), tick)
+        tick()
+
+    def close(self):
+        if self._countdown is not None:
+            self.after_cancel(self._countdown)
+        self.grab_release()
+        self.destroy()
+        self.on_close()
+
+
 class LockScreen:
-    def __init__(self, hotkey: str, message: str = 'This desktop is locked.'):
+    def __init__(self, hotkey: str, message: str = 'This desktop is locked.', desktop_name: str = desktop.LOCK_DESKTOP):
         self.hotkey = hotkey.lower().replace('+', '-')
         self.message = message
+        self.desktop_name = desktop_name  # lock desktop; standby mode switches to it on `show`
         self.root: tk.Tk | None = None
-        self.windows: list[tk.Misc] = []  # Tk or Toplevel
+        # One window per display, keyed like monitors.Monitor ('primary' is the Tk root)
+        self.windows: dict[str, tk.Misc] = {}  # Tk or Toplevel
+        self.labels: dict[str, tk.Label] = {}
+        self.monitor_watcher: MonitorWatcher | None = None
         self.password_unlocked = threading.Event()
+        self.channel: ParentChannel | None = None
+        self.shown = False
+        self.focus_guard: FocusGuard | None = None
+        # Password checks run here, off the Tk thread; failures back off 0.5 s doubling to 30 s
+        self.kdf = KdfPool(workers=1, max_queue=0, verify=_verify)
+        self.prompt: PasswordPrompt | None = None
 
-    def _build_window_for_monitor(self, m, is_primary: bool = False):
+    def _build_window_for_monitor(self, m: Monitor):
+        is_primary = m.key == 'primary'
         if is_primary:
             w = tk.Tk()
             self.root = w
@@ -32,7 +119,7 @@ class LockScreen:
             w = tk.Toplevel(self.root)
         w.overrideredirect(True)
         w.attributes('-topmost', True)
-        w.geometry(f"{m.width}x{m.height}+{m.x}+{m.y}")
+        w.geometry(m.geometry)
         w.configure(bg='black')
 
         container = tk.Frame(w, bg='black')
@@ -40,6 +127,7 @@ class LockScreen:
 
         label = tk.Label(container, text=self.message, fg='white', bg='black', font=('Segoe UI', 24))
         label.pack(pady=12)
+        self.labels[m.key] = label
         # No hint text for hotkey
 
         # grab focus
@@ -48,7 +136,41 @@ class LockScreen:
         except Exception:
             pass
 
-        self.windows.append(w)
+        if is_primary:
+            # First frame on screen: the end of the lock as the user sees it
+            def _mapped(_event):
+                w.unbind('<Map>', bind_id)
+                tracing.report('mapped')
+                if self.channel is not None:
+                    self.channel.send('shown')
+            bind_id = w.bind('<Map>', _mapped, add='+')
+        # Windows moves and resizes windows when displays change: look at the topology soon
+        w.bind('<Configure>', lambda e: e.widget is w and self.monitor_watcher is not None
+               and self.monitor_watcher.poke(), add='+')
+        return w
+
+    def _apply_topology(self, topo: tuple, changes: monitors.Changes):
+        """Displays were added, removed or resized: create, move or destroy only those windows."""
+        def create(m):
+            w = self._build_window_for_monitor(m)
+            if self.shown:
+                w.lift()
+                if self.focus_guard is not None:
+                    self._watch_window(w, self.focus_guard)
+            else:
+                w.withdraw()
+            return w
+
+        def destroy(w):
+            try:
+                w.destroy()
+            except Exception:
+                pass
+
+        for m in changes.removed:
+            self.labels.pop(m.key, None)
+        monitors.apply(self.windows, changes, create, lambda w, m: w.geometry(m.geometry), destroy)
+        monitors.save_cached(topo)
 
     def _bind_hotkeys(self):
         if not self.root:
@@ -57,77 +179,182 @@ class LockScreen:
         self.root.bind_all('<Control-Alt-KeyPress-u>', self._on_hotkey)
         self.root.bind_all('<Control-Alt-KeyPress-U>', self._on_hotkey)
         self.root.bind_all('<Control-KeyPress-Alt_L>', lambda e: None)  # no-op to keep Alt state
+        self._guard_focus()
 
-        # Keep refocusing so one of our windows has focus
-        def refocus_all():
-            for w in self.windows:
-                try:
-                    w.lift()
-                    w.focus_force()
-                except Exception:
-                    pass
-            self.root.after(800, refocus_all)
-        self.root.after(800, refocus_all)
+    def _guard_focus(self):
+        # Win focus back when Tk says it was lost or a window was hidden/covered (plus a slow fallback timer)
+        guard = self.focus_guard = FocusGuard(self.root.after, self.root.after_cancel, self._enforce_focus)
+        for w in self.windows.values():
+            self._watch_window(w, guard)
+        guard.start()
+
+    @staticmethod
+    def _watch_window(w, guard: FocusGuard):
+        w.bind('<FocusOut>', lambda e: guard.poke('focus_out'), add='+')
+        w.bind('<Unmap>', lambda e: guard.poke('unmap'), add='+')
+        w.bind('<Visibility>', lambda e: e.state != 'VisibilityUnobscured' and guard.poke('visibility'), add='+')
+
+    def _enforce_focus(self, reasons: set) -> bool:
+        """Put the lock windows back on top with focus if something took it; True if it had to."""
+        try:
+            lost = self.root.focus_get() is None  # focus is outside this app (a dialog of ours is fine)
+        except Exception:
+            lost = False  # focus_get() fails on some internal widgets, which are ours
+        hidden = [w for w in self.windows.values() if not w.winfo_ismapped()]
+        if not (lost or hidden or reasons & {'unmap', 'visibility'}):
+            return False
+        for w in self.windows.values():
+            try:
+                if w in hidden:
+                    w.deiconify()
+                w.lift()
+            except Exception:
+                pass
+        if lost:
+            try:
+                self.root.focus_force()
+            except Exception:
+                pass
+        return True
 
     def _on_hotkey(self, event=None):
         # Show password prompt on the primary window only
-        primary = self.root or (self.windows[0] if self.windows else None)
+        primary = self.root
         if primary is None:
             return
-        pwd = simpledialog.askstring('Unlock', 'Enter password:', show='*', parent=primary)
-        if pwd is None:
+        if self.prompt is not None:
+            self.prompt.entry.focus_force()
             return
+        self.prompt = PasswordPrompt(primary, self._submit_password, self._prompt_closed)
+        left = self.kdf.retry_after('lockscreen')
+        if left > 0:
+            self.prompt.wait(left, 'Too many attempts.')
+
+    def _prompt_closed(self):
+        self.prompt = None
+
+    def _submit_password(self, pwd: str):
         try:
-            if _verify(pwd):
-                self.password_unlocked.set()
-            else:
-                messagebox.showerror('Unlock failed', 'Incorrect password.', parent=primary)
+            future = self.kdf.submit(pwd, client='lockscreen')
+        except Busy as e:
+            self.prompt.wait(e.retry_after, 'Too many attempts.')
+            return
         finally:
             pwd = None
+        self.prompt.busy()
+        # Back on the Tk thread once the KDF is done
+        future.add_done_callback(lambda f: self.root.after(0, self._on_verified, f))
 
-    def run(self):
-        # Create fullscreen windows for each monitor
-        monitors = sorted(get_monitors(), key=lambda m: (m.is_primary is False, m.x, m.y))
-        for i, m in enumerate(monitors):
-            self._build_window_for_monitor(m, is_primary=(i == 0))
+    def _on_verified(self, future):
+        try:
+            ok = future.result()
+        except Exception:
+            ok = False
+        if ok:
+            self.password_unlocked.set()
+            self._unlock('password')
+            return
+        if self.prompt is not None:
+            self.prompt.wait(self.kdf.retry_after('lockscreen'))
 
+    def _unlock(self, by: str):
+        """Switch back to the Default desktop, tell the parent, exit."""
+        if by == 'password':
+            tracing.report('password_ok')
+        if self.focus_guard is not None:
+            self.focus_guard.stop()  # destroying the windows unmaps them
+        if self.monitor_watcher is not None:
+            self.monitor_watcher.stop()
+        try:
+            desktop.manager.switch_to(desktop.DEFAULT_DESKTOP)
+        except Exception as e:
+            # Best effort; still exit
+            sys.stderr.write(f"Unlock switch error: {e}\n")
+        finally:
+            if self.channel is not None:
+                self.channel.send('unlocked', by=by)
+            for w in list(self.windows.values()):
+                try:
+                    w.destroy()
+                except Exception:
+                    pass
+            # Exit process
+            os._exit(0)
+
+    def _heartbeat(self):
+        # Runs on the Tk thread: stops when the UI is stuck, which is the point
+        self.channel.send('heartbeat')
+        self.root.after(int(HEARTBEAT_INTERVAL * 1000), self._heartbeat)
+
+    def _on_parent_message(self, msg: dict):
+        # IPC reader thread; Tk work is handed to the main loop
+        if self.root is None:
+            return
+        if msg['type'] == 'show':
+            self.root.after(0, self._show, msg)
+        elif msg['type'] == 'unlock_requested':
+            self.root.after(0, self._unlock, 'remote')
+        elif msg['type'] == 'shutdown' and not self.shown:
+            os._exit(0)
+
+    # --- standby mode: built hidden, shown on the parent's `show` command ---
+
+    def _on_parent_gone(self):
+        # A standby child nobody will show; a shown one stays locked
+        if not self.shown:
+            os._exit(0)
+
+    def _show(self, msg: dict):
+        if self.shown:
+            return
+        self.shown = True
+        text = self.message = lock_message(msg.get('reason'), msg.get('start'), msg.get('end'))
+        for label in self.labels.values():
+            label.configure(text=text)
+        try:
+            desktop.manager.switch_to(self.desktop_name)
+            tracing.report('switched')
+        except Exception as e:
+            sys.stderr.write(f"Lock switch error: {e}\n")
+        for w in self.windows.values():
+            w.deiconify()
         self._bind_hotkeys()
 
-        # Main loop on primary
-        primary = self.root or (self.windows[0] if self.windows else None)
+    def run(self, standby: bool = False):
+        # Create fullscreen windows for each monitor; the last lock's layout saves enumerating
+        # displays (and importing screeninfo) before the first frame, the watcher corrects it
+        topo = monitors.load_cached()
+        cached = bool(topo)
+        if not cached:
+            topo = monitors.current()
+            monitors.save_cached(topo)
+        for m in topo:
+            self.windows[m.key] = self._build_window_for_monitor(m)
 
-        def check_unlock():
-            if self.password_unlocked.is_set():
-                # Signal unlock by switching back to Default desktop
-                try:
-                    hdef = desktop.open_desktop(desktop.DEFAULT_DESKTOP)
-                    desktop.switch_desktop(hdef)
-                    desktop.close_desktop(hdef)
-                except Exception as e:
-                    # Best effort; still exit
-                    sys.stderr.write(f"Unlock switch error: {e}\n")
-                finally:
-                    for w in self.windows:
-                        try:
-                            w.destroy()
-                        except Exception:
-                            pass
-                    if self.root:
-                        try:
-                            self.root.destroy()
-                        except Exception:
-                            pass
-                    # Exit process
-                    os._exit(0)
-            else:
-                if primary is not None:
-                    primary.after(200, check_unlock)
+        # Main loop on primary
+        primary = self.root
 
-        if primary is not None:
-            primary.after(200, check_unlock)
-            # Run a single mainloop in the main thread
-            primary.mainloop()
+        if primary is None:
+            return
+        self.channel = ParentChannel(self._on_parent_message, self._on_parent_gone)
+        if standby:
+            # Hide before the first idle pass maps anything
+            for w in self.windows.values():
+                w.withdraw()
+        else:
+            self.shown = True
+            self._bind_hotkeys()
 
+        def _ready():
+            # Start listening only once the main loop runs: after() from the reader needs it
+            self.channel.start()
+            self.channel.send('ready')
+            self._heartbeat()
+            self.monitor_watcher = MonitorWatcher(primary.after, primary.after_cancel, self._apply_topology)
+            self.monitor_watcher.start(topo, check_now=cached)
+        primary.after_idle(_ready)
+        # Run a single mainloop in the main thread
+        primary.mainloop()
 
 def main():
     ap = argparse.ArgumentParser()
@@ -135,28 +362,22 @@ def main():
     ap.add_argument('--reason', choices=['manual', 'schedule'], default='manual')
     ap.add_argument('--start')
     ap.add_argument('--end')
+    ap.add_argument('--standby', action='store_true', help='Build hidden and wait for the parent to send "show"')
     args = ap.parse_args()
+    tracing.report('imported')
 
-    # Attach to lock desktop and make it active
-    hdesk = desktop.open_desktop(args.desktop_name)
-    try:
-        # Must set thread desktop before any windows are created
-        desktop.set_thread_desktop(hdesk)
-        desktop.switch_desktop(hdesk)
-    finally:
-        # Keep our handle open while running; will be closed on exit
-        pass
+    # Attach to lock desktop and make it active; the handle stays cached (and open) while running
+    hdesk = desktop.manager.get(args.desktop_name)
+    # Must set thread desktop before any windows are created
+    desktop.set_thread_desktop(hdesk)
+    if not args.standby:
+        desktop.manager.switch_to(args.desktop_name)
+        tracing.report('switched')
 
     cfg = _load_config()
     hotkey = cfg.get('hotkey', 'ctrl+alt+u')
-    # Build message based on reason
-    if args.reason == 'schedule' and args.start and args.end:
-        msg = f'This desktop is locked by schedule ({args.start}\u2013{args.end}).'
-    elif args.reason == 'manual':
-        msg = 'This desktop is manually locked.'
-    else:
-        msg = 'This desktop is locked.'
-    LockScreen(hotkey, message=msg).run()
+    msg = lock_message(args.reason, args.start, args.end)
+    LockScreen(hotkey, message=msg, desktop_name=args.desktop_name).run(standby=args.standby)
 
 
 if __name__ == '__main__':
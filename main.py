@@ -1,21 +1,48 @@
 import argparse
 import json
 import os
+import queue
 import signal
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import Future
 from dataclasses import dataclass
-from datetime import datetime, time as dtime, timedelta
+from datetime import datetime, timedelta
 from pathlib import Path
 from secrets import token_bytes
 from hashlib import pbkdf2_hmac
 
 import desktop
+import ipc
+import metrics
 import sys as _sys
+import tracing
+from audio import AudioController
+from events import StateVersion, publish
+from ipc import ChildChannel
+from standby import Standby
 
 CONFIG_PATH = Path(__file__).with_name('config.json')
 
+LOCK_SECONDS = metrics.histogram('pclock_lock_seconds', 'Locker.lock_now duration (mute, desktop, child spawn)')
+UNLOCK_SECONDS = metrics.histogram('pclock_unlock_seconds', 'Locker.unlock_now duration (desktop switch, child exit, audio)')
+AUDIO_SECONDS = metrics.histogram('pclock_audio_seconds', 'Muting/restoring all output devices', ('op',))
+LOCKED = metrics.gauge('pclock_locked', '1 while the lock screen is active')
+metrics.gauge('pclock_desktop_handles', 'Desktop handles held open by desktop.manager',
+              fn=lambda: desktop.manager.open_handles())
+HUNG = metrics.counter('pclock_lockscreen_hung_total', 'Lock screen children killed after missing heartbeats')
+CRASHES = metrics.counter('pclock_lockscreen_crashes_total', 'Lock screen children that exited without an unlock')
+RESTARTS = metrics.counter('pclock_lockscreen_restarts_total', 'Lock screen children respawned after a crash')
+COMMANDS = metrics.counter('pclock_locker_commands_total', 'Commands run by the Locker thread', ('kind',))
+COALESCED = metrics.counter('pclock_locker_coalesced_total', 'lock/unlock requests answered by an identical request of the same batch')
+
+# Respawn after a crash: the first one is immediate, repeated crashes back off
+RESPAWN_BACKOFF_BASE = 0.5  # seconds
+RESPAWN_BACKOFF_MAX = 30.0
+RESPAWN_STABLE = 60.0  # a child that ran this long resets the backoff
+
 
 def load_config():
     from config import load_config as _load
@@ -74,18 +101,58 @@ def set_password_interactive():
         print('Password updated.')
         return
 
-def in_lock_window(now: datetime, start: dtime, end: dtime) -> bool:
-    cur = now.time()
-    if start == end:
-        return False
-    if start < end:
-        return start <= cur < end
-    # overnight
-    return cur >= start or cur < end
+
+def calibrate_kdf_interactive(algo: str, target_ms: int):
+    from config import calibrate_kdf, get_config
+    print(f'Calibrating {algo} for ~{target_ms} ms per verification...')
+    try:
+        report = calibrate_kdf(algo, target_ms)
+    except ValueError as e:
+        print(f'Calibration failed: {e}')
+        return
+    params = ', '.join(f'{k}={v}' for k, v in report['params'].items())
+    print(f"  probe run       : {report['probe_ms']:.1f} ms")
+    print(f"  chosen params   : {report['algo']} ({params})")
+    print(f"  measured verify : {report['measured_ms']:.1f} ms")
+    if report['capped']:
+        print('  (scrypt is capped at n=2^17, 128 MiB per check, below the target time)')
+    if get_config().password.hash:
+        print('The stored password hash is upgraded on the next successful unlock.')
+
+
+def dump_traces(path: str):
+    data = json.dumps({"traces": tracing.tracer.recent()}, indent=2)
+    if path == '-':
+        print(data)
+        return
+    try:
+        Path(path).write_text(data, encoding='utf-8')
+    except Exception as e:
+        print(f'Failed to write traces: {e}')
+
+
+def _child_flags() -> int:
+    flags = getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+    # Hide any console window for child on Windows
+    if hasattr(subprocess, 'CREATE_NO_WINDOW'):
+        flags |= subprocess.CREATE_NO_WINDOW
+    return flags
 
 
-@dataclass
+def _record(kind: str, detail: str | None = None):
+    # Lock history is only kept when the SQLite settings store is in use
+    from settings_db import record_event
+    record_event(kind, detail)
+
+
+def _standby_relevant(cfg):
+    # What a standby child reads at startup; the password is checked live
+    return cfg.to_dict() | {"password": None}
+
+
+@dataclass(frozen=True)
 class LockState:
+    """Snapshot of the lock; replaced as a whole, so it can be read without locking."""
     process: subprocess.Popen | None = None
     active: bool = False
     reason: str | None = None
@@ -94,162 +161,422 @@ class LockState:
 
 
 class Locker:
+    """Owns the lock screen. All state changes run on one thread, the `locker` actor.
+
+    lock_now()/unlock_now() queue a command and wait for it; submit() returns
+    the Future instead. Child exits, IPC messages and respawns are queued the
+    same way, so nothing else writes `state`. Readers just read `state`.
+    """
+
     def __init__(self):
         self.state = LockState()
         self._watch_thread = None
         self.override_until: datetime | None = None
-        self._prev_muted: int | None = None
+        self.audio = AudioController()  # mutes every output device while locked
+        self.trace: tracing.Trace | None = None  # trace of the current lock; child marks land here
+        self.channel: ChildChannel | None = None  # IPC with the current lockscreen child
+        self.standby: Standby | None = None  # pre-started child, created by prepare_standby()
+        self._standby_config = None  # config the standby child was built with
+        self._crash_streak = 0  # consecutive crashes of the current lock's children
+        self.version = StateVersion()  # bumped on every state change (API ETags)
+        self._commands: queue.SimpleQueue = queue.SimpleQueue()  # (kind, args, Future)
+        self._handlers = {
+            'lock': self._lock, 'unlock': self._unlock, 'call': lambda fn: fn(),
+            'child_exited': self._child_exited, 'child_unlocked': self._child_unlocked,
+            'respawn': self._respawn, 'prepare_standby': self._prepare_standby,
+        }
+        self._actor = threading.Thread(target=self._run, daemon=True, name='locker')
+        self._actor.start()
+
+    # --- command queue ---
+
+    def submit(self, kind: str, **args) -> Future:
+        """Queue a command ('lock', 'unlock', ...); the Future resolves to its result."""
+        future = Future()
+        self._commands.put((kind, args, future))
+        return future
+
+    def _call(self, kind: str, **args):
+        if threading.current_thread() is self._actor:
+            # Nested in another command (exclusive()): run it in place
+            return self._handlers[kind](**args)
+        return self.submit(kind, **args).result()
+
+    def exclusive(self, fn):
+        """Run `fn()` as a single command: no other lock/unlock happens in between."""
+        return self._call('call', fn=fn)
+
+    def _run(self):
+        while True:
+            batch = [self._commands.get()]
+            while True:
+                try:
+                    batch.append(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+            i = 0
+            while i < len(batch):
+                j = i + 1
+                if batch[i][0] in ('lock', 'unlock'):
+                    # A run of the same request: all but the first would be no-ops, answer them together.
+                    # Opposite requests are not merged, so nobody gets a state that contradicts its own.
+                    while j < len(batch) and batch[j][0] == batch[i][0]:
+                        j += 1
+                COALESCED.inc(j - i - 1)
+                self._execute(batch[i][0], batch[i][1], [f for _, _, f in batch[i:j]])
+                i = j
+
+    def _execute(self, kind: str, args: dict, futures: list):
+        COMMANDS.labels(kind).inc()
+        try:
+            result = self._handlers[kind](**args)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future in futures:
+            future.set_result(result)
+
+    def _set_state(self, state: LockState):
+        # Bump before the event is published so API long-polls see the new version
+        self.state = state
+        self.version.bump()
+        LOCKED.set(1 if state.active else 0)
+
+    def _watch_child(self, proc: subprocess.Popen, channel: ChildChannel | None = None):
+        killed = False
+        while True:
+            try:
+                proc.wait(ipc.HEARTBEAT_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                # A frozen lock screen stops sending heartbeats; replace it rather than wait forever
+                if not killed and channel is not None and channel.hung() and self.state.process is proc:
+                    killed = True
+                    HUNG.inc()
+                    _record('hung', str(proc.pid))
+                    publish('lockscreen_hung', {"pid": proc.pid, "reason": self.state.reason})
+                    try:
+                        proc.kill()
+                    except Exception:
+                        pass
+            except Exception:
+                break
+        if channel is not None:
+            # Its last words (`unlocked`) may still be in the pipe
+            channel.join(1.0)
+        self.submit('child_exited', proc=proc, channel=channel)
+
+    def _child_exited(self, proc: subprocess.Popen, channel: ChildChannel | None):
+        trace = self.trace
+        if trace is not None and self.state.process is proc:
+            trace.mark('exited')
+        # Only the current child matters; earlier ones were unlocked or replaced
+        if self.state.process is not proc:
+            return
+        code = proc.returncode
+        # Every unlock path of the child sends `unlocked` first; anything else is a crash
+        clean = channel.seen('unlocked') is not None if channel is not None else code == 0
+        if clean:
+            self._password_unlocked()
+            return
+        CRASHES.inc()
+        _record('crashed', str(code))
+        publish('lockscreen_crashed', {"exit_code": code, "reason": self.state.reason})
+        if trace is not None and time.perf_counter() - trace.start >= RESPAWN_STABLE:
+            self._crash_streak = 0
+        self._crash_streak += 1
+        # Stay locked: put a new lock screen up
+        self._schedule_respawn(proc, code, tracing.tracer.start('relock', attempt=self._crash_streak, exit_code=code))
+
+    def _respawn_delay(self) -> float:
+        if self._crash_streak <= 1:
+            return 0.0
+        return min(RESPAWN_BACKOFF_MAX, RESPAWN_BACKOFF_BASE * 2 ** (self._crash_streak - 2))
+
+    def _schedule_respawn(self, dead: subprocess.Popen, code, trace):
+        delay = self._respawn_delay()
+        if not delay:
+            self._respawn(dead, code, trace)
+            return
+        trace.set(backoff_s=delay)
+        # Back off without blocking the command queue
+        timer = threading.Timer(delay, self.submit, args=('respawn',), kwargs={"dead": dead, "code": code, "trace": trace})
+        timer.daemon = True
+        timer.start()
+
+    def _respawn(self, dead: subprocess.Popen, code, trace):
+        # Unlocked (or relocked) meanwhile: nothing to do
+        if self.state.process is not dead:
+            trace.set(cancelled=True)
+            trace.end()
+            return
+        st = self.state
+        try:
+            proc, channel = self._start_child(trace, st.reason, st.start, st.end)
+        except Exception as e:
+            trace.mark('spawn_failed')
+            trace.set(error=str(e))
+            self._crash_streak += 1
+            self._schedule_respawn(dead, code, trace)
+            return
+        trace.set(pid=proc.pid, reason=st.reason)
+        self.trace = trace
+        self.channel = channel
+        self._set_state(LockState(process=proc, active=True, reason=st.reason, start=st.start, end=st.end))
+        RESTARTS.inc()
+        _record('restarted', str(proc.pid))
+        publish('lockscreen_restarted', {"pid": proc.pid, "attempt": self._crash_streak, "exit_code": code})
+        self._start_watcher(proc, channel, trace)
+        trace.end()
+
+    def _on_child_message(self, channel: ChildChannel, msg: dict):
+        # IPC reader thread: a password unlock is final as soon as the child says so
+        if msg['type'] == 'unlocked' and msg.get('by') == 'password':
+            self.submit('child_unlocked', proc=channel.proc)
+
+    def _child_unlocked(self, proc: subprocess.Popen):
+        if self.state.process is proc:
+            self._password_unlocked()
 
-    def _watch_child(self, proc: subprocess.Popen):
+    def _password_unlocked(self):
+        # If current lock was schedule-initiated, disable schedule on manual unlock
         try:
-            proc.wait()
+            if self.state.reason == 'schedule':
+                from schedule_store import read_schedule, write_schedule
+                sched = read_schedule()
+                if bool(sched.get('enabled', False)):
+                    write_schedule(False, sched.get('start', '22:00'), sched.get('end', '07:00'),
+                                   sched.get('notify_minutes'), sched.get('windows'))
         except Exception:
             pass
-        # If the same process is still referenced, mark as inactive
-        if self.state.process is proc:
-            # If current lock was schedule-initiated, disable schedule on manual unlock
-            try:
-                if self.state.reason == 'schedule':
-                    from schedule_store import read_schedule, write_schedule
-                    sched = read_schedule()
-                    if bool(sched.get('enabled', False)):
-                        write_schedule(False, sched.get('start', '22:00'), sched.get('end', '07:00'))
-            except Exception:
-                pass
-            # Clear state
-            self.state = LockState()
+        # Clear state
+        self._set_state(LockState())
+        _record('unlocked', 'password')
+        publish('unlocked', {"by": "password"})
 
     def _mute_system(self):
         try:
-            from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-            from ctypes import POINTER, cast
-            from comtypes import CLSCTX_ALL
-            devices = AudioUtilities.GetSpeakers()
-            interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-            volume = cast(interface, POINTER(IAudioEndpointVolume))
-            current = int(volume.GetMute())
-            if self._prev_muted is None:
-                self._prev_muted = current
-            if current == 0:
-                volume.SetMute(1, None)
+            with AUDIO_SECONDS.labels('mute').time():
+                self.audio.mute_all()
         except Exception:
             pass
 
     def _restore_audio(self):
         try:
-            if self._prev_muted is None:
-                return
-            from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-            from ctypes import POINTER, cast
-            from comtypes import CLSCTX_ALL
-            devices = AudioUtilities.GetSpeakers()
-            interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-            volume = cast(interface, POINTER(IAudioEndpointVolume))
-            volume.SetMute(int(self._prev_muted), None)
+            with AUDIO_SECONDS.labels('restore').time():
+                self.audio.restore_all()
         except Exception:
             pass
-        finally:
-            self._prev_muted = None
 
-    def lock_now(self, reason: str = 'manual', start: str | None = None, end: str | None = None):
-        if self.state.active:
-            return
-        # Mute audio (A1)
-        self._mute_system()
-        # Create/open alternate desktop and spawn lockscreen process bound to it
-        hdesk = desktop.create_or_open_desktop(desktop.LOCK_DESKTOP)
-        # Keep the handle open in this process lifetime
-        # Start child process
+    def _child_command(self, reason: str, start: str | None, end: str | None, standby: bool = False) -> list:
         if getattr(_sys, 'frozen', False):
             # Relaunch the same EXE in lockscreen mode
             cmd = [sys.executable, '--mode', 'lockscreen', '--desktop-name', desktop.LOCK_DESKTOP, '--reason', reason]
-            if reason == 'schedule' and start and end:
-                cmd += ['--start', start, '--end', end]
         else:
             cmd = [sys.executable, str(Path(__file__).with_name('lockscreen.py')), '--desktop-name', desktop.LOCK_DESKTOP, '--reason', reason]
-            if reason == 'schedule' and start and end:
-                cmd += ['--start', start, '--end', end]
-        flags = subprocess.CREATE_NEW_PROCESS_GROUP
-        # Hide any console window for child on Windows
-        if hasattr(subprocess, 'CREATE_NO_WINDOW'):
-            flags |= subprocess.CREATE_NO_WINDOW
-        proc = subprocess.Popen(cmd, creationflags=flags)
-        self.state = LockState(process=proc, active=True, reason=reason, start=start, end=end)
-        # Start watcher to reset state when child exits (e.g., after password unlock)
+        if reason == 'schedule' and start and end:
+            cmd += ['--start', start, '--end', end]
+        if standby:
+            cmd.append('--standby')
+        return cmd
+
+    def close(self) -> None:
+        """Release what is kept for the life of the process (on exit, after unlocking)."""
+        if self.standby is not None:
+            self.standby.close()
+        self.audio.close()
+        desktop.manager.close_all()
+
+    def standby_lead(self) -> float | None:
+        """Seconds before a scheduled lock to start the standby child; None when disabled."""
         try:
-            import threading
-            self._watch_thread = threading.Thread(target=self._watch_child, args=(proc,), daemon=True)
-            self._watch_thread.start()
+            from config import get_config
+            cfg = get_config().standby
+        except Exception:
+            return None
+        return max(0.0, cfg.lead_minutes * 60) if cfg.enabled else None
+
+    def prepare_standby(self):
+        """Start a pre-warmed lockscreen child unless one is already waiting (best effort)."""
+        try:
+            self._call('prepare_standby')
         except Exception:
             pass
-        # Do not close hdesk yet; keeping handle open ensures desktop persists
-        # We intentionally leak hdesk here; the OS will clean up on exit.
 
-    def unlock_now(self):
-        if not self.state.active:
+    def _prepare_standby(self):
+        from config import get_config, subscribe
+        cfg = get_config()
+        if not cfg.standby.enabled or self.state.active:
+            return
+        if self.standby is None:
+            self.standby = Standby(lambda: self._child_command('manual', None, None, standby=True),
+                                   cfg.standby.idle_minutes * 60, _child_flags())
+            self._standby_config = _standby_relevant(cfg)
+            subscribe(self._on_config)
+        # The child attaches to the lock desktop at startup
+        desktop.manager.lock_desktop()
+        self.standby.prepare()
+
+    def _on_config(self, cfg):
+        standby = self.standby
+        if standby is None:
+            return
+        if not cfg.standby.enabled:
+            standby.close()
             return
-        # Switch back to default desktop (best-effort)
+        standby.idle_timeout = cfg.standby.idle_minutes * 60
+        relevant = _standby_relevant(cfg)
+        if relevant != self._standby_config:
+            self._standby_config = relevant
+            standby.recycle()
+
+    def _take_standby(self, trace, reason: str, start: str | None, end: str | None):
+        """Show the standby child; (proc, channel) or None if a cold start is needed."""
+        if self.standby is None:
+            return None
+        with trace.span('standby_ready'):
+            taken = self.standby.take()
+        if taken is None:
+            return None
+        proc, channel = taken
+        channel.trace = trace
+        channel.on_message = self._on_child_message
+        with trace.span('show'):
+            if channel.send('show', reason=reason, start=start, end=end):
+                return taken
+        channel.close()
         try:
-            hdef = desktop.open_desktop(desktop.DEFAULT_DESKTOP)
-            desktop.switch_desktop(hdef)
-            desktop.close_desktop(hdef)
+            proc.terminate()
         except Exception:
             pass
-        # Terminate child process if still alive
-        if self.state.process and self.state.process.poll() is None:
-            try:
-                self.state.process.send_signal(signal.CTRL_BREAK_EVENT)
-                # Give it a moment to exit
-                for _ in range(20):
-                    if self.state.process.poll() is not None:
-                        break
-                    time.sleep(0.1)
-            except Exception:
-                pass
+        return None
+
+    def _start_child(self, trace, reason: str, start: str | None, end: str | None):
+        """Put a lock screen up: the standby child if there is one, else a new process."""
+        taken = self._take_standby(trace, reason, start, end)
+        if taken is not None:
+            proc, channel = taken
+        else:
+            # Create/open alternate desktop (once; the cached handle keeps it alive) and spawn lockscreen process bound to it
+            with trace.span('desktop'):
+                desktop.manager.lock_desktop()
+            # Start child process
+            with trace.span('spawn'):
+                # stdin/stdout carry IPC messages and the child's trace reports
+                proc = subprocess.Popen(self._child_command(reason, start, end), creationflags=_child_flags(),
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+                channel = ChildChannel(proc, self._on_child_message, trace)
+        trace.set(pid=proc.pid, standby=taken is not None)
+        return proc, channel
+
+    def _start_watcher(self, proc: subprocess.Popen, channel: ChildChannel, trace):
+        # Start watcher to reset state when child exits (e.g., after password unlock)
+        with trace.span('watcher'):
             try:
-                self.state.process.terminate()
+                self._watch_thread = threading.Thread(target=self._watch_child, args=(proc, channel), daemon=True)
+                self._watch_thread.start()
             except Exception:
                 pass
-        # Restore audio
-        self._restore_audio()
-        self.state = LockState()
 
+    def lock_now(self, reason: str = 'manual', start: str | None = None, end: str | None = None) -> LockState:
+        return self._call('lock', reason=reason, start=start, end=end)
+
+    def unlock_now(self) -> LockState:
+        return self._call('unlock')
+
+    def _lock(self, reason: str = 'manual', start: str | None = None, end: str | None = None) -> LockState:
+        if self.state.active:
+            return self.state
+        t0 = time.perf_counter()
+        trace = self.trace = tracing.tracer.start('lock', reason=reason)
+        # Mute audio (A1)
+        with trace.span('mute'):
+            self._mute_system()
+        self._crash_streak = 0
+        proc, channel = self._start_child(trace, reason, start, end)
+        self.channel = channel
+        self._set_state(LockState(process=proc, active=True, reason=reason, start=start, end=end))
+        _record('locked', reason)
+        publish('locked', {"reason": reason, "start": start, "end": end})
+        self._start_watcher(proc, channel, trace)
+        trace.end()
+        LOCK_SECONDS.observe(time.perf_counter() - t0)
+        return self.state
+
+    def _unlock(self) -> LockState:
+        if not self.state.active:
+            return self.state
+        t0 = time.perf_counter()
+        trace = tracing.tracer.start('unlock', by='remote')
+        proc, channel = self.state.process, self.channel
+        acked = False
+        if proc is not None and proc.poll() is None and channel is not None:
+            # The child switches back and exits itself; done once it says so
+            with trace.span('unlock_ack'):
+                if channel.send('unlock_requested'):
+                    acked = channel.wait_for('unlocked', ipc.UNLOCK_ACK_TIMEOUT) is not None
+        trace.set(acked=acked)
+        if not acked:
+            # Switch back to default desktop (best-effort)
+            with trace.span('switch_desktop'):
+                try:
+                    desktop.manager.switch_to(desktop.DEFAULT_DESKTOP)
+                except Exception:
+                    pass
+            # Terminate child process if still alive (hung or not answering)
+            if proc is not None and proc.poll() is None:
+                with trace.span('child_exit'):
+                    try:
+                        proc.send_signal(signal.CTRL_BREAK_EVENT)
+                        # Give it a moment to exit
+                        for _ in range(20):
+                            if proc.poll() is not None:
+                                break
+                            time.sleep(0.1)
+                    except Exception:
+                        pass
+                with trace.span('terminate'):
+                    try:
+                        proc.terminate()
+                    except Exception:
+                        pass
+        # Restore audio
+        with trace.span('restore_audio'):
+            self._restore_audio()
+        self._set_state(LockState())
+        self.channel = None
+        trace.end()
+        UNLOCK_SECONDS.observe(time.perf_counter() - t0)
+        _record('unlocked', 'remote')
+        publish('unlocked', {"by": "remote"})
+        return self.state
 
 
 def scheduler_loop(locker: Locker):
-    while True:
-        from schedule_store import read_schedule
-        sched = read_schedule()
-        if not bool(sched.get('enabled', False)):
-            time.sleep(1)
-            continue
-        try:
-            start = dtime.fromisoformat(sched.get('start', '22:00'))
-            end = dtime.fromisoformat(sched.get('end', '07:00'))
-        except Exception:
-            time.sleep(5)
-            continue
-        now = datetime.now()
-        should_lock = in_lock_window(now, start, end)
-        if should_lock and not locker.state.active:
-            locker.lock_now(reason='schedule', start=start.isoformat(timespec='minutes'), end=end.isoformat(timespec='minutes'))
-        elif not should_lock and locker.state.active:
-            locker.unlock_now()
-        time.sleep(1)
+    """Run the schedule engine until interrupted.
+
+    The engine runs on a worker thread: lock waits are not interruptible by
+    Ctrl+C on Windows, while time.sleep() in the main thread is.
+    """
+    from schedule_engine import ScheduleEngine
+    engine = ScheduleEngine(locker)
+    engine.start()
+    try:
+        while True:
+            time.sleep(3600)
+    finally:
+        engine.stop()
 
 
 def lock_if_in_schedule_now(locker: Locker):
     from schedule_store import read_schedule
-    sched = read_schedule()
-    if not bool(sched.get('enabled', False)):
-        return
-    try:
-        start = dtime.fromisoformat(sched.get('start', '22:00'))
-        end = dtime.fromisoformat(sched.get('end', '07:00'))
-    except Exception:
+    from schedule_engine import current_window, window_labels
+    window = current_window(read_schedule(), datetime.now())
+    if window is None:
         return
-    if in_lock_window(datetime.now(), start, end):
-        locker.lock_now(reason='schedule', start=start.isoformat(timespec='minutes'), end=end.isoformat(timespec='minutes'))
+    start, end = window_labels(window)
+    locker.lock_now(reason='schedule', start=start, end=end)
 
 
 
@@ -302,11 +629,17 @@ def main():
     ap.add_argument('--set-password', action='store_true', help='Set or change the unlock password')
     ap.add_argument('--install-startup', action='store_true', help='Install auto-start entry (current user)')
     ap.add_argument('--uninstall-startup', action='store_true', help='Remove auto-start entry (current user)')
+    ap.add_argument('--migrate-sqlite', action='store_true', help='Move settings into settings.db (SQLite, WAL mode)')
+    ap.add_argument('--calibrate-kdf', action='store_true', help='Benchmark this machine and pick password hashing parameters')
+    ap.add_argument('--kdf-algo', choices=['pbkdf2_sha256', 'scrypt'], default='pbkdf2_sha256', help='Algorithm for --calibrate-kdf')
+    ap.add_argument('--kdf-target-ms', type=int, default=250, help='Target verify time for --calibrate-kdf')
+    ap.add_argument('--dump-traces', metavar='FILE', help="Write lock/unlock phase traces as JSON to FILE ('-' for stdout) on exit")
     # passthrough for lockscreen mode
     ap.add_argument('--desktop-name', default=desktop.LOCK_DESKTOP)
     ap.add_argument('--reason', choices=['manual', 'schedule'], default='manual')
     ap.add_argument('--start')
     ap.add_argument('--end')
+    ap.add_argument('--standby', action='store_true', help=argparse.SUPPRESS)
     args = ap.parse_args()
 
     if args.set_password:
@@ -321,11 +654,20 @@ def main():
         uninstall_startup()
         return
 
+    if args.migrate_sqlite:
+        import settings_db
+        print(settings_db.migrate())
+        return
+
+    if args.calibrate_kdf:
+        calibrate_kdf_interactive(args.kdf_algo, args.kdf_target_ms)
+        return
+
     # If packaged exe is invoked in lockscreen mode, run lockscreen now
     if args.mode == 'lockscreen':
         import lockscreen as _lock
         # Reuse parsed args for consistency
-        sys.argv = [sys.argv[0], '--desktop-name', args.desktop_name, '--reason', args.reason] + ([] if not args.start or not args.end else ['--start', args.start, '--end', args.end])
+        sys.argv = [sys.argv[0], '--desktop-name', args.desktop_name, '--reason', args.reason] + ([] if not args.start or not args.end else ['--start', args.start, '--end', args.end]) + (['--standby'] if args.standby else [])
         _lock.main()
         return
 
@@ -345,6 +687,9 @@ def main():
         return
 
     locker = Locker()
+    if args.dump_traces:
+        import atexit
+        atexit.register(dump_traces, args.dump_traces)
 
     # Start REST API if enabled in config
     api_server = maybe_start_api(locker)
@@ -360,6 +705,7 @@ def main():
                 time.sleep(1)
         except KeyboardInterrupt:
             locker.unlock_now()
+            locker.close()
             return
 
     print('PC Lock scheduler running. Press Ctrl+C to exit.')
@@ -367,6 +713,7 @@ def main():
         scheduler_loop(locker)
     except KeyboardInterrupt:
         locker.unlock_now()
+        locker.close()
         print('Exiting.')
 
 
@@ -0,0 +1,323 @@
+"""
+In-process metrics for PC-Lock, exported at GET /api/metrics in the
+Prometheus text exposition format.
+
+Counters and histograms are sharded per thread: an update touches only the
+calling thread's own list and takes no lock. Scrapes sum the shards. Shards
+of threads that have exited (e.g. per-connection API threads) are folded into
+a retired total so they do not pile up.
+
+    REQUESTS = metrics.counter('pclock_api_requests_total', 'API requests', ('route', 'status'))
+    REQUESTS.labels('/api/status', '200').inc()
+    with metrics.histogram('pclock_lock_seconds', 'lock_now duration').time():
+        ...
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+
+# Seconds; suits everything from a token check to a slow desktop switch
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_MAX_SHARDS = 32  # live + dead shards before dead ones are folded on the write path
+
+
+class _Shards:
+    """Per-thread lists of `width` numbers, summed on read."""
+
+    def __init__(self, width: int):
+        self.width = width
+        self._local = threading.local()
+        self._shards: list = []  # (thread, values)
+        self._retired = [0] * width
+        self._lock = threading.Lock()
+
+    def mine(self) -> list:
+        values = getattr(self._local, 'values', None)
+        if values is None:
+            values = [0] * self.width
+            self._local.values = values
+            with self._lock:
+                if len(self._shards) >= _MAX_SHARDS:
+                    self._fold()
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def _fold(self):
+        live = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                live.append((thread, values))
+            else:
+                for i, v in enumerate(values):
+                    self._retired[i] += v
+        self._shards = live
+
+    def total(self) -> list:
+        with self._lock:
+            self._fold()
+            out = list(self._retired)
+            for _, values in self._shards:
+                for i, v in enumerate(values):
+                    out[i] += v
+        return out
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict = {}
+        self._lock = threading.Lock()
+        self._unlabelled = None
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def _default(self):
+        child = self._unlabelled
+        if child is None:
+            child = self._unlabelled = self.labels()
+        return child
+
+    def _label_str(self, key, extra: str = '') -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('_shards',)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.mine()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.total()[0]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    _child = _CounterChild
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+    def value(self) -> float:
+        return self._default().value()
+
+    def _render_child(self, key, child):
+        return [f'{self.name}{self._label_str(key)} {_num(child.value())}']
+
+
+class _GaugeChild:
+    __slots__ = ('_value',)
+
+    def __init__(self):
+        self._value = 0
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge(_Metric):
+    """Last-set value, or the result of `fn()` evaluated at scrape time."""
+    kind = 'gauge'
+    _child = _GaugeChild
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def render(self) -> list:
+        if self.fn is None:
+            return super().render()
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}', f'{self.name} {_num(value)}']
+
+    def _render_child(self, key, child):
+        return [f'{self.name}{self._label_str(key)} {_num(child.value())}']
+
+
+class _HistogramChild:
+    __slots__ = ('_bounds', '_shards')
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # One slot per bucket, one for +Inf, then sum and count
+        self._shards = _Shards(len(bounds) + 3)
+
+    def observe(self, value: float) -> None:
+        values = self._shards.mine()
+        values[bisect.bisect_left(self._bounds, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self) -> tuple[list, float, int]:
+        values = self._shards.total()
+        return values[:-2], values[-2], values[-1]
+
+
+class _Timer:
+    __slots__ = ('_child', '_t0')
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._t0)
+        return False
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child):
+        counts, total, count = child.snapshot()
+        lines = []
+        running = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            running += n
+            le = '+Inf' if bound == float('inf') else _num(bound)
+            labels = self._label_str(key, 'le="%s"' % le)
+            lines.append(f'{self.name}_bucket{labels} {running}')
+        lines.append(f'{self.name}_sum{self._label_str(key)} {_num(total)}')
+        lines.append(f'{self.name}_count{self._label_str(key)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict = {}
+        self._lock = threading.Lock()
+
+    def _get_or_add(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f'{name} already registered as {metric.kind}')
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _num(value) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def counter(name: str, help: str, labelnames=()) -> Counter:
+    return REGISTRY._get_or_add(Counter, name, help, labelnames)
+
+
+def gauge(name: str, help: str, labelnames=(), fn=None) -> Gauge:
+    return REGISTRY._get_or_add(Gauge, name, help, labelnames, fn=fn)
+
+
+def histogram(name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY._get_or_add(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def rss_bytes() -> int | None:
+    """Resident set size of this process, or None if it cannot be read."""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        psapi = ctypes.WinDLL('psapi', use_last_error=True)
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+        if psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Process-wide gauges
+gauge('pclock_threads', 'Live Python threads', fn=threading.active_count)
+gauge('pclock_resident_memory_bytes', 'Resident set size of the process', fn=rss_bytes)
@@ -0,0 +1,194 @@
+"""
+Monitor topology for the lock screen windows.
+
+The lock screen covers every display with one window. A topology is the
+tuple of Monitor records it was built for; the primary display is always
+keyed 'primary' (the Tk root window covers it), the others by device name.
+When displays are plugged in, removed or change resolution while locked,
+diff() of the old and new topology says which windows to create, move or
+destroy, and apply() does only that.
+
+The last topology is cached in the app dir, so the next lock can build its
+windows before screeninfo is even imported; MonitorWatcher then corrects a
+stale cache on its first check.
+
+    watcher = MonitorWatcher(root.after, root.after_cancel, on_change)
+    watcher.start(topology)
+"""
+from typing import NamedTuple
+
+POLL_MS = 2000  # how often MonitorWatcher looks for display changes
+CACHE_NAME = 'monitors.json'
+
+
+class Monitor(NamedTuple):
+    key: str  # 'primary', or the display's device name
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def geometry(self) -> str:
+        return f'{self.width}x{self.height}+{self.x}+{self.y}'
+
+
+class Changes(NamedTuple):
+    added: tuple
+    moved: tuple  # same key, new position or size
+    removed: tuple
+
+    def __bool__(self):
+        return bool(self.added or self.moved or self.removed)
+
+
+def topology(monitors) -> tuple:
+    """Monitor records for screeninfo-style objects: primary first, then by position."""
+    ordered = sorted(monitors, key=lambda m: (not getattr(m, 'is_primary', False), m.x, m.y))
+    result = []
+    for i, m in enumerate(ordered):
+        key = 'primary' if i == 0 else (getattr(m, 'name', None) or f'#{m.x},{m.y}')
+        result.append(Monitor(key, int(m.x), int(m.y), int(m.width), int(m.height)))
+    return tuple(result)
+
+
+def current(provider=None) -> tuple:
+    """The topology right now; `provider()` defaults to screeninfo.get_monitors."""
+    if provider is None:
+        from screeninfo import get_monitors as provider
+    return topology(provider())
+
+
+def diff(old, new) -> Changes:
+    before = {m.key: m for m in old}
+    after = {m.key: m for m in new}
+    return Changes(
+        added=tuple(m for m in new if m.key not in before),
+        moved=tuple(m for m in new if m.key in before and before[m.key] != m),
+        removed=tuple(m for m in old if m.key not in after),
+    )
+
+
+def apply(windows: dict, changes: Changes, create, move, destroy) -> None:
+    """Bring `windows` (key -> window) in line with `changes`.
+
+    `create(monitor)` returns a new window, `move(window, monitor)` and
+    `destroy(window)` act on existing ones. Keys are processed in topology
+    order, so 'primary' is created first.
+    """
+    for m in changes.removed:
+        window = windows.pop(m.key, None)
+        if window is not None:
+            destroy(window)
+    for m in changes.moved:
+        move(windows[m.key], m)
+    for m in changes.added:
+        windows[m.key] = create(m)
+
+
+def _cache():
+    from config import get_app_dir
+    from persist import AtomicFile, JsonCodec
+    return AtomicFile(get_app_dir() / CACHE_NAME, JsonCodec(), coalesce=0)
+
+
+def load_cached() -> tuple:
+    """The topology of the last lock, or () if there is none (best effort)."""
+    try:
+        return tuple(Monitor(*m) for m in _cache().read())
+    except Exception:
+        return ()
+
+
+def save_cached(topo) -> None:
+    try:
+        _cache().write([list(m) for m in topo])
+    except Exception:
+        pass
+
+
+class MonitorWatcher:
+    """Re-reads the topology every `interval_ms` (and soon after poke()), and calls
+    `on_change(topology, changes)` on the after() thread when it differs."""
+
+    def __init__(self, after, cancel, on_change, provider=None, interval_ms: int = POLL_MS):
+        self.after = after
+        self.cancel = cancel
+        self.on_change = on_change
+        self.provider = provider
+        self.interval_ms = interval_ms
+        self.topology: tuple = ()
+        self.checks = 0
+        self.changes = 0
+        self._timer = None
+
+    def start(self, topo, check_now: bool = False) -> None:
+        """Watch from `topo` on; `check_now` when it came from the cache."""
+        self.topology = tuple(topo)
+        self._timer = self.after(0 if check_now else self.interval_ms, self._tick)
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            try:
+                self.cancel(self._timer)
+            except Exception:
+                pass
+            self._timer = None
+
+    def poke(self) -> None:
+        """A window was resized or moved by the system: check soon."""
+        if self._timer is not None:
+            self.cancel(self._timer)
+            self._timer = self.after(50, self._tick)
+
+    def _tick(self):
+        self._timer = None
+        self.check()
+        self._timer = self.after(self.interval_ms, self._tick)
+
+    def check(self) -> Changes | None:
+        self.checks += 1
+        try:
+            new = current(self.provider)
+        except Exception:
+            return None
+        if not new or new == self.topology:
+            return None  # no displays reported (e.g. mid-switch): keep what is there
+        changes = diff(self.topology, new)
+        self.topology = new
+        self.changes += 1
+        self.on_change(new, changes)
+        return changes
+
+
+class FakeMonitor(NamedTuple):
+    name: str
+    x: int
+    y: int
+    width: int
+    height: int
+    is_primary: bool = False
+
+
+class FakeProvider:
+    """Stands in for screeninfo.get_monitors in benchmarks: call it for the current list."""
+
+    def __init__(self, *monitors: FakeMonitor):
+        self.monitors = list(monitors) or [FakeMonitor('DISPLAY1', 0, 0, 1920, 1080, True)]
+        self.calls = 0
+
+    def __call__(self) -> list:
+        self.calls += 1
+        return list(self.monitors)
+
+    def plug(self, monitor: FakeMonitor) -> None:
+        self.monitors.append(monitor)
+
+    def unplug(self, name: str) -> None:
+        self.monitors = [m for m in self.monitors if m.name != name]
+
+    def resize(self, name: str, width: int, height: int) -> None:
+        self.monitors = [m._replace(width=width, height=height) if m.name == name else m for m in self.monitors]
+
+    def set_primary(self, name: str) -> None:
+        self.monitors = [m._replace(is_primary=m.name == name) for m in self.monitors]
@@ -0,0 +1,165 @@
+"""
+Crash-safe persistence for PC-Lock settings files.
+
+Writes go to a temporary file that is fsync'ed and then renamed over the real
+file, so a crash leaves either the old or the new content, never a torn file.
+The previous content is kept as `<name>.bak` and is used when the main file
+cannot be decoded. Bursts of writes within COALESCE_WINDOW seconds are merged
+into a single commit of the latest value.
+
+The encoding is pluggable (see JsonCodec) so the store can be exercised
+without DPAPI.
+"""
+import atexit
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+from watch import file_stamp
+
+# Writes closer together than this are coalesced into one commit
+COALESCE_WINDOW = 0.5
+
+_NOTHING = object()
+
+
+class JsonCodec:
+    """Plain UTF-8 JSON encoding."""
+
+    def __init__(self, indent: int | None = None):
+        self.indent = indent
+
+    def encode(self, obj) -> bytes:
+        if self.indent is None:
+            return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+        return json.dumps(obj, indent=self.indent).encode('utf-8')
+
+    def decode(self, data: bytes):
+        return json.loads(data.decode('utf-8'))
+
+
+class AtomicFile:
+    """A single document stored atomically in `path` with a last-good backup.
+
+    `codec` provides encode(obj) -> bytes and decode(bytes) -> obj.
+    `on_commit(obj, stamp)` is called after each commit with the file stamp
+    that the new content has on disk. `lock` is held while committing, so
+    owners can take it to keep their in-memory copy in step with the file.
+    """
+
+    def __init__(self, path, codec, coalesce: float = COALESCE_WINDOW, on_commit=None, clock=time.monotonic):
+        self.path = Path(path)
+        self.backup = self.path.with_name(self.path.name + '.bak')
+        self.tmp = self.path.with_name(self.path.name + '.tmp')
+        self.watch_path = self.path
+        self.codec = codec
+        self.coalesce = float(coalesce)
+        self.on_commit = on_commit
+        self.clock = clock
+        self.commits = 0
+        self.coalesced = 0
+        self.recoveries = 0
+        self.lock = threading.RLock()
+        self._pending = _NOTHING
+        self._timer: threading.Timer | None = None
+        self._last_commit = float('-inf')
+        self._primary_ok: bool | None = None  # None = not checked yet
+        atexit.register(self.flush)
+
+    @property
+    def pending(self) -> bool:
+        """True while a coalesced write has not reached the disk yet."""
+        return self._pending is not _NOTHING
+
+    def stamp(self) -> tuple | None:
+        """Changes whenever the stored content changes (None if nothing is stored)."""
+        return file_stamp(self.path)
+
+    def read(self):
+        """Return the stored object, falling back to the last good generation.
+
+        Raises FileNotFoundError when nothing was ever written, or the decode
+        error of the main file when neither generation is readable.
+        """
+        with self.lock:
+            pending = self._pending
+        if pending is not _NOTHING:
+            return pending
+        try:
+            obj = self.codec.decode(self.path.read_bytes())
+            self._primary_ok = True
+            return obj
+        except FileNotFoundError:
+            if not self.backup.exists():
+                raise
+            return self.codec.decode(self.backup.read_bytes())
+        except Exception as e:
+            self._primary_ok = False
+            try:
+                obj = self.codec.decode(self.backup.read_bytes())
+            except Exception:
+                raise e from None
+            self.recoveries += 1
+            return obj
+
+    def write(self, obj) -> bool:
+        """Store `obj`. Returns True if it was committed right away, False if
+        it was folded into a burst that will be committed shortly."""
+        with self.lock:
+            now = self.clock()
+            if self._timer is None and now - self._last_commit >= self.coalesce:
+                self._pending = _NOTHING
+                self._commit(obj)
+                return True
+            if self._pending is not _NOTHING:
+                self.coalesced += 1
+            self._pending = obj
+            if self._timer is None:
+                delay = max(0.0, self._last_commit + self.coalesce - now)
+                self._timer = threading.Timer(delay, self._flush_deferred)
+                self._timer.daemon = True
+                self._timer.start()
+            return False
+
+    def flush(self) -> None:
+        """Commit a pending coalesced write now."""
+        with self.lock:
+            timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            if self._pending is _NOTHING:
+                return
+            obj, self._pending = self._pending, _NOTHING
+            self._commit(obj)
+
+    def _flush_deferred(self):
+        try:
+            self.flush()
+        except Exception as e:
+            sys.stderr.write(f"[persist] Deferred write of {self.path.name} failed: {e}\n")
+
+    def _commit(self, obj) -> None:
+        data = self.codec.encode(obj)
+        with open(self.tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Keep the current generation as backup unless we know it is corrupt.
+        # Copy rather than rename so the main file never disappears for readers.
+        if self._primary_ok is not False and self.path.exists():
+            bak_tmp = self.backup.with_name(self.backup.name + '.tmp')
+            try:
+                shutil.copyfile(self.path, bak_tmp)
+                os.replace(bak_tmp, self.backup)
+            except OSError:
+                pass
+        os.replace(self.tmp, self.path)
+        self._primary_ok = True
+        self._last_commit = self.clock()
+        self.commits += 1
+        if self.on_commit is not None:
+            self.on_commit(obj, file_stamp(self.path))
@@ -0,0 +1,211 @@
+"""
+Event-driven schedule engine for PC-Lock.
+
+Instead of re-reading the schedule every second, the engine works out the next
+instant at which something can happen (lock, unlock or a warning toast) and
+sleeps until then, or until the schedule store reports a change.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import metrics
+from events import publish
+from notifications import DEFAULT_NOTIFY_MINUTES
+from schedule_index import get_index
+
+# Upper bound for a single sleep. The deadline is tracked on the monotonic
+# clock, so wall-clock jumps (manual clock change, DST, resume from sleep) are
+# only noticed when we wake up and look at the wall clock again.
+MAX_SLEEP = 15 * 60
+# Retry delay after an unexpected error while evaluating the schedule
+ERROR_RETRY = 5.0
+# Small slack added to every sleep so we land just after a boundary, not before
+BOUNDARY_SLACK = 0.01
+
+LATENESS = metrics.histogram('pclock_scheduler_lateness_seconds',
+                             'How long after a planned schedule boundary the engine woke up',
+                             buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0, 60.0))
+
+
+def window_labels(window) -> tuple[str | None, str | None]:
+    """HH:MM labels for a (start, end) lock interval, as shown on the lock screen."""
+    start, end = window
+    if start is None or end is None:
+        return None, None
+    return start.strftime('%H:%M'), end.strftime('%H:%M')
+
+
+def current_window(sched: dict, now: datetime):
+    """(start, end) of the scheduled lock interval containing `now`, or None."""
+    if not bool(sched.get('enabled', False)):
+        return None
+    try:
+        return get_index(sched).current(now)
+    except Exception:
+        return None
+
+
+class ScheduleEngine:
+    """Drives a Locker from the stored schedule, waking only on boundaries.
+
+    `store` must provide read_schedule(), subscribe() and unsubscribe(); it
+    defaults to the schedule_store module. `clock` returns the local wall-clock
+    time and `monotonic` the monotonic time in seconds, so both can be replaced
+    in tests.
+    """
+
+    def __init__(self, locker, on_state_change=None, on_warning=None, store=None,
+                 clock=datetime.now, monotonic=time.monotonic, max_sleep: float = MAX_SLEEP):
+        self.locker = locker
+        self.on_state_change = on_state_change
+        self.on_warning = on_warning
+        self.store = store
+        self.clock = clock
+        self.monotonic = monotonic
+        self.max_sleep = float(max_sleep)
+        self.wakeups = 0
+        self._planned: datetime | None = None  # boundary the current sleep is aiming for
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._warned: set[tuple[datetime, int]] = set()  # (window start, minutes)
+
+    def _store(self):
+        if self.store is None:
+            import schedule_store
+            self.store = schedule_store
+        return self.store
+
+    def wake(self, *_args):
+        """Re-evaluate the schedule now (e.g. after it was changed)."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _set_locked(self, locked: bool):
+        if self.on_state_change:
+            self.on_state_change(locked)
+
+    def _warn(self, now: datetime, start_dt: datetime, notify_minutes) -> datetime | None:
+        """Show due warnings for the window starting at `start_dt`.
+
+        Returns the instant of the next pending warning, if any.
+        """
+        # Forget warnings for windows that have already started
+        self._warned = {k for k in self._warned if k[0] > now}
+        due = []
+        upcoming = None
+        for m in notify_minutes:
+            try:
+                m = int(m)
+            except Exception:
+                continue
+            key = (start_dt, m)
+            if key in self._warned:
+                continue
+            at = start_dt - timedelta(minutes=m)
+            if at <= now:
+                due.append(m)
+                self._warned.add(key)
+            elif upcoming is None or at < upcoming:
+                upcoming = at
+        # Several thresholds may be overdue at once (e.g. after startup); only the closest is relevant
+        if due:
+            publish('warning', {"minutes": min(due), "start": start_dt.isoformat(timespec='minutes')})
+            if self.on_warning:
+                self.on_warning(min(due))
+        return upcoming
+
+    def _prewarm(self, now: datetime, start_dt: datetime) -> datetime | None:
+        """Start the locker's standby lockscreen shortly before `start_dt`.
+
+        Returns when to do so if that is still ahead. Lockers without standby
+        support (or with it disabled) are left alone.
+        """
+        lead = getattr(self.locker, 'standby_lead', None)
+        lead = lead() if lead is not None else None
+        if lead is None:
+            return None
+        warm_at = start_dt - timedelta(seconds=lead)
+        if warm_at > now:
+            return warm_at
+        self.locker.prepare_standby()
+        return None
+
+    def step(self) -> float:
+        """Evaluate the schedule once and return the number of seconds to sleep."""
+        now = self.clock()
+        planned, self._planned = self._planned, None
+        if planned is not None and now >= planned:
+            LATENESS.observe((now - planned).total_seconds())
+        sched = self._store().read_schedule()
+        if not bool(sched.get('enabled', False)):
+            self._warned.clear()
+            return self.max_sleep
+        try:
+            index = get_index(sched)
+        except Exception:
+            return self.max_sleep
+        if not index:
+            return self.max_sleep
+
+        window = index.current(now)
+        if window is not None:
+            if not self.locker.state.active:
+                self._warned.clear()
+                start, end = window_labels(window)
+                state = self.locker.lock_now(reason='schedule', start=start, end=end)
+                self._set_locked(state.active)
+            boundary = window[1]
+        else:
+            # Only end locks that the schedule started; manual locks are left alone
+            if self.locker.state.active and self.locker.state.reason == 'schedule':
+                state = self.locker.unlock_now()
+                self._set_locked(state.active)
+            boundary = index.next_start(now)
+            if boundary is not None and not self.locker.state.active:
+                next_start = boundary
+                notify_at = self._warn(now, next_start, sched.get('notify_minutes', DEFAULT_NOTIFY_MINUTES))
+                if notify_at is not None and notify_at < boundary:
+                    boundary = notify_at
+                warm_at = self._prewarm(now, next_start)
+                if warm_at is not None and warm_at < boundary:
+                    boundary = warm_at
+
+        if boundary is None:
+            return self.max_sleep
+        delay = (boundary - now).total_seconds()
+        if delay <= self.max_sleep:
+            self._planned = boundary
+        return max(0.0, min(delay, self.max_sleep))
+
+    def _sleep(self, delay: float):
+        deadline = self.monotonic() + delay + BOUNDARY_SLACK
+        while not self._stop.is_set():
+            remaining = deadline - self.monotonic()
+            if remaining <= 0:
+                break
+            if self._wake.wait(remaining):
+                break
+        self.wakeups += 1
+
+    def run(self):
+        store = self._store()
+        store.subscribe(self.wake)
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                try:
+                    delay = self.step()
+                except Exception:
+                    delay = ERROR_RETRY
+                self._sleep(delay)
+        finally:
+            store.unsubscribe(self.wake)
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run, daemon=True)
+        t.start()
+        return t
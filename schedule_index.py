@@ -0,0 +1,171 @@
+"""
+Weekly lock-window index for PC-Lock.
+
+A schedule is a list of rules, each with a set of weekdays and a daily
+start/end time. The rules are compiled into a sorted, merged table of
+intervals over one week so that "is it locked now?" and "when is the next
+transition?" are bisect lookups instead of re-evaluating every rule.
+"""
+from bisect import bisect_right
+from datetime import datetime, time as dtime, timedelta
+
+DAY = 24 * 60 * 60
+WEEK = 7 * DAY
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+ALL_DAYS = list(range(7))
+
+
+def _parse_day(d) -> int:
+    if isinstance(d, bool):
+        raise ValueError(f'invalid day: {d!r}')
+    if isinstance(d, int):
+        if 0 <= d < 7:
+            return d
+        raise ValueError(f'invalid day: {d!r}')
+    name = str(d).strip().lower()[:3]
+    if name in DAY_NAMES:
+        return DAY_NAMES.index(name)
+    raise ValueError(f'invalid day: {d!r}')
+
+
+def _parse_time(t) -> str:
+    return dtime.fromisoformat(str(t)).isoformat(timespec='minutes')
+
+
+def normalize_windows(raw) -> list[dict]:
+    """Validate weekly rules and return them in canonical form.
+
+    Each rule is `{"days": [...], "start": "HH:MM", "end": "HH:MM"}`. Days may
+    be weekday numbers (0 = Monday) or names ("mon", "Tuesday", ...); a missing
+    or empty list means every day. A rule whose end is not after its start runs
+    overnight into the following day. Raises ValueError on malformed input.
+    """
+    if raw is None:
+        return []
+    if not isinstance(raw, list):
+        raise ValueError('windows must be a list')
+    out = []
+    for w in raw:
+        if not isinstance(w, dict):
+            raise ValueError('each window must be an object')
+        days = w.get('days') or ALL_DAYS
+        if not isinstance(days, list):
+            raise ValueError('days must be a list')
+        out.append({
+            "days": sorted({_parse_day(d) for d in days}),
+            "start": _parse_time(w.get('start')),
+            "end": _parse_time(w.get('end')),
+        })
+    return out
+
+
+def _seconds(t: str) -> int:
+    v = dtime.fromisoformat(t)
+    return v.hour * 3600 + v.minute * 60 + v.second
+
+
+class WeekIndex:
+    """Sorted, merged lock intervals in seconds since Monday 00:00."""
+
+    def __init__(self, intervals: list[tuple[int, int]]):
+        merged: list[list[int]] = []
+        for s, e in sorted(intervals):
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self.starts = [s for s, _ in merged]
+        self.ends = [e for _, e in merged]
+        n = len(merged)
+        self.always = n == 1 and self.starts[0] == 0 and self.ends[0] == WEEK
+        # An interval touching the end of the week continues into the one at Monday 00:00
+        self.wraps = n > 1 and self.starts[0] == 0 and self.ends[-1] == WEEK
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    @staticmethod
+    def _split(now: datetime) -> tuple[datetime, float]:
+        base = datetime.combine(now.date() - timedelta(days=now.weekday()), dtime())
+        return base, (now - base).total_seconds()
+
+    def locked_at(self, now: datetime) -> bool:
+        return self.current(now) is not None
+
+    def current(self, now: datetime) -> tuple[datetime | None, datetime | None] | None:
+        """Return (start, end) of the lock interval containing `now`, or None.
+
+        Start and end are None when the schedule locks around the clock.
+        """
+        if self.always:
+            return (None, None)
+        base, pos = self._split(now)
+        i = bisect_right(self.starts, pos) - 1
+        if i < 0 or pos >= self.ends[i]:
+            return None
+        start, end = self.starts[i], self.ends[i]
+        if self.wraps and i == 0:
+            start = self.starts[-1] - WEEK
+        if self.wraps and i == len(self.starts) - 1:
+            end = WEEK + self.ends[0]
+        return base + timedelta(seconds=start), base + timedelta(seconds=end)
+
+    def next_start(self, now: datetime) -> datetime | None:
+        """Start of the next lock interval after `now` (None if never or always locked)."""
+        if not self.starts or self.always:
+            return None
+        base, pos = self._split(now)
+        i = bisect_right(self.starts, pos)
+        if i < len(self.starts):
+            return base + timedelta(seconds=self.starts[i])
+        # Next week's first interval; when it wraps, the real start is the last one
+        first = self.starts[-1] if self.wraps else self.starts[0]
+        return base + timedelta(seconds=WEEK + first)
+
+    def next_transition(self, now: datetime) -> datetime | None:
+        cur = self.current(now)
+        if cur is not None:
+            return cur[1]
+        return self.next_start(now)
+
+
+def compile_windows(windows: list[dict]) -> WeekIndex:
+    intervals = []
+    for w in windows:
+        s, e = _seconds(w['start']), _seconds(w['end'])
+        if s == e:
+            continue
+        length = e - s if s < e else DAY - s + e
+        for d in w['days']:
+            a = d * DAY + s
+            b = a + length
+            if b <= WEEK:
+                intervals.append((a, b))
+            else:
+                intervals.append((a, WEEK))
+                intervals.append((0, b - WEEK))
+    return WeekIndex(intervals)
+
+
+def schedule_windows(sched: dict) -> list[dict]:
+    """Weekly rules of a schedule; the legacy start/end pair applies every day."""
+    windows = sched.get('windows') or []
+    if windows:
+        return windows
+    return [{"days": ALL_DAYS, "start": sched.get('start', '22:00'), "end": sched.get('end', '07:00')}]
+
+
+_cache: tuple | None = None  # (key, WeekIndex)
+
+
+def get_index(sched: dict) -> WeekIndex:
+    """Compiled index for `sched`, shared by every caller until the rules change."""
+    global _cache
+    windows = schedule_windows(sched)
+    key = tuple((tuple(w['days']), w['start'], w['end']) for w in windows)
+    cached = _cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    index = compile_windows(windows)
+    _cache = (key, index)
+    return index
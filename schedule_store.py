@@ -1,12 +1,31 @@
 import os
 import json
+import threading
 from pathlib import Path
 import ctypes
 from ctypes import wintypes
 
 from config import get_app_dir
+from schedule_index import normalize_windows
+from persist import AtomicFile
+import metrics
+from events import StateVersion
+from watch import FileWatcher, Subscribers, freeze
 SCHEDULE_PATH = get_app_dir() / 'schedule.dat'
 
+# Decoded schedule keyed by the file stamp it was read from; avoids disk I/O and
+# CryptUnprotectData until the file changes
+_cache: tuple | None = None  # (stamp, schedule)
+_cache_lock = threading.Lock()
+CACHE_HITS = metrics.counter('pclock_schedule_cache_hits_total', 'read_schedule() calls served from memory')
+CACHE_MISSES = metrics.counter('pclock_schedule_cache_misses_total', 'read_schedule() calls that read and decrypted the store')
+
+# Listeners receive an immutable snapshot after write_schedule() and after
+# external edits picked up by the file watcher
+_subscribers = Subscribers()
+_watcher: FileWatcher | None = None
+_version = StateVersion()
+
 # DPAPI
 crypt32 = ctypes.WinDLL('crypt32', use_last_error=True)
 kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
@@ -51,14 +70,46 @@ def _dpapi_unprotect(data: bytes) -> bytes:
         LocalFree(out_blob.pbData)
 
 
-def read_schedule() -> dict:
-    if not SCHEDULE_PATH.exists():
+def _default_schedule() -> dict:
+    return {"enabled": False, "start": "22:00", "end": "07:00", "notify_minutes": [5, 1], "windows": []}
+
+
+class _DpapiJsonCodec:
+    """Compact JSON protected with DPAPI for the current user."""
+
+    def encode(self, obj) -> bytes:
+        return _dpapi_protect(json.dumps(obj, separators=(',', ':')).encode('utf-8'))
+
+    def decode(self, data: bytes):
+        return json.loads(_dpapi_unprotect(data).decode('utf-8'))
+
+
+def _committed(obj, stamp) -> None:
+    # A coalesced write reached the disk: key the cache by the new stamp
+    global _cache
+    with _cache_lock:
+        if _cache is not None and _cache[1] is obj:
+            _cache = (stamp, obj)
+
+
+def _open_store():
+    import settings_db
+    db = settings_db.get_db()
+    if db is not None:
+        return db.document('schedule', _DpapiJsonCodec(), on_commit=_committed)
+    return AtomicFile(SCHEDULE_PATH, _DpapiJsonCodec(), on_commit=_committed)
+
+
+_file = _open_store()
+
+
+def _load_schedule() -> dict:
+    try:
+        obj = _file.read()
+    except FileNotFoundError:
         # Return defaults
-        return {"enabled": False, "start": "22:00", "end": "07:00", "notify_minutes": [5, 1]}
+        return _default_schedule()
     try:
-        enc = SCHEDULE_PATH.read_bytes()
-        dec = _dpapi_unprotect(enc)
-        obj = json.loads(dec.decode('utf-8'))
         # basic validation
         enabled = bool(obj.get('enabled', False))
         start = str(obj.get('start', '22:00'))
@@ -66,16 +117,91 @@ def read_schedule() -> dict:
         notify_minutes = obj.get('notify_minutes', [5, 1])
         if not isinstance(notify_minutes, list):
             notify_minutes = [5, 1]
-        return {"enabled": enabled, "start": start, "end": end, "notify_minutes": notify_minutes}
+        windows = normalize_windows(obj.get('windows'))
+        return {"enabled": enabled, "start": start, "end": end, "notify_minutes": notify_minutes, "windows": windows}
     except Exception:
-        # Corrupt store -> disable schedule
-        return {"enabled": False, "start": "22:00", "end": "07:00", "notify_minutes": [5, 1]}
+        # Corrupt store (and no readable backup) -> disable schedule
+        return _default_schedule()
+
+
+def _file_stamp() -> tuple | None:
+    return _file.stamp()
 
 
-def write_schedule(enabled: bool, start: str, end: str, notify_minutes: list[int] | None = None) -> None:
+def _copy(sched: dict) -> dict:
+    # Callers may mutate what they get back; never hand out the cached objects
+    out = dict(sched)
+    out['notify_minutes'] = list(sched['notify_minutes'])
+    out['windows'] = [dict(w, days=list(w['days'])) for w in sched['windows']]
+    return out
+
+
+def read_schedule() -> dict:
+    """Return the current schedule, decrypting the file only when it changed."""
+    global _cache
+    stamp = _file_stamp()
+    with _cache_lock:
+        cached = _cache
+        if cached is not None and (cached[0] == stamp or _file.pending):
+            CACHE_HITS.inc()
+            return _copy(cached[1])
+        CACHE_MISSES.inc()
+    sched = _load_schedule()
+    with _cache_lock:
+        _cache = (stamp, sched)
+    return _copy(sched)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the read_schedule() cache."""
+    return {"hits": int(CACHE_HITS.value()), "misses": int(CACHE_MISSES.value())}
+
+
+def write_schedule(enabled: bool, start: str, end: str, notify_minutes: list[int] | None = None,
+                   windows: list[dict] | None = None) -> None:
+    """Persist the schedule. `windows` holds weekly rules (see schedule_index);
+    when empty, the daily `start`/`end` pair applies every day."""
+    global _cache
     if notify_minutes is None:
         notify_minutes = [5, 1]
-    obj = {"enabled": bool(enabled), "start": str(start), "end": str(end), "notify_minutes": notify_minutes}
-    raw = json.dumps(obj, separators=(',', ':')).encode('utf-8')
-    enc = _dpapi_protect(raw)
-    SCHEDULE_PATH.write_bytes(enc)
+    obj = {"enabled": bool(enabled), "start": str(start), "end": str(end), "notify_minutes": list(notify_minutes),
+           "windows": normalize_windows(windows)}
+    with _file.lock:
+        committed = _file.write(obj)
+        with _cache_lock:
+            # Until a coalesced write lands the cache is not keyed by a stamp
+            _cache = (_file_stamp() if committed else None, obj)
+    _notify(obj)
+
+
+def subscribe(callback) -> None:
+    """Call `callback(snapshot)` with a read-only schedule whenever it changes."""
+    global _watcher
+    if _subscribers.add(callback) and _watcher is None:
+        _watcher = FileWatcher(_file.watch_path, _check_external)
+        _watcher.start()
+
+
+def unsubscribe(callback) -> None:
+    _subscribers.remove(callback)
+
+
+def version() -> int:
+    """Increases whenever the schedule changes (our writes or external edits)."""
+    return _version.value
+
+
+def _notify(sched: dict) -> None:
+    _version.bump()
+    _subscribers.publish(freeze(sched))
+
+
+def _check_external() -> None:
+    # The directory watcher also fires for our own writes and for other files
+    if _file.pending:
+        return
+    with _cache_lock:
+        cached = _cache
+    if cached is not None and cached[0] == _file_stamp():
+        return
+    _notify(read_schedule())
@@ -0,0 +1,224 @@
+"""
+Optional SQLite settings store for PC-Lock.
+
+When `settings.db` exists in the app directory, config and schedule data are
+kept in it instead of `config.json` and `schedule.dat`. The database runs in
+WAL mode, so the API threads, the scheduler and the GUI can read concurrently
+while a writer commits, and each setting is fetched by primary key instead of
+parsing a whole file. Lock/unlock history is recorded in the same database.
+
+Create it once with `python main.py --migrate-sqlite`; the old files are left
+in place untouched.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import get_app_dir
+from persist import JsonCodec
+
+DB_NAME = 'settings.db'
+# Config entries stored as separate rows
+CONFIG_SECTIONS = ('hotkey', 'password', 'api')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS settings_generation ON settings(generation);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS history_ts ON history(ts);
+CREATE INDEX IF NOT EXISTS history_kind_ts ON history(kind, ts);
+"""
+
+
+class SettingsDB:
+    """Key/value settings plus an event history in one WAL-mode database."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets them read while another writes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        marks = ','.join('?' * len(keys))
+        rows = self._conn().execute(f'SELECT key, value FROM settings WHERE key IN ({marks})', keys)
+        return {k: bytes(v) for k, v in rows}
+
+    def generation(self, keys) -> int | None:
+        """Highest write generation among `keys` (None if none of them is stored)."""
+        keys = list(keys)
+        marks = ','.join('?' * len(keys))
+        row = self._conn().execute(f'SELECT MAX(generation) FROM settings WHERE key IN ({marks})', keys).fetchone()
+        return row[0]
+
+    def put_many(self, values: dict) -> int:
+        """Atomically store several keys; returns the new generation."""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            gen = conn.execute('SELECT COALESCE(MAX(generation), 0) + 1 FROM settings').fetchone()[0]
+            conn.executemany(
+                'INSERT INTO settings (key, value, generation) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, generation = excluded.generation',
+                [(k, sqlite3.Binary(v), gen) for k, v in values.items()]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return gen
+
+    def append_history(self, kind: str, detail: str | None = None) -> None:
+        self._conn().execute('INSERT INTO history (ts, kind, detail) VALUES (?, ?, ?)', (time.time(), kind, detail))
+
+    def history(self, kind: str | None = None, since: float | None = None, limit: int = 100) -> list[dict]:
+        sql = 'SELECT ts, kind, detail FROM history WHERE ts >= ?'
+        args: list = [since or 0.0]
+        if kind:
+            sql += ' AND kind = ?'
+            args.append(kind)
+        sql += ' ORDER BY ts DESC LIMIT ?'
+        args.append(int(limit))
+        return [{"ts": ts, "kind": k, "detail": d} for ts, k, d in self._conn().execute(sql, args)]
+
+    def document(self, key: str, codec, sections=(), on_commit=None) -> 'DbDocument':
+        return DbDocument(self, key, codec, sections, on_commit)
+
+
+class DbDocument:
+    """A settings document stored in SettingsDB, interchangeable with persist.AtomicFile.
+
+    Top-level entries named in `sections` are stored under their own keys
+    (`<key>.<name>`) so that changing one of them rewrites only that row;
+    everything else is stored under `key`.
+    """
+
+    pending = False  # writes are committed synchronously
+
+    def __init__(self, db: SettingsDB, key: str, codec, sections=(), on_commit=None):
+        self.db = db
+        self.key = key
+        self.codec = codec
+        self.sections = tuple(sections)
+        self.on_commit = on_commit
+        self.path = db.path
+        self.watch_path = db.path.with_name(db.path.name + '-wal')
+        self.lock = threading.RLock()
+        self._keys = [key] + [f'{key}.{name}' for name in self.sections]
+
+    def stamp(self) -> tuple | None:
+        gen = self.db.generation(self._keys)
+        return None if gen is None else (gen,)
+
+    def _encode(self, obj) -> dict:
+        if not self.sections:
+            return {self.key: self.codec.encode(obj)}
+        rest = {k: v for k, v in obj.items() if k not in self.sections}
+        parts = {self.key: self.codec.encode(rest)}
+        for name in self.sections:
+            if name in obj:
+                parts[f'{self.key}.{name}'] = self.codec.encode(obj[name])
+        return parts
+
+    def read(self):
+        rows = self.db.get_many(self._keys)
+        if self.key not in rows:
+            raise FileNotFoundError(f'{self.key} not stored in {self.db.path.name}')
+        obj = self.codec.decode(rows[self.key])
+        for name in self.sections:
+            raw = rows.get(f'{self.key}.{name}')
+            if raw is not None:
+                obj[name] = self.codec.decode(raw)
+        return obj
+
+    def write(self, obj) -> bool:
+        with self.lock:
+            parts = self._encode(obj)
+            current = self.db.get_many(parts)
+            changed = {k: v for k, v in parts.items() if current.get(k) != v}
+            if changed:
+                self.db.put_many(changed)
+            if self.on_commit is not None:
+                self.on_commit(obj, self.stamp())
+        return True
+
+    def flush(self) -> None:
+        pass
+
+
+_db: SettingsDB | None = None
+_db_lock = threading.Lock()
+
+
+def db_path() -> Path:
+    return get_app_dir() / DB_NAME
+
+
+def get_db() -> SettingsDB | None:
+    """The settings database, or None when the file-based stores are in use."""
+    global _db
+    if _db is not None:
+        return _db
+    if not db_path().exists():
+        return None
+    with _db_lock:
+        if _db is None:
+            _db = SettingsDB(db_path())
+    return _db
+
+
+def record_event(kind: str, detail: str | None = None) -> None:
+    """Append to the lock history when the database is in use (best effort)."""
+    try:
+        db = get_db()
+        if db is not None:
+            db.append_history(kind, detail)
+    except Exception:
+        pass
+
+
+def migrate() -> str:
+    """Create settings.db from config.json and schedule.dat (one-time)."""
+    global _db
+    app_dir = get_app_dir()
+    path = app_dir / DB_NAME
+    with _db_lock:
+        db = SettingsDB(path)
+        if db.generation(['config', 'schedule']) is not None:
+            _db = db
+            return f'{path} already initialised; nothing to migrate.'
+        values = {}
+        cfg_path = app_dir / 'config.json'
+        if cfg_path.exists():
+            values.update(DbDocument(db, 'config', JsonCodec(), CONFIG_SECTIONS)._encode(
+                JsonCodec().decode(cfg_path.read_bytes())))
+        sched_path = app_dir / 'schedule.dat'
+        if sched_path.exists():
+            # Same DPAPI encoding in both stores; copy the blob as is
+            values['schedule'] = sched_path.read_bytes()
+        if values:
+            db.put_many(values)
+        db.append_history('migrated', ', '.join(sorted(values)))
+        _db = db
+    return f'Migrated {len(values)} setting(s) into {path}.'
+
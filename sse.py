@@ -0,0 +1,194 @@
+"""
+Server-sent event streaming for the threading API engine.
+
+A request handler thread writes the response head and then hands its socket
+to the SseHub. One hub thread multiplexes every stream with a selector, so
+open /api/events connections do not each hold a thread. The asyncio engine
+streams on its event loop instead and only shares the framing helpers.
+"""
+import selectors
+import socket
+import threading
+import time
+
+HEARTBEAT = 15.0  # seconds between keep-alive comments
+MAX_STREAMS = 64
+MAX_BACKLOG = 256 * 1024  # bytes queued for a client before it is dropped as too slow
+RETRY_MS = 3000
+
+PING = b': ping\n\n'
+
+
+def open_stream(bus, last_id: int | None) -> tuple[bytes, int]:
+    """Bytes that start a stream and the event id to continue after.
+
+    Events after `last_id` are replayed by the caller's normal send loop. If
+    they are no longer buffered (or the id is from an earlier run) the
+    client gets a `resync` event and should refetch the current state.
+    """
+    head = f'retry: {RETRY_MS}\n\n'.encode('ascii')
+    current = bus.last_id
+    if last_id is None:
+        return head, current
+    if last_id <= current and bus.since(last_id)[1]:
+        return head, last_id
+    return head + resync_frame(current), current
+
+
+def resync_frame(event_id: int) -> bytes:
+    return f'id: {event_id}\nevent: resync\ndata: {{}}\n\n'.encode('ascii')
+
+
+def parse_last_id(value) -> int | None:
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _Stream:
+    __slots__ = ('sock', 'last_id', 'backlog')
+
+    def __init__(self, sock: socket.socket, last_id: int, backlog: bytes):
+        self.sock = sock
+        self.last_id = last_id
+        self.backlog = bytearray(backlog)
+
+
+class SseHub:
+    """Pushes bus events to many sockets from a single thread."""
+
+    def __init__(self, bus, heartbeat: float = HEARTBEAT, max_streams: int = MAX_STREAMS):
+        self.bus = bus
+        self.heartbeat = heartbeat
+        self.max_streams = max_streams
+        self._sel = selectors.DefaultSelector()
+        # Wakes the selector from publisher threads
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ)
+        self._streams: dict = {}  # socket -> _Stream
+        self._incoming: list = []
+        self._lock = threading.Lock()
+        self._stop = False
+        self._thread: threading.Thread | None = None
+        bus.subscribe(self._on_event)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._streams) + len(self._incoming)
+
+    def full(self) -> bool:
+        return len(self) >= self.max_streams
+
+    def attach(self, sock: socket.socket, last_id: int | None) -> bool:
+        """Take over `sock` (response head already sent). False if the hub is full."""
+        with self._lock:
+            if self._stop or len(self._streams) + len(self._incoming) >= self.max_streams:
+                return False
+            head, start = open_stream(self.bus, last_id)
+            self._incoming.append(_Stream(sock, start, head))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='sse-hub')
+                self._thread.start()
+        self._wake()
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop = True
+        self.bus.unsubscribe(self._on_event)
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(2.0)
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass  # buffer full: a wakeup is already pending
+
+    def _on_event(self, _event):
+        self._wake()
+
+    def _run(self):
+        next_ping = time.monotonic() + self.heartbeat
+        while True:
+            timeout = max(0.0, next_ping - time.monotonic())
+            for key, mask in self._sel.select(timeout):
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                stream = key.data
+                if mask & selectors.EVENT_READ:
+                    # Clients never send anything; readable means closed
+                    try:
+                        if not stream.sock.recv(1024):
+                            self._drop(stream)
+                            continue
+                    except BlockingIOError:
+                        pass
+                    except OSError:
+                        self._drop(stream)
+                        continue
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(stream)
+            with self._lock:
+                if self._stop:
+                    break
+                incoming, self._incoming = self._incoming, []
+            for stream in incoming:
+                stream.sock.setblocking(False)
+                self._streams[stream.sock] = stream
+                self._sel.register(stream.sock, selectors.EVENT_READ, stream)
+            ping = time.monotonic() >= next_ping
+            if ping:
+                next_ping = time.monotonic() + self.heartbeat
+            for stream in list(self._streams.values()):
+                events, complete = self.bus.since(stream.last_id)
+                if not complete:
+                    stream.backlog += resync_frame(self.bus.last_id)
+                    stream.last_id = self.bus.last_id
+                elif events:
+                    stream.backlog += b''.join(e.frame for e in events)
+                    stream.last_id = events[-1].id
+                elif ping and not stream.backlog:
+                    stream.backlog += PING
+                if stream.backlog:
+                    self._flush(stream)
+        for stream in list(self._streams.values()):
+            self._drop(stream)
+
+    def _flush(self, stream: _Stream):
+        try:
+            sent = stream.sock.send(stream.backlog)
+            del stream.backlog[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(stream)
+            return
+        if len(stream.backlog) > MAX_BACKLOG:
+            self._drop(stream)
+            return
+        mask = selectors.EVENT_READ | (selectors.EVENT_WRITE if stream.backlog else 0)
+        try:
+            self._sel.modify(stream.sock, mask, stream)
+        except (KeyError, ValueError):
+            pass
+
+    def _drop(self, stream: _Stream):
+        self._streams.pop(stream.sock, None)
+        try:
+            self._sel.unregister(stream.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            stream.sock.close()
+        except OSError:
+            pass
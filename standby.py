@@ -0,0 +1,127 @@
+"""
+Pre-started lockscreen child.
+
+A cold lock starts a new interpreter that imports tkinter, screeninfo and the
+config before anything is drawn, which takes seconds on slow machines. The
+standby child does all of that ahead of time: it attaches to the lock desktop
+(which is not visible yet), builds its windows hidden and reports `ready`.
+Locking then only needs the `show` command.
+
+The Locker asks for a standby child shortly before a scheduled window starts.
+It is replaced when the config changes (hotkey, ...) and killed when nobody
+has used it for `idle_minutes`.
+"""
+import subprocess
+import threading
+import time
+
+from ipc import ChildChannel
+
+READY_TIMEOUT = 10.0  # seconds lock_now waits for a child that is still starting
+
+
+class Standby:
+    """Holds at most one waiting lockscreen child.
+
+    `command()` returns the argv of a child started with `--standby`.
+    """
+
+    def __init__(self, command, idle_timeout: float, creationflags: int = 0, clock=time.monotonic):
+        self.command = command
+        self.idle_timeout = float(idle_timeout)
+        self.creationflags = creationflags
+        self.clock = clock
+        self.spawned = 0
+        self.used = 0
+        self.reaped = 0
+        self._child: tuple | None = None  # (proc, channel, spawned_at)
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def prepare(self) -> bool:
+        """Make sure a standby child exists; True if one was started."""
+        with self._lock:
+            if self._child is not None and self._child[0].poll() is None:
+                return False
+            self._discard()
+            proc = subprocess.Popen(self.command(), creationflags=self.creationflags,
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self._child = (proc, ChildChannel(proc), self.clock())
+            self.spawned += 1
+            self._arm_reaper()
+            return True
+
+    def take(self, timeout: float = READY_TIMEOUT):
+        """Hand over the standby child as (proc, channel), or None if there is no usable one."""
+        with self._lock:
+            child, self._child = self._child, None
+            self._cancel_reaper()
+        if child is None:
+            return None
+        proc, channel, _ = child
+        if proc.poll() is None and channel.wait_for('ready', timeout) is not None and proc.poll() is None:
+            self.used += 1
+            return proc, channel
+        _kill(proc, channel)
+        return None
+
+    def recycle(self) -> None:
+        """Replace a waiting child, e.g. because it was built with an old config."""
+        with self._lock:
+            had_child = self._discard()
+        if had_child:
+            self.prepare()
+
+    def close(self) -> None:
+        with self._lock:
+            self._discard()
+
+    def stats(self) -> dict:
+        with self._lock:
+            waiting = self._child is not None
+            ready = waiting and self._child[1].seen('ready') is not None
+        return {"waiting": waiting, "ready": ready, "spawned": self.spawned, "used": self.used,
+                "reaped": self.reaped}
+
+    def _discard(self) -> bool:
+        # Caller holds self._lock
+        self._cancel_reaper()
+        child, self._child = self._child, None
+        if child is None:
+            return False
+        _kill(child[0], child[1])
+        return True
+
+    def _arm_reaper(self):
+        self._timer = threading.Timer(self.idle_timeout, self._reap, args=(self._child,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_reaper(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _reap(self, child):
+        with self._lock:
+            if self._child is not child:
+                return  # taken or replaced meanwhile
+            self._timer = None
+            self._child = None
+            self.reaped += 1
+        _kill(child[0], child[1])
+
+
+def _kill(proc, channel) -> None:
+    # Ask politely (stdin EOF makes a standby child exit), then make sure
+    channel.send('shutdown')
+    channel.close()
+    try:
+        proc.wait(1.0)
+    except subprocess.TimeoutExpired:
+        try:
+            proc.terminate()
+        except Exception:
+            pass
+    except Exception:
+        pass
@@ -0,0 +1,55 @@
+"""
+Shared fixtures. Tests run on any OS: Win32 desktop calls go to desktop.FakeU32,
+Core Audio to audio.StubBackend and the lockscreen child is a small Python
+script speaking the real IPC protocol (tests/fakes.py, shared with the benchmarks).
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    """A fresh LOCALAPPDATA, so config, schedule and caches never touch the real ones."""
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def make_locker(monkeypatch):
+    """make_locker(command) -> a started Locker whose children run `command(spawn_index)`.
+
+    Desktop and audio are stubbed; lockers are unlocked and closed after the test.
+    """
+    import desktop
+    from audio import AudioController, StubBackend
+    import main as app
+
+    monkeypatch.setattr(desktop, 'manager', desktop.DesktopManager(desktop.FakeU32(0.001)))
+    lockers = []
+
+    def make(command):
+        class StubLocker(app.Locker):
+            spawned = []
+
+            def _child_command(self, reason, start, end, standby=False):
+                self.spawned.append(self.state)
+                return command(len(self.spawned))
+
+        locker = StubLocker()
+        locker.spawned = []
+        locker.audio = AudioController(StubBackend({'speakers': False}))
+        lockers.append(locker)
+        return locker
+
+    yield make
+    for locker in lockers:
+        try:
+            if locker.state.active:
+                locker.unlock_now()
+        finally:
+            locker.close()
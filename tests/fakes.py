@@ -0,0 +1,182 @@
+"""
+Fakes shared by the tests and the benchmarks: fake lockscreen children that
+speak the real IPC protocol, a stubbed desktop, a virtual Tk clock for
+FocusGuard and a real Tcl event loop with a tick counter.
+
+Benchmarks import them as `tests.fakes` (the repo root is on sys.path).
+"""
+import heapq
+import itertools
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Fake lockscreen: simulated import time, then the same reports as lockscreen.py.
+# Format with root, import_s, switch_s and map_s; pass --standby to wait for 'show'.
+FAKE_CHILD = '''
+import os, sys, threading, time
+sys.path.insert(0, {root!r})
+import ipc, tracing
+time.sleep({import_s})
+tracing.report('imported')
+shown = threading.Event()
+def on_message(msg):
+    if msg['type'] == 'show':
+        shown.set()
+    elif msg['type'] == 'unlock_requested':
+        channel.send('unlocked', by='remote')
+        os._exit(0)
+    elif msg['type'] == 'shutdown' and not shown.is_set():
+        os._exit(0)
+channel = ipc.ParentChannel(on_message, lambda: shown.is_set() or os._exit(0)).start()
+channel.send('ready')
+if '--standby' in sys.argv:
+    shown.wait()
+shown.set()
+time.sleep({switch_s})
+tracing.report('switched')
+time.sleep({map_s})
+tracing.report('mapped')
+channel.send('shown')
+while True:
+    time.sleep(ipc.HEARTBEAT_INTERVAL)
+    channel.send('heartbeat')
+'''
+
+# Fake lockscreen that fails once shown. Format with root and import_s.
+# argv: "crash" (exit 3), "hang" (stop heartbeating) or "ok"; reports 'failing' just before failing
+FAILING_CHILD = '''
+import os, sys, threading, time
+sys.path.insert(0, {root!r})
+import ipc, tracing
+time.sleep({import_s})
+tracing.report('imported')
+def on_message(msg):
+    if msg['type'] == 'unlock_requested':
+        channel.send('unlocked', by='remote')
+        os._exit(0)
+channel = ipc.ParentChannel(on_message).start()
+channel.send('ready')
+tracing.report('switched')
+tracing.report('mapped')
+channel.send('shown')
+mode = sys.argv[1]
+for i in range(100000):
+    time.sleep(0.05 if mode != 'ok' else ipc.HEARTBEAT_INTERVAL)
+    if mode != 'ok' and i == 2:
+        tracing.report('failing')
+        if mode == 'crash':
+            os._exit(3)
+        time.sleep(3600)
+    channel.send('heartbeat')
+'''
+
+
+def stub_desktop(delay_s: float):
+    """Point desktop.manager at a FakeU32 with `delay_s` per call; returns the fake."""
+    import desktop
+    fake = desktop.FakeU32(delay_s)
+    desktop.manager = desktop.DesktopManager(fake)
+    return fake
+
+
+OLD_INTERVAL_MS = 800  # the lock screen's old lift() + focus_force() loop
+
+
+class Clock:
+    """Virtual Tk event loop: after()/after_cancel() on a heap, run until `end`."""
+
+    def __init__(self):
+        self.now = 0
+        self._queue = []
+        self._ids = itertools.count()
+        self._cancelled = set()
+
+    def after(self, ms, fn, *args):
+        after_id = next(self._ids)
+        heapq.heappush(self._queue, (self.now + int(ms), after_id, fn, args))
+        return after_id
+
+    def after_cancel(self, after_id):
+        self._cancelled.add(after_id)
+
+    def run_until(self, end):
+        while self._queue and self._queue[0][0] <= end:
+            at, after_id, fn, args = heapq.heappop(self._queue)
+            if after_id in self._cancelled:
+                self._cancelled.discard(after_id)
+                continue
+            self.now = at
+            fn(*args)
+        self.now = end
+
+
+def simulate(mode: str, steals: list, windows: int, hours: float):
+    """A night on the lock screen with the 'old' loop or the FocusGuard ('guard').
+
+    `steals` is a sorted list of (ms, silent); silent steals come without a Tk
+    event. Returns (wakeups, window calls, [(steal -> fixed ms, silent)]).
+    """
+    from focus import FocusGuard
+    clock = Clock()
+    state = {"stolen_at": None, "win_calls": 0, "wakeups": 0}
+    latencies = []
+
+    def fix():
+        if state["stolen_at"] is not None:
+            latencies.append((clock.now - state["stolen_at"], state["silent"]))
+            state["stolen_at"] = None
+
+    if mode == 'old':
+        def refocus_all():
+            state["wakeups"] += 1
+            state["win_calls"] += 2 * windows  # lift() + focus_force() per window
+            fix()
+            clock.after(OLD_INTERVAL_MS, refocus_all)
+        clock.after(OLD_INTERVAL_MS, refocus_all)
+        guard = None
+    else:
+        def check(reasons):
+            state["win_calls"] += 1  # focus_get()
+            if state["stolen_at"] is None:
+                return False
+            state["win_calls"] += windows + 1  # lift() per window + focus_force()
+            fix()
+            return True
+        guard = FocusGuard(clock.after, clock.after_cancel, check)
+        guard.start()
+
+    for at, silent in steals:
+        clock.run_until(at)
+        if state["stolen_at"] is None:
+            state["stolen_at"], state["silent"] = at, silent
+            if guard is not None and not silent:
+                guard.poke('focus_out')
+    clock.run_until(int(hours * 3600 * 1000))
+    wakeups = state["wakeups"] if guard is None else guard.wakeups
+    return wakeups, state["win_calls"], latencies
+
+
+TICK_MS = 10
+
+
+def run_loop(start):
+    """Run `start(loop, done)` inside a Tcl event loop; returns (max tick gap ms, ticks, seconds)."""
+    import tkinter
+    loop = tkinter.Tcl()
+    gaps = []
+    last = [time.perf_counter()]
+
+    def tick():
+        now = time.perf_counter()
+        gaps.append((now - last[0]) * 1000)
+        last[0] = now
+        loop.after(TICK_MS, tick)
+
+    t0 = time.perf_counter()
+    loop.after(TICK_MS, tick)
+    # quit a few ticks after `done` so a stall at the very end is still measured
+    loop.after(50, start, loop, lambda: loop.after(3 * TICK_MS, loop.quit))
+    loop.mainloop(-1)  # threshold -1: keep looping without Tk windows until quit()
+    return max(gaps), len(gaps), time.perf_counter() - t0
@@ -0,0 +1,40 @@
+"""HTTP framing errors get the same answer from both API engines."""
+import socket
+
+import pytest
+
+from api import ApiServer
+
+
+class StubLocker:
+    pass
+
+
+@pytest.fixture(params=['threading', 'asyncio'])
+def server(request):
+    srv = ApiServer(StubLocker(), port=0, engine=request.param).start()
+    yield srv
+    srv.stop()
+
+
+def _raw(server, request: bytes) -> bytes:
+    with socket.create_connection(server.address, timeout=5) as sock:
+        sock.sendall(request)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def test_malformed_content_length_is_a_bad_request(server):
+    reply = _raw(server, b'POST /api/lock HTTP/1.1\r\nHost: x\r\nContent-Length: ten\r\n\r\n')
+
+    assert reply.startswith(b'HTTP/1.1 400 ') or reply.startswith(b'HTTP/1.0 400 ')
+    assert b'"bad_content_length"' in reply
+
+
+def test_body_over_the_limit_is_refused(server):
+    reply = _raw(server, b'POST /api/lock HTTP/1.1\r\nHost: x\r\nContent-Length: 999999999\r\n\r\n')
+
+    assert b' 413 ' in reply.split(b'\r\n', 1)[0]
+    assert b'"body_too_large"' in reply
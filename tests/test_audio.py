@@ -0,0 +1,88 @@
+"""AudioController on StubBackend: mute every endpoint, restore each one's own state, device changes."""
+import pytest
+
+from audio import AudioController, StubBackend
+
+
+@pytest.fixture
+def backend():
+    return StubBackend({'speakers': False, 'headphones': True, 'hdmi': False})
+
+
+@pytest.fixture
+def audio(backend):
+    controller = AudioController(backend, workers=2)
+    yield controller
+    controller.close()
+
+
+def test_mute_all_mutes_every_device(audio, backend):
+    assert audio.mute_all() == 2  # headphones were already muted
+
+    assert all(backend.devices.values())
+    assert audio.stats()['saved'] == 3
+
+
+def test_restore_keeps_each_devices_own_state(audio, backend):
+    audio.mute_all()
+
+    assert audio.restore_all() == 2
+
+    assert backend.devices == {'speakers': False, 'headphones': True, 'hdmi': False}
+    assert audio.stats()['saved'] == 0
+    assert audio.restore_all() == 0
+
+
+def test_second_mute_keeps_the_first_saved_state(audio, backend):
+    audio.mute_all()
+    assert audio.mute_all() == 0  # relock while locked: everything is muted already
+
+    audio.restore_all()
+
+    assert backend.devices == {'speakers': False, 'headphones': True, 'hdmi': False}
+
+
+def test_endpoints_are_cached_between_locks(audio, backend):
+    audio.mute_all()
+    audio.restore_all()
+    audio.mute_all()
+    audio.restore_all()
+
+    assert backend.opens == 3
+    assert audio.stats()['devices'] == 3
+
+
+def test_plugged_device_is_picked_up(audio, backend):
+    audio.mute_all()
+    audio.restore_all()
+
+    backend.plug('usb', muted=False)  # notification invalidates the cached device list
+
+    assert audio.stats()['devices'] is None
+    assert audio.mute_all() == 3
+    assert backend.devices['usb'] is True
+    audio.restore_all()
+    assert backend.devices['usb'] is False
+
+
+def test_invalidate_drops_the_cached_device_list(audio, backend):
+    audio.mute_all()
+    audio.restore_all()
+    backend.devices['usb'] = False  # added without a notification: the cache still has three devices
+
+    assert audio.mute_all() == 2
+    assert backend.devices['usb'] is False
+    audio.restore_all()
+
+    audio.invalidate()
+
+    assert audio.mute_all() == 3
+    assert backend.devices['usb'] is True
+
+
+def test_unplugged_while_locked_is_skipped_on_restore(audio, backend):
+    audio.mute_all()
+    backend.unplug('hdmi')
+
+    assert audio.restore_all() == 1
+    assert backend.devices == {'speakers': False, 'headphones': True}
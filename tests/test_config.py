@@ -0,0 +1,27 @@
+"""Settings records parse hand-edited flags instead of taking any non-empty string as True."""
+import pytest
+
+from config import ApiConfig, Config, StandbyConfig
+
+
+@pytest.mark.parametrize('raw, expected', [
+    (True, True), (False, False), (1, True), (0, False),
+    ('true', True), ('Yes', True), ('on', True), ('1', True),
+    ('false', False), ('FALSE', False), ('0', False), ('no', False), (' off ', False),
+])
+def test_flags_are_parsed(raw, expected):
+    assert ApiConfig(enabled=raw).enabled is expected
+    assert StandbyConfig(enabled=raw).enabled is expected
+
+
+@pytest.mark.parametrize('raw', ['', 'maybe', 2, [], {}])
+def test_unparseable_flag_falls_back_to_the_default(raw):
+    assert ApiConfig(enabled=raw).enabled is False
+    assert StandbyConfig(enabled=raw).enabled is True
+
+
+def test_nested_sections_from_dict():
+    cfg = Config.from_dict({"api": {"enabled": "false", "port": "9000"}, "standby": {"enabled": "off"}})
+
+    assert cfg.api.enabled is False and cfg.api.port == 9000
+    assert cfg.standby.enabled is False
@@ -0,0 +1,77 @@
+"""DesktopManager on FakeU32: cached handles across lock cycles, close_all and SwitchDesktop recovery."""
+import pytest
+
+from desktop import DEFAULT_DESKTOP, LOCK_DESKTOP, DesktopManager, FakeU32
+
+
+@pytest.fixture
+def u32():
+    return FakeU32()
+
+
+@pytest.fixture
+def manager(u32):
+    return DesktopManager(u32)
+
+
+def lock_cycle(manager):
+    manager.lock_desktop()
+    manager.switch_to(LOCK_DESKTOP)
+    manager.default_desktop()
+    manager.switch_to(DEFAULT_DESKTOP)
+
+
+def test_handles_are_reused_across_lock_cycles(manager, u32):
+    lock_cycle(manager)
+    after_first = (manager.open_handles(), len(u32.live))
+
+    for _ in range(50):
+        lock_cycle(manager)
+
+    assert (manager.open_handles(), len(u32.live)) == after_first == (2, 2)
+    assert manager.stats()['opened'] == 2
+    assert u32.calls['CreateDesktopW'] + u32.calls['OpenDesktopW'] == 2
+    assert u32.input_desktop == DEFAULT_DESKTOP
+
+
+def test_close_all_releases_every_handle(manager, u32):
+    lock_cycle(manager)
+
+    manager.close_all()
+
+    assert manager.open_handles() == 0
+    assert u32.live == {}
+    assert manager.stats()['closed'] == 2
+    # Still usable afterwards: the next lock opens fresh handles
+    lock_cycle(manager)
+    assert manager.open_handles() == 2
+
+
+def test_switch_recovers_from_a_stale_handle(manager, u32):
+    hdesk = manager.lock_desktop()
+    u32.live.pop(hdesk)  # the handle went bad behind the manager's back
+
+    manager.switch_to(LOCK_DESKTOP)
+
+    assert u32.input_desktop == LOCK_DESKTOP
+    assert manager.lock_desktop() != hdesk
+    assert u32.calls['SwitchDesktop'] == 2
+    assert manager.open_handles() == 1 and len(u32.live) == 1
+
+
+def test_switch_failure_after_reopen_raises(manager, u32, monkeypatch):
+    manager.default_desktop()
+    monkeypatch.setattr(u32, 'SwitchDesktop', lambda hdesk: 0)
+
+    with pytest.raises(OSError, match='SwitchDesktop failed'):
+        manager.switch_to(DEFAULT_DESKTOP)
+
+    # The reopened handle is kept, the stale one closed: nothing leaks
+    assert manager.open_handles() == 1 and len(u32.live) == 1
+    assert manager.stats()['closed'] == 1
+
+
+def test_missing_desktop_raises(manager):
+    with pytest.raises(OSError, match='OpenDesktop failed'):
+        manager.get('NoSuchDesktop')
+    assert manager.open_handles() == 0
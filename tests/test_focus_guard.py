@@ -0,0 +1,65 @@
+"""FocusGuard wakeups and focus-steal correction times, on a virtual clock (no display needed)."""
+from focus import FALLBACK_MAX_MS, SETTLE_MS, FocusGuard
+from tests.fakes import OLD_INTERVAL_MS, Clock, simulate
+
+HOUR_MS = 3600 * 1000
+
+
+def _guard(check=lambda reasons: False):
+    clock = Clock()
+    guard = FocusGuard(clock.after, clock.after_cancel, check)
+    guard.start()
+    return clock, guard
+
+
+def test_idle_wakeups_are_bounded_by_the_fallback_cap():
+    clock, guard = _guard()
+    clock.run_until(HOUR_MS)
+
+    assert guard.wakeups == guard.timer_wakeups
+    assert guard.wakeups <= HOUR_MS // FALLBACK_MAX_MS + 2
+    assert guard.corrections == 0
+
+
+def test_burst_of_events_is_checked_once():
+    calls = []
+    clock, guard = _guard(lambda reasons: calls.append((clock.now, reasons)) or False)
+    clock.run_until(100)
+    for reason in ('focus_out', 'unmap', 'focus_out', 'visibility'):
+        guard.poke(reason)
+    clock.run_until(100 + SETTLE_MS)
+
+    assert calls == [(100 + SETTLE_MS, {'focus_out', 'unmap', 'visibility'})]
+
+
+def test_event_resets_the_fallback_interval():
+    clock, guard = _guard()
+    clock.run_until(10_000)
+    assert guard.interval == FALLBACK_MAX_MS
+    guard.poke('focus_out')
+    clock.run_until(10_000 + SETTLE_MS)
+
+    assert guard.interval == guard.min_ms
+
+
+def test_stop_cancels_all_checks():
+    clock, guard = _guard()
+    guard.poke('focus_out')
+    guard.stop()
+    clock.run_until(HOUR_MS)
+
+    assert guard.wakeups == 0
+
+
+def test_night_on_the_lock_screen_beats_the_old_loop():
+    steals = [(i * 7 * 60 * 1000 + 1234, i % 4 == 0) for i in range(60)]  # every 7 min, every 4th unreported
+    old_wakeups, old_calls, _ = simulate('old', steals, windows=2, hours=7)
+    wakeups, calls, latencies = simulate('guard', steals, windows=2, hours=7)
+    reported = [ms for ms, silent in latencies if not silent]
+    unreported = [ms for ms, silent in latencies if silent]
+
+    assert len(latencies) == len(steals)
+    assert calls < old_calls / 3
+    assert wakeups / 7 <= HOUR_MS / FALLBACK_MAX_MS + 60
+    assert max(reported) <= SETTLE_MS
+    assert max(unreported) <= FALLBACK_MAX_MS < OLD_INTERVAL_MS
@@ -0,0 +1,69 @@
+"""Concurrent lock/unlock calls: one lockscreen child per lock transition, and every caller gets its own outcome."""
+import random
+import sys
+import threading
+
+import events
+import main as app
+from tests.fakes import FAKE_CHILD, ROOT
+
+CHILD = FAKE_CHILD.format(root=str(ROOT), import_s=0.02, switch_s=0.001, map_s=0.001)
+
+
+def _command(n):
+    return [sys.executable, '-c', CHILD]
+
+
+def test_concurrent_requests_spawn_exactly_once(make_locker):
+    locker = make_locker(_command)
+    locks = []
+
+    def count(event):
+        if event.kind == 'locked':
+            locks.append(event)
+    events.bus.subscribe(count)
+    try:
+        rng = random.Random(7)
+        plans = [[rng.choice(('lock', 'unlock')) for _ in range(4)] for _ in range(50)]
+        results, errors = [], []
+        start = threading.Barrier(len(plans))
+
+        def worker(plan):
+            start.wait()
+            for kind in plan:
+                try:
+                    state = locker.lock_now() if kind == 'lock' else locker.unlock_now()
+                    results.append((kind, state.active))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(plan,)) for plan in plans]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(60)
+    finally:
+        events.bus.unsubscribe(count)
+
+    assert not errors
+    assert len(results) == 200
+    assert [r for r in results if r[1] != (r[0] == 'lock')] == [], 'a caller got the opposite of its request'
+    assert not any(state.active for state in locker.spawned), 'child spawned while already locked'
+    assert len(locker.spawned) == len(locks)
+
+
+def test_identical_requests_are_coalesced_opposite_ones_are_not(make_locker):
+    locker = make_locker(_command)
+    gate = threading.Event()
+    blocker = locker.submit('call', fn=gate.wait)  # keeps the actor busy while the queue fills
+    coalesced = app.COALESCED.value()
+
+    kinds = ['lock'] * 5 + ['unlock'] * 2 + ['lock'] * 3
+    futures = [locker.submit(kind) for kind in kinds]
+    gate.set()
+    blocker.result(10)
+    states = [f.result(30) for f in futures]
+
+    assert [s.active for s in states] == [kind == 'lock' for kind in kinds]
+    assert len(locker.spawned) == 2  # lock, unlock, lock
+    assert app.COALESCED.value() - coalesced == 4 + 1 + 2
@@ -0,0 +1,76 @@
+"""The lock screen's event loop keeps running while a password is checked.
+
+Drives LockScreen._submit_password/_on_verified on a real Tcl event loop
+(tkinter.Tcl(), no display needed) with a stand-in for the PasswordPrompt
+dialog, and the real config.verify_password (PBKDF2, 200k iterations).
+"""
+import pytest
+
+pytest.importorskip('tkinter')
+
+from tests.fakes import run_loop  # noqa: E402
+
+PASSWORD = 'test-password'
+MAX_GAP_MS = 100  # a 10 ms ticker must never wait longer than this
+
+
+class FakePrompt:
+    """Records what the lock screen asks of the dialog; re-submits once input is allowed again."""
+
+    def __init__(self, loop, screen, attempts):
+        self.loop = loop
+        self.screen = screen
+        self.attempts = list(attempts)
+        self.log = []
+
+    def submit(self):
+        self.screen._submit_password(self.attempts.pop(0))
+
+    def busy(self):
+        self.log.append('busy')
+
+    def wait(self, seconds, message='Incorrect password.'):
+        self.log.append(message)
+        if self.log.count('Incorrect password.') == 1 and message == 'Incorrect password.':
+            self.loop.after(0, self.submit)  # too early: must be refused without a KDF run
+            return
+        self.loop.after(int(seconds * 1000) + 1, self.submit)
+
+
+def test_wrong_then_right_password_keeps_loop_responsive(monkeypatch):
+    from config import set_password
+    from lockscreen import LockScreen
+    set_password(PASSWORD)
+    screen = LockScreen('ctrl+alt+u')
+    unlocked = []
+
+    def start(loop, done):
+        screen.root = loop
+        screen.prompt = FakePrompt(loop, screen, ['wrong', 'wrong', 'wrong', PASSWORD])
+        monkeypatch.setattr(screen, '_unlock', lambda by: (unlocked.append(by), done()))
+        screen.prompt.submit()
+
+    try:
+        gap, ticks, seconds = run_loop(start)
+    finally:
+        screen.kdf.shutdown()
+
+    log = screen.prompt.log
+    assert unlocked == ['password']
+    assert screen.password_unlocked.is_set()
+    assert log[:3] == ['busy', 'Incorrect password.', 'Too many attempts.']
+    assert log.count('busy') == 3  # the refused attempt never reached the KDF
+    assert gap < MAX_GAP_MS, f'event loop stalled for {gap:.0f} ms'
+
+
+def test_inline_check_would_stall_the_loop():
+    # Sanity check of the measurement: the old inline call does show up as a stall
+    from config import set_password, verify_password
+    set_password(PASSWORD)
+
+    def start(loop, done):
+        verify_password(PASSWORD)
+        done()
+
+    gap, _, _ = run_loop(start)
+    assert gap > 2 * 10
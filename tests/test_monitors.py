@@ -0,0 +1,131 @@
+"""Display topology diffs: only the windows of changed displays are created, moved or destroyed."""
+import pytest
+
+import monitors
+from monitors import FakeMonitor, FakeProvider, Monitor, MonitorWatcher
+
+
+class Windows:
+    """Stand-in for the lock windows: {key: geometry}, and a log of every operation."""
+
+    def __init__(self):
+        self.windows = {}
+        self.ops = []
+
+    def create(self, m):
+        self.ops.append(('create', m.key))
+        return m.geometry
+
+    def move(self, window, m):
+        self.ops.append(('move', m.key))
+
+    def destroy(self, window):
+        self.ops.append(('destroy', window))
+
+    def on_change(self, topo, changes):
+        monitors.apply(self.windows, changes, self.create, self.move, self.destroy)
+        for m in changes.moved:
+            self.windows[m.key] = m.geometry
+
+
+@pytest.fixture
+def setup():
+    provider = FakeProvider(FakeMonitor('DISPLAY1', 0, 0, 1920, 1080, True),
+                            FakeMonitor('DISPLAY2', 1920, 0, 1920, 1080))
+    windows = Windows()
+    watcher = MonitorWatcher(lambda ms, fn: None, lambda after_id: None, windows.on_change, provider=provider)
+    topo = monitors.current(provider)
+    windows.on_change(topo, monitors.diff((), topo))
+    watcher.start(topo)
+    windows.ops.clear()
+    return provider, windows, watcher
+
+
+def _matches(windows, watcher):
+    return windows.windows == {m.key: m.geometry for m in watcher.topology}
+
+
+def test_topology_is_primary_first():
+    topo = monitors.topology([FakeMonitor('B', 1920, 0, 800, 600), FakeMonitor('A', 0, 0, 1920, 1080, True)])
+
+    assert topo == (Monitor('primary', 0, 0, 1920, 1080), Monitor('B', 1920, 0, 800, 600))
+    assert topo[1].geometry == '800x600+1920+0'
+
+
+def test_plug_creates_only_the_new_window(setup):
+    provider, windows, watcher = setup
+    provider.plug(FakeMonitor('DISPLAY3', 3840, 0, 1280, 1024))
+
+    changes = watcher.check()
+
+    assert [m.key for m in changes.added] == ['DISPLAY3'] and not changes.moved and not changes.removed
+    assert windows.ops == [('create', 'DISPLAY3')]
+    assert _matches(windows, watcher)
+
+
+def test_unplug_destroys_only_its_window(setup):
+    provider, windows, watcher = setup
+    provider.unplug('DISPLAY2')
+
+    watcher.check()
+
+    assert windows.ops == [('destroy', '1920x1080+1920+0')]
+    assert list(windows.windows) == ['primary']
+
+
+def test_resolution_change_moves_the_window(setup):
+    provider, windows, watcher = setup
+    provider.resize('DISPLAY2', 2560, 1440)
+
+    watcher.check()
+
+    assert windows.ops == [('move', 'DISPLAY2')]
+    assert windows.windows['DISPLAY2'] == '2560x1440+1920+0'
+    assert _matches(windows, watcher)
+
+
+def test_primary_swap_keeps_the_root_window(setup):
+    provider, windows, watcher = setup
+    provider.set_primary('DISPLAY2')
+
+    watcher.check()
+
+    # The root ('primary') moves to the new primary display, the old primary gets a window under its name
+    assert sorted(windows.ops) == [('create', 'DISPLAY1'), ('destroy', '1920x1080+1920+0'), ('move', 'primary')]
+    assert _matches(windows, watcher)
+
+
+def test_no_change_rebuilds_nothing(setup):
+    provider, windows, watcher = setup
+
+    assert watcher.check() is None
+    assert windows.ops == []
+    assert watcher.changes == 0
+
+
+def test_no_displays_reported_keeps_the_windows(setup):
+    provider, windows, watcher = setup
+    provider.monitors = []
+
+    assert watcher.check() is None
+    assert windows.ops == []
+    assert len(windows.windows) == 2
+
+
+def test_poke_reschedules_a_check_soon():
+    scheduled = []
+    watcher = MonitorWatcher(lambda ms, fn: scheduled.append(ms) or len(scheduled), lambda after_id: None,
+                             lambda topo, changes: None, provider=FakeProvider())
+    watcher.start((), check_now=True)
+    watcher.poke()
+
+    assert scheduled == [0, 50]
+
+
+def test_cache_round_trip(setup):
+    provider, windows, watcher = setup
+    assert monitors.load_cached() == ()
+
+    monitors.save_cached(watcher.topology)
+
+    assert monitors.load_cached() == watcher.topology
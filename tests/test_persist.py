@@ -0,0 +1,89 @@
+"""AtomicFile with JsonCodec: commits, write coalescing on an injected clock, flush and .bak recovery."""
+import pytest
+
+from persist import AtomicFile, JsonCodec
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    # A long window so the deferred-commit timer never fires during a test: flush() commits
+    f = AtomicFile(tmp_path / 'doc.json', JsonCodec(), coalesce=60.0, clock=clock)
+    yield f
+    f.flush()
+
+
+def test_nothing_written_raises(store):
+    with pytest.raises(FileNotFoundError):
+        store.read()
+
+
+def test_first_write_commits_at_once(store):
+    assert store.write({"a": 1}) is True
+    assert store.read() == {"a": 1}
+    assert JsonCodec().decode(store.path.read_bytes()) == {"a": 1}
+    assert store.commits == 1
+    assert not store.pending
+
+
+def test_burst_is_coalesced_into_one_commit(store, clock):
+    store.write({"n": 0})
+    clock.now += 1
+    assert store.write({"n": 1}) is False
+    assert store.write({"n": 2}) is False
+    assert store.pending
+    assert store.read() == {"n": 2}  # readers see the latest value before it is on disk
+    assert JsonCodec().decode(store.path.read_bytes()) == {"n": 0}
+    assert store.coalesced == 1
+
+    store.flush()
+
+    assert not store.pending
+    assert store.commits == 2
+    assert JsonCodec().decode(store.path.read_bytes()) == {"n": 2}
+
+
+def test_write_after_the_window_commits_at_once(store, clock):
+    store.write({"n": 0})
+    clock.now += store.coalesce
+    assert store.write({"n": 1}) is True
+    assert not store.pending
+    assert store.commits == 2
+
+
+def test_corrupt_main_file_falls_back_to_backup(store, clock):
+    store.write({"gen": 1})
+    clock.now += store.coalesce
+    store.write({"gen": 2})
+    assert JsonCodec().decode(store.backup.read_bytes()) == {"gen": 1}
+
+    store.path.write_bytes(b'{not json')
+
+    assert store.read() == {"gen": 1}
+    assert store.recoveries == 1
+    # The next commit keeps the good backup instead of copying the corrupt file over it
+    clock.now += store.coalesce
+    store.write({"gen": 3})
+    assert store.read() == {"gen": 3}
+    assert JsonCodec().decode(store.backup.read_bytes()) == {"gen": 1}
+
+
+def test_on_commit_gets_the_new_stamp(tmp_path, clock):
+    seen = []
+    f = AtomicFile(tmp_path / 'doc.json', JsonCodec(), coalesce=0, clock=clock,
+                   on_commit=lambda obj, stamp: seen.append((obj, stamp)))
+    f.write([1, 2])
+
+    assert seen == [([1, 2], f.stamp())]
@@ -0,0 +1,75 @@
+"""The desktop stays locked when the lockscreen child crashes or hangs: a new one is up quickly."""
+import sys
+import time
+
+import pytest
+
+import ipc
+import main as app
+import tracing
+from tests.fakes import FAILING_CHILD, ROOT
+
+RELOCK_BUDGET_MS = 2000  # crash noticed -> new child's first window, with a 50 ms child start
+
+
+@pytest.fixture
+def fast_respawn(monkeypatch):
+    monkeypatch.setattr(app, 'RESPAWN_BACKOFF_BASE', 0.0)
+    monkeypatch.setattr(ipc, 'HEARTBEAT_TIMEOUT', 1.0)
+    monkeypatch.setattr(ipc, 'HEARTBEAT_INTERVAL', 0.1)
+    monkeypatch.setattr(tracing, 'tracer', tracing.Tracer())
+
+
+def _child(failures: int, mode: str):
+    script = FAILING_CHILD.format(root=str(ROOT), import_s=0.05)
+    return lambda n: [sys.executable, '-c', script, mode if n <= failures else 'ok']
+
+
+def _wait_for_relocks(count: int, timeout: float = 20.0) -> list:
+    """Relock traces that reached `mapped`, as ms after the failure was noticed."""
+    deadline = time.monotonic() + timeout
+    while True:
+        done = [{s['name']: s['at_ms'] for s in t['spans'] if 'at_ms' in s}
+                for t in tracing.tracer.recent() if t['name'] == 'relock']
+        done = [marks['mapped'] for marks in done if 'mapped' in marks]
+        if len(done) >= count or time.monotonic() > deadline:
+            return done
+        time.sleep(0.05)
+
+
+@pytest.mark.parametrize('mode', ['crash', 'hang'])
+def test_failed_child_is_replaced_while_locked(make_locker, fast_respawn, mode):
+    locker = make_locker(_child(2, mode))
+    locker.lock_now()
+
+    relocks = _wait_for_relocks(2)
+
+    assert len(relocks) == 2
+    assert locker.state.active
+    assert len(locker.spawned) == 3
+    assert max(relocks) < RELOCK_BUDGET_MS
+    assert all(state.active for state in locker.spawned[1:]), 'respawned while the lock was lifted'
+
+
+def test_repeated_crashes_back_off(make_locker, fast_respawn, monkeypatch):
+    monkeypatch.setattr(app, 'RESPAWN_BACKOFF_BASE', 0.3)
+    locker = make_locker(_child(3, 'crash'))
+    t0 = time.monotonic()
+    locker.lock_now()
+
+    _wait_for_relocks(3)
+
+    # The first respawn is immediate, then 0.3 s and 0.6 s between attempts
+    assert len(locker.spawned) == 4
+    assert time.monotonic() - t0 >= 0.9
+    assert locker.state.active
+
+
+def test_unlock_does_not_respawn(make_locker, fast_respawn):
+    locker = make_locker(_child(0, 'ok'))
+    locker.lock_now()
+    locker.unlock_now()
+    time.sleep(0.3)
+
+    assert not locker.state.active
+    assert len(locker.spawned) == 1
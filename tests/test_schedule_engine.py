@@ -0,0 +1,169 @@
+"""ScheduleEngine.step() on an injected clock with a stub locker and schedule store."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from schedule_engine import ScheduleEngine
+
+
+class State:
+    def __init__(self, active=False, reason=None, start=None, end=None):
+        self.active = active
+        self.reason = reason
+        self.start = start
+        self.end = end
+
+
+class StubLocker:
+    def __init__(self, lead: float | None = None):
+        self.state = State()
+        self.lead = lead
+        self.calls = []
+
+    def lock_now(self, reason='manual', start=None, end=None):
+        self.calls.append(('lock', reason, start, end))
+        self.state = State(True, reason, start, end)
+        return self.state
+
+    def unlock_now(self):
+        self.calls.append(('unlock',))
+        self.state = State()
+        return self.state
+
+    def standby_lead(self):
+        return self.lead
+
+    def prepare_standby(self):
+        self.calls.append(('prepare_standby',))
+
+
+class StubStore:
+    def __init__(self, sched):
+        self.sched = sched
+
+    def read_schedule(self):
+        return self.sched
+
+    def subscribe(self, callback):
+        pass
+
+    def unsubscribe(self, callback):
+        pass
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+NIGHT = {"enabled": True, "start": "22:00", "end": "07:00", "notify_minutes": []}
+DAY = datetime(2026, 3, 4)  # any day: the legacy start/end pair applies every day
+
+
+def at(hour, minute=0, days=0):
+    return DAY + timedelta(days=days, hours=hour, minutes=minute)
+
+
+@pytest.fixture
+def clock():
+    return Clock(at(21, 0))
+
+
+def _engine(locker, clock, sched=NIGHT):
+    # No 15 min cap, so step() returns the exact time to the next boundary
+    return ScheduleEngine(locker, store=StubStore(dict(sched)), clock=clock, max_sleep=24 * 3600)
+
+
+def test_sleeps_until_the_window_then_locks_at_its_start(clock):
+    locker = StubLocker()
+    engine = _engine(locker, clock)
+    clock.now = at(21, 59)
+
+    assert engine.step() == 60
+    assert locker.calls == []
+
+    clock.now = at(22, 0)
+    delay = engine.step()
+
+    assert locker.calls == [('lock', 'schedule', '22:00', '07:00')]
+    assert delay == 9 * 3600  # next boundary: the end of the window
+
+
+def test_unlocks_its_own_lock_at_the_window_end(clock):
+    locker = StubLocker()
+    engine = _engine(locker, clock)
+    clock.now = at(23, 0)
+    engine.step()
+    clock.now = at(7, 0, days=1)
+
+    delay = engine.step()
+
+    assert locker.calls[-1] == ('unlock',)
+    assert not locker.state.active
+    assert delay == 15 * 3600  # until 22:00
+
+
+def test_manual_lock_is_left_alone(clock):
+    locker = StubLocker()
+    locker.lock_now(reason='manual')
+    engine = _engine(locker, clock)
+
+    clock.now = at(23, 0)
+    engine.step()
+    clock.now = at(7, 30, days=1)
+    engine.step()
+
+    assert locker.calls == [('lock', 'manual', None, None)]
+    assert locker.state.reason == 'manual'
+
+
+def test_wall_clock_jump_is_handled_on_the_next_step(clock):
+    locker = StubLocker()
+    engine = _engine(locker, clock)
+    assert engine.step() == 3600
+
+    # Resumed from sleep (or the clock was set forward) past the window start
+    clock.now = at(23, 30)
+    engine.step()
+    assert locker.calls == [('lock', 'schedule', '22:00', '07:00')]
+
+    # Set back before the window: the schedule's own lock ends
+    clock.now = at(20, 0)
+    assert engine.step() == 2 * 3600
+    assert locker.calls[-1] == ('unlock',)
+
+
+def test_long_delays_are_capped(clock):
+    engine = _engine(StubLocker(), clock)
+    engine.max_sleep = 600
+
+    assert engine.step() == 600
+
+
+def test_standby_is_prewarmed_lead_minutes_before_the_window(clock):
+    locker = StubLocker(lead=3 * 60)
+    engine = _engine(locker, clock)
+
+    clock.now = at(21, 50)
+    assert engine.step() == 7 * 60  # wake at 21:57
+    assert locker.calls == []
+
+    clock.now = at(21, 57)
+    assert engine.step() == 3 * 60  # then at 22:00 for the lock
+    assert locker.calls == [('prepare_standby',)]
+
+    clock.now = at(22, 0)
+    engine.step()
+    assert locker.calls[-1][0] == 'lock'
+
+
+def test_disabled_schedule_does_nothing(clock):
+    locker = StubLocker()
+    engine = _engine(locker, clock, dict(NIGHT, enabled=False))
+    clock.now = at(23, 0)
+
+    assert engine.step() == engine.max_sleep
+    assert locker.calls == []
@@ -0,0 +1,125 @@
+"""WeekIndex against a per-minute reference of the weekly rules."""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from schedule_index import compile_windows, normalize_windows
+
+MONDAY = datetime(2026, 3, 2)
+WEEK_MIN = 7 * 24 * 60
+
+
+def reference(windows) -> list[bool]:
+    """Locked flag for every minute of the week, rule by rule (the pre-index logic)."""
+    locked = [False] * WEEK_MIN
+    for w in windows:
+        s = int(w['start'][:2]) * 60 + int(w['start'][3:])
+        e = int(w['end'][:2]) * 60 + int(w['end'][3:])
+        if s == e:
+            continue
+        length = (e - s) % (24 * 60)  # end not after start: runs into the next day
+        for d in w['days']:
+            for m in range(d * 24 * 60 + s, d * 24 * 60 + s + length):
+                locked[m % WEEK_MIN] = True
+    return locked
+
+
+def minute(dt: datetime) -> int:
+    return int((dt - MONDAY).total_seconds() // 60)
+
+
+def check(windows, samples):
+    windows = normalize_windows(windows)
+    index = compile_windows(windows)
+    ref = reference(windows)
+    assert bool(index) == any(ref)
+    for m in samples:
+        now = MONDAY + timedelta(minutes=m, seconds=random.randrange(60))
+        cur = index.current(now)
+        assert (cur is not None) == ref[m], (windows, now)
+        if all(ref):
+            assert cur == (None, None) and index.next_start(now) is None
+            continue
+        if cur is not None:
+            start, end = minute(cur[0]), minute(cur[1])
+            assert start <= m < end
+            assert all(ref[k % WEEK_MIN] for k in range(start, end))
+            assert not ref[(start - 1) % WEEK_MIN] and not ref[end % WEEK_MIN]
+            assert index.next_transition(now) == cur[1]
+        elif any(ref):
+            nxt = minute(index.next_start(now))
+            assert m < nxt <= m + WEEK_MIN
+            assert ref[nxt % WEEK_MIN] and not ref[(nxt - 1) % WEEK_MIN]
+            assert not any(ref[k % WEEK_MIN] for k in range(m, nxt))
+
+
+def random_windows(rng):
+    return [{"days": rng.sample(range(7), rng.randint(1, 7)),
+             "start": f'{rng.randrange(24):02d}:{rng.choice((0, 15, 30, 45)):02d}',
+             "end": f'{rng.randrange(24):02d}:{rng.choice((0, 15, 30, 45)):02d}'}
+            for _ in range(rng.randint(1, 4))]
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_random_schedules_match_reference(seed):
+    rng = random.Random(seed)
+    random.seed(seed)
+    check(random_windows(rng), [rng.randrange(WEEK_MIN) for _ in range(50)])
+
+
+def test_overlapping_rules_merge():
+    windows = [{"days": [0], "start": "09:00", "end": "12:00"},
+               {"days": [0], "start": "11:00", "end": "14:00"},
+               {"days": [0], "start": "14:00", "end": "15:00"}]
+    index = compile_windows(normalize_windows(windows))
+
+    assert index.current(MONDAY + timedelta(hours=10)) == (MONDAY + timedelta(hours=9), MONDAY + timedelta(hours=15))
+    check(windows, range(0, 24 * 60, 7))
+
+
+def test_overnight_rule_crosses_midnight_and_sunday_to_monday():
+    windows = [{"days": ["sun"], "start": "22:00", "end": "07:00"}]
+    index = compile_windows(normalize_windows(windows))
+    sunday_night = MONDAY + timedelta(days=6, hours=23)
+
+    assert index.current(sunday_night) == (MONDAY + timedelta(days=6, hours=22), MONDAY + timedelta(days=7, hours=7))
+    assert index.current(MONDAY + timedelta(hours=3)) == (MONDAY - timedelta(hours=2), MONDAY + timedelta(hours=7))
+    assert index.next_start(MONDAY + timedelta(hours=8)) == MONDAY + timedelta(days=6, hours=22)
+    check(windows, range(0, WEEK_MIN, 11))
+
+
+def test_always_locked():
+    windows = [{"start": "00:00", "end": "12:00"}, {"start": "12:00", "end": "00:00"}]
+    index = compile_windows(normalize_windows(windows))
+
+    assert index.always
+    assert index.current(MONDAY + timedelta(days=3)) == (None, None)
+    assert index.next_start(MONDAY) is None
+
+
+def test_empty_rule_never_locks():
+    index = compile_windows(normalize_windows([{"start": "08:00", "end": "08:00"}]))
+
+    assert not index
+    assert index.current(MONDAY) is None
+
+
+def test_normalize_accepts_names_and_numbers():
+    rules = normalize_windows([{"days": ["Tuesday", 0, "mon"], "start": "07:05", "end": "09:00:00"}])
+
+    assert rules == [{"days": [0, 1], "start": "07:05", "end": "09:00"}]
+    assert normalize_windows([{"start": "22:00", "end": "06:00"}])[0]['days'] == list(range(7))
+
+
+@pytest.mark.parametrize('raw', [
+    {"days": [0]},
+    [{"days": [7], "start": "01:00", "end": "02:00"}],
+    [{"days": [True], "start": "01:00", "end": "02:00"}],
+    [{"days": "mon", "start": "01:00", "end": "02:00"}],
+    [{"start": "25:00", "end": "02:00"}],
+    ["22:00-07:00"],
+])
+def test_normalize_rejects_malformed_rules(raw):
+    with pytest.raises(ValueError):
+        normalize_windows(raw)
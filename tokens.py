@@ -0,0 +1,105 @@
+"""
+Short-lived API session tokens for PC-Lock.
+
+A client exchanges the password for a token once (POST /api/session) and then
+sends `Authorization: Bearer <token>`. Tokens are HMAC-SHA256 signed with a
+per-process secret, so checking one costs a few microseconds instead of a
+full PBKDF2 run. Changing the password rotates the secret, which revokes
+every outstanding token.
+"""
+import base64
+import hmac
+import threading
+import time
+from hashlib import sha256
+from secrets import token_bytes, token_hex
+
+TOKEN_PREFIX = 'pcl1.'
+DEFAULT_TTL = 15 * 60  # seconds
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+class TokenIssuer:
+    """Issues and verifies `pcl1.<id>.<expiry>.<signature>` bearer tokens."""
+
+    def __init__(self, ttl: int = DEFAULT_TTL, clock=time.time):
+        self.ttl = int(ttl)
+        self.clock = clock
+        self._key = token_bytes(32)
+        self._revoked: dict[str, int] = {}  # token id -> expiry
+        self._lock = threading.Lock()
+
+    def _sign(self, key: bytes, payload: str) -> str:
+        return _b64(hmac.new(key, payload.encode('ascii'), sha256).digest())
+
+    def issue(self) -> tuple[str, int]:
+        """Return a new token and its expiry (Unix time)."""
+        expires = int(self.clock()) + self.ttl
+        payload = f'{token_hex(8)}.{expires}'
+        return f'{TOKEN_PREFIX}{payload}.{self._sign(self._key, payload)}', expires
+
+    def _parse(self, token: str) -> tuple[str, int] | None:
+        if not token.startswith(TOKEN_PREFIX):
+            return None
+        try:
+            tid, exp, sig = token[len(TOKEN_PREFIX):].split('.')
+            expires = int(exp)
+        except ValueError:
+            return None
+        if not hmac.compare_digest(sig, self._sign(self._key, f'{tid}.{exp}')):
+            return None
+        return tid, expires
+
+    def verify(self, token: str) -> bool:
+        parsed = self._parse(token)
+        if parsed is None:
+            return False
+        tid, expires = parsed
+        return expires > self.clock() and tid not in self._revoked
+
+    def revoke(self, token: str) -> bool:
+        """Revoke a single token; returns False if it was not valid."""
+        parsed = self._parse(token)
+        if parsed is None:
+            return False
+        tid, expires = parsed
+        now = self.clock()
+        with self._lock:
+            # Drop entries that would have expired anyway
+            self._revoked = {t: e for t, e in self._revoked.items() if e > now}
+            self._revoked[tid] = expires
+        return True
+
+    def revoke_all(self) -> None:
+        """Invalidate every token issued so far."""
+        with self._lock:
+            self._key = token_bytes(32)
+            self._revoked = {}
+
+
+issuer = TokenIssuer()
+
+_watching = False
+_password_generation: int | None = None
+
+
+def _on_config(cfg) -> None:
+    # Only set_password() bumps the generation; a rehash to new KDF parameters keeps sessions
+    global _password_generation
+    if cfg.password.generation != _password_generation:
+        _password_generation = cfg.password.generation
+        issuer.revoke_all()
+
+
+def watch_password_changes() -> None:
+    """Revoke all tokens whenever the password changes (idempotent)."""
+    global _watching, _password_generation
+    if _watching:
+        return
+    import config
+    _watching = True
+    _password_generation = config.get_config().password.generation
+    config.subscribe(_on_config)
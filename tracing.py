@@ -0,0 +1,154 @@
+"""
+Phase-level traces of lock and unlock transitions.
+
+Each `Locker.lock_now` / `unlock_now` starts a Trace and times its phases as
+spans (mute, desktop, spawn, ...). The lockscreen child reports its own
+milestones (modules imported, desktop switched, first window mapped) as
+lines on stdout; ipc.ChildChannel turns them into marks on the same trace, so one
+trace covers the whole time until the lock is actually on screen.
+
+Finished and in-progress traces are kept in a ring buffer and can be dumped
+with `--dump-traces` or GET /api/traces.
+
+    trace = tracing.tracer.start('lock', reason='manual')
+    with trace.span('mute'):
+        ...
+    trace.end()
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+BUFFER_SIZE = 64
+REPORT_PREFIX = 'pclock:trace'  # child -> parent stdout lines: "<prefix> <mark> <perf_counter>"
+
+# perf_counter() reads a system-wide clock on Windows (QPC) and Linux
+# (CLOCK_MONOTONIC), so the child's timestamps compare with the parent's
+_clock = time.perf_counter
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start', 'end')
+
+    def __init__(self, trace, name: str):
+        self.trace = trace
+        self.name = name
+        self.start = None
+        self.end = None
+
+    def __enter__(self):
+        self.start = self.trace.clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.end = self.trace.clock()
+        with self.trace._lock:
+            self.trace.spans.append((self.name, self.start, self.end))
+        return False
+
+
+class Trace:
+    def __init__(self, id: int, name: str, attrs: dict, clock=_clock):
+        self.id = id
+        self.name = name
+        self.attrs = attrs
+        self.clock = clock
+        self.wall = time.time()
+        self.start = clock()
+        self.end_time: float | None = None
+        self.spans: list = []  # (name, start, end); marks have start == end
+        self._lock = threading.Lock()
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def mark(self, name: str, at: float | None = None) -> None:
+        """Record a point in time, e.g. a milestone reported by the child."""
+        now = self.clock()
+        if at is None or not (self.start <= at <= now):
+            at = now  # foreign or missing timestamp: use the time it arrived
+        with self._lock:
+            self.spans.append((name, at, at))
+
+    def set(self, **attrs) -> None:
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def end(self) -> None:
+        if self.end_time is None:
+            self.end_time = self.clock()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s[1])
+            attrs = dict(self.attrs)
+        ms = lambda t: round((t - self.start) * 1000, 3)
+        return {
+            "id": self.id,
+            "name": self.name,
+            "attrs": attrs,
+            "started_at": self.wall,
+            "duration_ms": ms(self.end_time) if self.end_time is not None else None,
+            "spans": [
+                {"name": n, "start_ms": ms(s), "duration_ms": round((e - s) * 1000, 3)}
+                if e != s else {"name": n, "at_ms": ms(s)}
+                for n, s, e in spans
+            ],
+        }
+
+
+class Tracer:
+    def __init__(self, size: int = BUFFER_SIZE, clock=_clock):
+        self.clock = clock
+        self._traces: deque = deque(maxlen=size)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def start(self, name: str, **attrs) -> Trace:
+        with self._lock:
+            trace = Trace(self._next_id, name, attrs, self.clock)
+            self._next_id += 1
+            self._traces.append(trace)
+        return trace
+
+    def recent(self, limit: int | None = None) -> list:
+        """Newest last; includes traces still waiting for child marks."""
+        with self._lock:
+            traces = list(self._traces)
+        if limit is not None:
+            traces = traces[-limit:] if limit > 0 else []
+        return [t.to_dict() for t in traces]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+tracer = Tracer()
+
+
+# --- child -> parent reports (read by ipc.ChildChannel) ---
+
+def report(mark: str) -> None:
+    """Called in the lockscreen child: tell the parent `mark` happened now (best effort)."""
+    line = f'{REPORT_PREFIX} {mark} {_clock():.6f}\n'.encode('ascii')
+    try:
+        # Windowed (frozen) builds have sys.stdout None; the inherited pipe is still fd 1
+        os.write(sys.stdout.fileno() if sys.stdout is not None else 1, line)
+    except Exception:
+        pass
+
+
+def parse_report(line) -> tuple[str, float | None] | None:
+    """(mark, timestamp) for a report line, None for any other output."""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', 'replace')
+    parts = line.split()
+    if len(parts) < 2 or parts[0] != REPORT_PREFIX:
+        return None
+    try:
+        return parts[1], float(parts[2])
+    except (IndexError, ValueError):
+        return parts[1], None
@@ -1,7 +1,7 @@
 """
 Main application UI for PC-Lock.
 """
-from datetime import datetime, time as dtime
+from datetime import time as dtime
 from tkinter import messagebox
 
 import customtkinter as ctk
@@ -11,7 +11,7 @@ from api import maybe_start_api
 from config import load_config, verify_password, set_password, update_api
 
 from .dialogs import ask_password
-from .scheduler import SchedulerThread, in_lock_window
+from .scheduler import SchedulerThread
 from .tray import TrayManager
 
 
@@ -40,6 +40,10 @@ class AppUI:
         self.scheduler = SchedulerThread(self.locker, on_state_change=self.update_status)
         self.scheduler.start()
 
+        # Reflect schedule changes made elsewhere (API, unlock watcher, external edits)
+        from schedule_store import subscribe
+        subscribe(self._on_schedule_changed_externally)
+
         # Check if we should lock immediately
         self.lock_if_in_schedule_now()
 
@@ -138,6 +142,15 @@ class AppUI:
         self.end_entry.pack(side="left", padx=5)
         self.end_entry.bind("<KeyRelease>", lambda e: self._on_schedule_changed())
 
+        # Shown when weekly rules (set through the API) replace the daily window
+        self.sched_note = ctk.CTkLabel(
+            sched_frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="gray60"
+        )
+        self.sched_note.pack(anchor="w", padx=15)
+
         # Save schedule button
         self.save_sched_btn = ctk.CTkButton(
             sched_frame,
@@ -244,14 +257,38 @@ class AppUI:
             self.status_indicator.configure(text_color="#22c55e")  # Green
             self.lock_btn.configure(state="normal")
 
+    def _show_schedule(self, sched):
+        self.enabled_var.set(bool(sched.get('enabled', False)))
+        self.start_var.set(sched.get('start', '22:00'))
+        self.end_var.set(sched.get('end', '07:00'))
+        weekly = bool(sched.get('windows'))
+        entry_state = "disabled" if weekly else "normal"
+        self.start_entry.configure(state=entry_state)
+        self.end_entry.configure(state=entry_state)
+        self.sched_note.configure(
+            text=f"{len(sched['windows'])} weekly rule(s) active (set via API)" if weekly else ""
+        )
+
+    def _on_schedule_changed_externally(self, sched):
+        # Runs on the writer or watcher thread; hand the snapshot to the Tk thread
+        self.root.after(0, self._apply_schedule, sched)
+
+    def _apply_schedule(self, sched):
+        if self._schedule_dirty:
+            return
+        try:
+            self._loading = True
+            self._show_schedule(sched)
+        except Exception:
+            pass
+        finally:
+            self._loading = False
+
     def load_into_ui(self):
         try:
             self._loading = True
             from schedule_store import read_schedule
-            sched = read_schedule()
-            self.enabled_var.set(bool(sched.get('enabled', False)))
-            self.start_var.set(sched.get('start', '22:00'))
-            self.end_var.set(sched.get('end', '07:00'))
+            self._show_schedule(read_schedule())
 
             cfg = load_config()
             api = cfg.get('api', {})
@@ -282,11 +319,14 @@ class AppUI:
             start = dtime.fromisoformat(self.start_var.get())
             end = dtime.fromisoformat(self.end_var.get())
 
-            from schedule_store import write_schedule
+            from schedule_store import read_schedule, write_schedule
+            current = read_schedule()
             write_schedule(
                 bool(self.enabled_var.get()),
                 start.isoformat(timespec='minutes'),
-                end.isoformat(timespec='minutes')
+                end.isoformat(timespec='minutes'),
+                current.get('notify_minutes'),
+                current.get('windows')
             )
             messagebox.showinfo('Saved', 'Schedule updated.')
             self._schedule_dirty = False
@@ -370,38 +410,15 @@ class AppUI:
 
     def lock_if_in_schedule_now(self):
         try:
-            from schedule_store import read_schedule
-            sched = read_schedule()
-            if not bool(sched.get('enabled', False)):
-                return
-            start = dtime.fromisoformat(sched.get('start', '22:00'))
-            end = dtime.fromisoformat(sched.get('end', '07:00'))
-            if in_lock_window(datetime.now(), start, end):
-                self.locker.lock_now(
-                    reason='schedule',
-                    start=start.isoformat(timespec='minutes'),
-                    end=end.isoformat(timespec='minutes')
-                )
+            core.lock_if_in_schedule_now(self.locker)
+            if self.locker.state.active:
                 self.update_status(True)
         except Exception:
             pass
 
     def tick(self):
+        # Schedule changes arrive through schedule_store.subscribe(); this only refreshes the status
         self.update_status()
-
-        if not self._schedule_dirty:
-            try:
-                self._loading = True
-                from schedule_store import read_schedule
-                sched = read_schedule()
-                enabled = bool(sched.get('enabled', False))
-                if self.enabled_var.get() != enabled:
-                    self.enabled_var.set(enabled)
-            except Exception:
-                pass
-            finally:
-                self._loading = False
-
         self.root.after(1000, self.tick)
 
     def minimize_to_tray(self):
@@ -425,6 +442,7 @@ def main():
     root = ctk.CTk()
     app = AppUI(root)
     root.mainloop()
+    app.locker.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,174 @@
+"""
+Change notification helpers shared by the config and schedule stores.
+
+Stores keep a Subscribers list and push an immutable snapshot to it whenever
+they commit a write. A FileWatcher thread catches edits made by other
+processes and reports them once the file has stopped changing.
+"""
+import os
+import sys
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+# Quiet period after the last change before an external edit is reported
+DEBOUNCE = 0.25
+# Stat interval for platforms without directory change notifications
+POLL_INTERVAL = 2.0
+
+
+def freeze(obj):
+    """Recursively convert dicts/lists into read-only mappings/tuples."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def file_stamp(path) -> tuple | None:
+    """(mtime_ns, size, inode) of `path`, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class Subscribers:
+    """Thread-safe list of snapshot callbacks."""
+
+    def __init__(self):
+        self._callbacks: list = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._callbacks)
+
+    def add(self, callback) -> bool:
+        """Register `callback`; returns True if it is the first subscriber."""
+        with self._lock:
+            if callback not in self._callbacks:
+                self._callbacks.append(callback)
+            return len(self._callbacks) == 1
+
+    def remove(self, callback) -> None:
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def publish(self, snapshot) -> None:
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for cb in callbacks:
+            try:
+                cb(snapshot)
+            except Exception:
+                pass
+
+
+class FileWatcher(threading.Thread):
+    """Call `on_change()` after `path` was modified and then left alone for `debounce` seconds.
+
+    On Windows the thread blocks on a directory change notification, so it
+    costs nothing while the file is idle; elsewhere it falls back to polling
+    the file stamp. `on_change` is also called for our own writes, so it
+    should compare stamps itself.
+    """
+
+    def __init__(self, path, on_change, debounce: float = DEBOUNCE, poll_interval: float = POLL_INTERVAL):
+        super().__init__(daemon=True)
+        self.path = Path(path)
+        self.on_change = on_change
+        self.debounce = float(debounce)
+        self.poll_interval = float(poll_interval)
+        self._halt = threading.Event()  # not `_stop`: threading.Thread has a _stop() method
+        self._hstop = None  # Win32 event used to interrupt the blocking wait
+
+    def stop(self):
+        self._halt.set()
+        if self._hstop:
+            _K32.SetEvent(self._hstop)
+
+    def _fire(self):
+        try:
+            self.on_change()
+        except Exception:
+            pass
+
+    def _run_poll(self):
+        last = file_stamp(self.path)
+        while not self._halt.wait(self.poll_interval):
+            cur = file_stamp(self.path)
+            if cur == last:
+                continue
+            # Wait until the writer is done
+            while not self._halt.wait(self.debounce):
+                nxt = file_stamp(self.path)
+                if nxt == cur:
+                    break
+                cur = nxt
+            last = cur
+            self._fire()
+
+    def _run_win32(self):
+        flags = FILE_NOTIFY_CHANGE_FILE_NAME | FILE_NOTIFY_CHANGE_SIZE | FILE_NOTIFY_CHANGE_LAST_WRITE
+        hchange = _K32.FindFirstChangeNotificationW(str(self.path.parent), False, flags)
+        if not hchange or hchange == INVALID_HANDLE_VALUE:
+            return self._run_poll()
+        self._hstop = _K32.CreateEventW(None, True, False, None)
+        handles = (wintypes.HANDLE * 2)(hchange, self._hstop)
+        try:
+            while not self._halt.is_set():
+                r = _K32.WaitForMultipleObjects(2, handles, False, INFINITE)
+                if r != WAIT_OBJECT_0 or self._halt.is_set():
+                    break
+                _K32.FindNextChangeNotification(hchange)
+                # Debounce: keep waiting while further changes arrive
+                while _K32.WaitForMultipleObjects(2, handles, False, int(self.debounce * 1000)) == WAIT_OBJECT_0:
+                    _K32.FindNextChangeNotification(hchange)
+                if self._halt.is_set():
+                    break
+                self._fire()
+        finally:
+            _K32.FindCloseChangeNotification(hchange)
+            _K32.CloseHandle(self._hstop)
+            self._hstop = None
+
+    def run(self):
+        if sys.platform == 'win32':
+            self._run_win32()
+        else:
+            self._run_poll()
+
+
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+
+    _K32 = ctypes.WinDLL('kernel32', use_last_error=True)
+
+    FILE_NOTIFY_CHANGE_FILE_NAME = 0x001
+    FILE_NOTIFY_CHANGE_SIZE = 0x008
+    FILE_NOTIFY_CHANGE_LAST_WRITE = 0x010
+    INFINITE = 0xFFFFFFFF
+    WAIT_OBJECT_0 = 0
+    INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
+
+    _K32.FindFirstChangeNotificationW.argtypes = [wintypes.LPCWSTR, wintypes.BOOL, wintypes.DWORD]
+    _K32.FindFirstChangeNotificationW.restype = wintypes.HANDLE
+    _K32.FindNextChangeNotification.argtypes = [wintypes.HANDLE]
+    _K32.FindNextChangeNotification.restype = wintypes.BOOL
+    _K32.FindCloseChangeNotification.argtypes = [wintypes.HANDLE]
+    _K32.FindCloseChangeNotification.restype = wintypes.BOOL
+    _K32.CreateEventW.argtypes = [wintypes.LPVOID, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR]
+    _K32.CreateEventW.restype = wintypes.HANDLE
+    _K32.SetEvent.argtypes = [wintypes.HANDLE]
+    _K32.SetEvent.restype = wintypes.BOOL
+    _K32.CloseHandle.argtypes = [wintypes.HANDLE]
+    _K32.CloseHandle.restype = wintypes.BOOL
+    _K32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE), wintypes.BOOL, wintypes.DWORD]
+    _K32.WaitForMultipleObjects.restype = wintypes.DWORD